@@ -0,0 +1,153 @@
+"""
+クライアント再利用（common/clients.py）のベンチマーク
+
+ウォームインスタンスでの1リクエストを「クライアント作成 + API 呼出1回」とみなし、
+毎回作り直す場合（fresh）とレジストリで再利用する場合（registry）の所要時間を比べる。
+
+    anthropic: anthropic.Anthropic の作成と messages.create（max_tokens=1）。
+               既定では同じプロセス内のスタンドインサーバー（HTTP）に送る。
+               --base-url https://api.anthropic.com と ANTHROPIC_API_KEY で実 API（TLS を含む）に送る
+    google:    googleapiclient の drive v3 サービス作成（build / google_service）。
+               google-api-python-client が無ければスキップ
+
+Usage:
+    python cloud_functions/benchmark_clients.py [--requests 30] [--base-url URL]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import clients
+
+REPLY = {
+    "id": "msg_benchmark",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-sonnet-4-20250514",
+    "content": [{"type": "text", "text": "ok"}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 1, "output_tokens": 1},
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive（再利用したクライアントは接続を使い回す）
+    disable_nagle_algorithm = True  # ヘッダと本文を別々に書くため（遅延 ACK で 40ms 待たない）
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(REPLY).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stand_in() -> tuple:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def measure(invocation, requests_: int) -> dict:
+    times = []
+    for _ in range(requests_):
+        start = time.perf_counter()
+        invocation()
+        times.append((time.perf_counter() - start) * 1000)
+    warm = times[1:] or times
+    return {
+        "first_ms": round(times[0], 1),
+        "warm_mean_ms": round(statistics.mean(warm), 1),
+        "warm_p50_ms": round(statistics.median(warm), 1),
+    }
+
+
+def bench_anthropic(base_url: str, api_key: str, requests_: int) -> dict:
+    import anthropic
+
+    params = {
+        "model": "claude-sonnet-4-20250514",
+        "max_tokens": 1,
+        "messages": [{"role": "user", "content": "ping"}],
+    }
+
+    def fresh():
+        client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+        client.messages.create(**params)
+        client.close()
+
+    def registry():
+        clients.anthropic_client(api_key, base_url=base_url).messages.create(**params)
+
+    clients.reset()
+    return {"fresh": measure(fresh, requests_), "registry": measure(registry, requests_)}
+
+
+def bench_google(requests_: int) -> dict:
+    try:
+        from google.auth.credentials import AnonymousCredentials
+        from googleapiclient.discovery import build
+    except ImportError:
+        return None
+    credentials = AnonymousCredentials()
+
+    def fresh():
+        build("drive", "v3", credentials=credentials, static_discovery=True, cache_discovery=False)
+
+    def registry():
+        clients.google_service("drive", "v3", credentials=credentials, key="benchmark")
+
+    clients.reset()
+    return {"fresh": measure(fresh, requests_), "registry": measure(registry, requests_)}
+
+
+def print_table(name: str, result: dict):
+    print(f"\n{name}")
+    print(f"  {'mode':<10}{'first':>10}{'warm mean':>12}{'warm p50':>11}")
+    for mode, m in result.items():
+        print(f"  {mode:<10}{m['first_ms']:>8.1f}ms{m['warm_mean_ms']:>10.1f}ms{m['warm_p50_ms']:>9.1f}ms")
+    saved = result["fresh"]["warm_mean_ms"] - result["registry"]["warm_mean_ms"]
+    print(f"  warm invocation saves {saved:.1f}ms per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark client reuse across warm invocations")
+    parser.add_argument("--requests", type=int, default=30, help="Simulated invocations per mode")
+    parser.add_argument("--base-url", help="Anthropic API base URL (default: in-process stand-in)")
+    args = parser.parse_args()
+
+    os.environ["ANTHROPIC_REPLAY_MODE"] = "off"
+    warnings.simplefilter("ignore", DeprecationWarning)
+    server = None
+    base_url = args.base_url
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "benchmark")
+    if not base_url:
+        server, base_url = start_stand_in()
+
+    print(f"{args.requests} simulated invocations per mode, Anthropic endpoint {base_url}")
+    print_table("anthropic (create client + messages.create)", bench_anthropic(base_url, api_key, args.requests))
+    google = bench_google(args.requests)
+    if google:
+        print_table("google drive v3 (build service)", google)
+    else:
+        print("\ngoogle: skipped (google-api-python-client not installed)")
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Anthropic API 呼出のレート制御スケジューラ
+
+リクエスト数/分（RPM）と入力トークン数/分（ITPM）をトークンバケットで管理し、
+予算を超える呼出は失敗させずに待たせる。ANTHROPIC_MAX_CONCURRENT で同時実行数も制限できる。
+429（レート制限）/ 529（過負荷）はジッター付き指数バックオフで再試行し、
+その間は後続の呼出も一時停止する（retry-after ヘッダがあればそれに従う）。
+
+優先度クラス（priority）:
+    interactive: ダッシュボードで人が結果を待っている評価
+    pipeline:    GAS 等から起動される通常の評価（既定）
+    bulk:        再採点・バックフィル等の一括評価
+待っている呼出は重み付き公平キュー（self-clocked fair queueing）で順番を決める。
+各呼出に「仮想時刻 + 入力トークン見積もり / クラスの重み」の終了タグを付け、タグの小さい順に
+実行する（同じクラス内は到着順）。溜まっている bulk の呼出はタグが先に伸びているため、後から
+来た interactive の呼出は実行中の呼出の次に割り込む（評価はカテゴリ単位の呼出に分かれているので、
+bulk の評価はカテゴリの切れ目で後回しになる）。クラス別の待ち時間・所要時間は metrics() の "classes"。
+
+予算はプロセス（インスタンス）単位。複数インスタンスで動かす場合は
+組織の上限をインスタンス数で割った値を設定する。
+
+Env:
+    ANTHROPIC_RPM: リクエスト数/分の上限、0 で無制限 (default: 0)
+    ANTHROPIC_ITPM: 入力トークン数/分の上限、0 で無制限 (default: 0)
+    ANTHROPIC_MAX_RETRIES: 429/529 の再試行回数 (default: 6)
+    ANTHROPIC_RETRY_BASE: バックオフの基準秒 (default: 2)
+    ANTHROPIC_RETRY_MAX: バックオフの上限秒 (default: 60)
+    ANTHROPIC_MAX_CONCURRENT: 同時に実行する呼出数の上限、0 で無制限 (default: 0)
+    ANTHROPIC_PRIORITY_WEIGHTS: クラスの重み (default: "interactive=8,pipeline=3,bulk=1")
+
+使い方:
+    client = anthropic.Anthropic(api_key=..., max_retries=0)  # 再試行はスケジューラが行う
+    response = create_message(client, model=..., messages=[...])
+    # telemetry を渡すと所要時間・待ち時間・トークン数・推定コストを記録（common/telemetry.py）
+    response = create_message(client, telemetry=telemetry, label="c1", model=..., messages=[...])
+    response = create_message(client, priority="interactive", model=..., messages=[...])
+"""
+
+import heapq
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from common.telemetry import usage_of
+from common.tokens import estimate_tokens
+
+RETRY_STATUS = (429, 529)
+PRIORITY_CLASSES = ("interactive", "pipeline", "bulk")
+DEFAULT_PRIORITY = "pipeline"
+DEFAULT_WEIGHTS = {"interactive": 8.0, "pipeline": 3.0, "bulk": 1.0}
+LATENCY_WINDOW = 1000  # クラス別のパーセンタイルに使う直近の呼出数
+
+
+class TokenBucket:
+    """1分あたり rate_per_minute を補充するトークンバケット（0 で無制限）"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount を取り出せるまでの秒数（容量を超える要求は満杯になるまで待つ）"""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """見積もりと実績の差を反映する（正なら追加消費、負なら返却）"""
+        if self.rate:
+            self.level = min(self.capacity, self.level - delta)
+
+
+def _retry_after(error) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_weights(value: str) -> dict:
+    """"interactive=8,pipeline=3,bulk=1" 形式の重み（書かれていないクラスは既定値）"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in (value or "").split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() and weight.strip():
+            weights[name.strip()] = max(0.01, float(weight))
+    return weights
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _ClassMetrics:
+    def __init__(self):
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "queued": self.queued,
+            "wait_avg": round(self.wait_total / self.requests, 2) if self.requests else 0.0,
+            "wait_max": round(self.wait_max, 2),
+            "wait_p50": round(_percentile(list(self.waits), 0.5), 2),
+            "wait_p95": round(_percentile(list(self.waits), 0.95), 2),
+            "latency_p50": round(_percentile(list(self.latencies), 0.5), 2),
+            "latency_p95": round(_percentile(list(self.latencies), 0.95), 2),
+        }
+
+
+class RateLimiter:
+    """RPM/ITPM 予算・同時実行数付きの重み付き公平キュー"""
+
+    def __init__(
+        self,
+        rpm: float = 0,
+        itpm: float = 0,
+        max_retries: int = 6,
+        retry_base: float = 2.0,
+        retry_max: float = 60.0,
+        max_concurrent: int = 0,
+        weights: dict = None,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(itpm)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_concurrent = max_concurrent
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._cond = threading.Condition()
+        self._waiting = []  # (終了タグ, 到着番号) のヒープ。先頭だけが予算の空きを待つ
+        self._arrivals = 0
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._in_flight = 0
+        self._classes = {name: _ClassMetrics() for name in self.weights}
+        self._paused_until = 0.0
+        self._metrics = {
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "requests": 0,
+            "queued": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "retries": 0,
+            "throttled": 0,
+        }
+
+    def priority_class(self, priority: str = None) -> str:
+        """未知・未指定の優先度は既定クラスとして扱う"""
+        return priority if priority in self.weights else DEFAULT_PRIORITY
+
+    def acquire(self, tokens: float = 0, priority: str = None) -> float:
+        """順番と予算が来るまで待ち、1リクエスト分（同時実行枠を含む）を確保する。待ち時間（秒）を返す
+
+        確保した同時実行枠は呼出後に release() で返す。
+        """
+        start = time.monotonic()
+        name = self.priority_class(priority)
+        with self._cond:
+            finish = max(self._virtual_time, self._last_finish.get(name, 0.0))
+            finish += max(1.0, tokens) / self.weights[name]
+            self._last_finish[name] = finish
+            entry = (finish, self._arrivals)
+            self._arrivals += 1
+            heapq.heappush(self._waiting, entry)
+            cls = self._classes.setdefault(name, _ClassMetrics())
+            cls.queue_depth += 1
+            m = self._metrics
+            m["queue_depth"] += 1
+            m["max_queue_depth"] = max(m["max_queue_depth"], m["queue_depth"])
+            # 新しい呼出が先頭になった場合、元の先頭は待ち直す
+            self._cond.notify_all()
+            while True:
+                if self._waiting[0] == entry:
+                    if self.max_concurrent and self._in_flight >= self.max_concurrent:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    wait = max(
+                        self._paused_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(tokens, now),
+                    )
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        heapq.heappop(self._waiting)
+                        self._virtual_time = finish
+                        self._in_flight += 1
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+            waited = time.monotonic() - start
+            m["queue_depth"] -= 1
+            m["requests"] += 1
+            cls.queue_depth -= 1
+            cls.in_flight += 1
+            cls.requests += 1
+            if waited > 0.01:
+                m["queued"] += 1
+                cls.queued += 1
+            m["wait_total"] += waited
+            m["wait_max"] = max(m["wait_max"], waited)
+            cls.wait_total += waited
+            cls.wait_max = max(cls.wait_max, waited)
+            cls.waits.append(waited)
+            self._cond.notify_all()
+        return waited
+
+    def release(self, priority: str = None, latency: float = None):
+        """acquire() で確保した同時実行枠を返す。latency は待ち時間を含む呼出の所要時間（秒）"""
+        with self._cond:
+            self._in_flight -= 1
+            cls = self._classes[self.priority_class(priority)]
+            cls.in_flight -= 1
+            if latency is not None:
+                cls.latencies.append(latency)
+            self._cond.notify_all()
+
+    def settle(self, estimated: float, actual: float):
+        """呼出後に入力トークンの見積もりを実績で補正する"""
+        with self._cond:
+            self.tokens.adjust(actual - estimated)
+
+    def backoff(self, attempt: int, retry_after: float = 0) -> float:
+        """ジッター付き指数バックオフ（上限の1/2〜1で一様乱数）。retry-after より短くはしない"""
+        ceiling = min(self.retry_max, self.retry_base * (2 ** attempt))
+        return max(retry_after, random.uniform(ceiling / 2, ceiling))
+
+    def call(self, fn, tokens: float = 0, stats: dict = None, priority: str = None):
+        """予算を確保して fn() を実行し、429/529 は再試行する
+
+        stats を渡すと呼出元ごとの queue_wait（秒）と retries を加算する。
+        """
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            waited = self.acquire(tokens, priority)
+            if stats is not None:
+                stats["queue_wait"] = stats.get("queue_wait", 0.0) + waited
+            try:
+                result = fn()
+            except Exception as e:
+                self.release(priority)
+                status = getattr(e, "status_code", None)
+                if status not in RETRY_STATUS or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, _retry_after(e))
+                attempt += 1
+                with self._cond:
+                    self._metrics["retries"] += 1
+                    self._metrics["throttled"] += 1
+                    # 後続の呼出も同じだけ待たせる（全体で一斉に再送しない）
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                if stats is not None:
+                    stats["retries"] = stats.get("retries", 0) + 1
+                print(f"Anthropic API {status}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.release(priority, time.monotonic() - start)
+            return result
+
+    def metrics(self) -> dict:
+        with self._cond:
+            m = dict(self._metrics)
+            m["in_flight"] = self._in_flight
+            m["classes"] = {
+                name: {"weight": self.weights.get(name), **cls.snapshot()}
+                for name, cls in self._classes.items()
+            }
+        m["wait_total"] = round(m["wait_total"], 2)
+        m["wait_max"] = round(m["wait_max"], 2)
+        m["wait_avg"] = round(m["wait_total"] / m["requests"], 2) if m["requests"] else 0.0
+        m["rpm"] = self.requests.capacity
+        m["itpm"] = self.tokens.capacity
+        m["max_concurrent"] = self.max_concurrent
+        return m
+
+
+def request_tokens(system=None, messages=None) -> int:
+    """messages.create の入力トークンを概算する（system / messages の文字列・text ブロック）"""
+
+    def text_of(content):
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+            )
+        return ""
+
+    text = text_of(system) + "".join(text_of(m.get("content")) for m in messages or [])
+    return estimate_tokens(text)
+
+
+# ── Module-level scheduler ──
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """環境変数の設定でプロセス共通のスケジューラを返す"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                rpm=float(os.environ.get("ANTHROPIC_RPM", "0")),
+                itpm=float(os.environ.get("ANTHROPIC_ITPM", "0")),
+                max_retries=int(os.environ.get("ANTHROPIC_MAX_RETRIES", "6")),
+                retry_base=float(os.environ.get("ANTHROPIC_RETRY_BASE", "2")),
+                retry_max=float(os.environ.get("ANTHROPIC_RETRY_MAX", "60")),
+                max_concurrent=int(os.environ.get("ANTHROPIC_MAX_CONCURRENT", "0")),
+                weights=parse_weights(os.environ.get("ANTHROPIC_PRIORITY_WEIGHTS", "")),
+            )
+        return _limiter
+
+
+def create_message(
+    client,
+    limiter: RateLimiter = None,
+    stats: dict = None,
+    telemetry=None,
+    label: str = "",
+    priority: str = None,
+    **kwargs,
+):
+    """スケジューラ経由で client.messages.create(**kwargs) を呼び出す
+
+    priority は優先度クラス（interactive / pipeline / bulk、省略時は pipeline）。
+    telemetry（common.telemetry.Telemetry）を渡すと、失敗した呼出も含めて
+    label 付きで1回分を記録する。
+    """
+    limiter = limiter or get_limiter()
+    estimated = request_tokens(kwargs.get("system"), kwargs.get("messages"))
+    call_stats = {}
+    start = time.monotonic()
+    try:
+        response = limiter.call(
+            lambda: client.messages.create(**kwargs), estimated, call_stats, priority
+        )
+    except Exception as e:
+        if telemetry is not None:
+            telemetry.record(
+                label, kwargs.get("model", ""),
+                call_time=time.monotonic() - start,
+                queue_wait=call_stats.get("queue_wait", 0.0),
+                retries=call_stats.get("retries", 0),
+                error=str(e),
+            )
+        raise
+    finally:
+        if stats is not None:
+            for field, value in call_stats.items():
+                stats[field] = stats.get(field, 0) + value
+
+    usage = usage_of(response)
+    if getattr(response, "usage", None) is not None:
+        limiter.settle(estimated, usage["input_tokens"] + usage["cache_creation_input_tokens"])
+    if telemetry is not None:
+        telemetry.record(
+            label, kwargs.get("model", ""), usage,
+            call_time=time.monotonic() - start,
+            queue_wait=call_stats.get("queue_wait", 0.0),
+            retries=call_stats.get("retries", 0),
+        )
+    return response
@@ -0,0 +1,210 @@
+"""
+長時間相談向けの分割評価（map-reduce）
+
+MAX_TRANSCRIPT_CHARS を超える文字起こしを話者ターン単位でオーバーラップ付きの
+チャンクに分割し、チャンクごとにカテゴリ評価した結果を決定的に統合する。
+
+統合ルール（reduce）:
+    - 項目スコア: チャンク長で重み付けした平均（四捨五入）
+        例外: No.16 ネクストステップ → 最終チャンクのスコア（相談終盤で決まるため）
+              No.21 守秘義務・倫理意識 → 最小値（どこか1箇所の問題で減点）
+    - 根拠: 統合スコアに最も近いチャンクのもの（同点は前のチャンク）
+    - NG語句: 全チャンクの和集合（オーバーラップによる重複は除去）
+"""
+
+import math
+import re
+
+from common.tokens import estimate_tokens
+
+# 話者ラベル行（zoom_to_transcript の format_transcript が出力する形式）
+SPEAKER_HEADER = re.compile(r"^【[^】]{1,20}】\s*$")
+
+ITEM_REDUCE_RULES = {
+    "16": "last",
+    "21": "min",
+}
+
+
+def split_turns(text: str) -> list:
+    """文字起こしを話者ターンに分割する
+
+    【話者N】行があればそこを区切りとし、なければ1行を1ターンとする。
+    """
+    lines = text.split("\n")
+    has_headers = any(SPEAKER_HEADER.match(line.strip()) for line in lines)
+    if not has_headers:
+        return [line + "\n" for line in lines if line.strip()]
+
+    turns = []
+    current = []
+    for line in lines:
+        if SPEAKER_HEADER.match(line.strip()) and current:
+            turns.append("\n".join(current).strip("\n") + "\n")
+            current = []
+        current.append(line)
+    if current and "".join(current).strip():
+        turns.append("\n".join(current).strip("\n") + "\n")
+    return turns
+
+
+def _split_long_turn(turn: str, limit: int) -> list:
+    pieces = []
+    while len(turn) > limit:
+        cut = turn.rfind("。", 0, limit)
+        cut = cut + 1 if cut > limit // 2 else limit
+        pieces.append(turn[:cut])
+        turn = turn[cut:]
+    if turn:
+        pieces.append(turn)
+    return pieces
+
+
+def _pack(turns: list, chunk_chars: int, overlap_chars: int) -> list:
+    chunks = []
+    start = 0
+    while start < len(turns):
+        end = start
+        size = 0
+        while end < len(turns) and (size == 0 or size + len(turns[end]) <= chunk_chars):
+            size += len(turns[end])
+            end += 1
+        chunks.append((start, end))
+        if end >= len(turns):
+            break
+        # 次チャンクの先頭を overlap_chars 分だけ巻き戻す（少なくとも1ターンは前進）
+        back = end
+        carried = 0
+        while overlap_chars and back - 1 > start and carried + len(turns[back - 1]) <= overlap_chars:
+            back -= 1
+            carried += len(turns[back])
+        start = back
+    return chunks
+
+
+def plan_chunks(text: str, chunk_chars: int, overlap_chars: int, token_budget: int) -> dict:
+    """チャンク分割計画を作る
+
+    Args:
+        chunk_chars: 1チャンクの最大文字数
+        overlap_chars: 隣接チャンクで重複させる文字数（ターン単位で丸める）
+        token_budget: 1カテゴリあたり全チャンク合計の文字起こしトークン上限。
+            超過時はまずオーバーラップを外し、それでも超える場合は
+            最初と最後のチャンクを残して中間チャンクを間引く。
+
+    Returns:
+        {"chunks": [{"index", "text", "offset"}], "skipped": [index...],
+         "total": 分割数, "tokens": 送信する文字起こしトークン合計}
+    """
+    turns = []
+    for turn in split_turns(text):
+        turns.extend(_split_long_turn(turn, chunk_chars))
+
+    offsets = []
+    pos = 0
+    for turn in turns:
+        offsets.append(pos)
+        pos += len(turn)
+
+    def build(overlap):
+        return [
+            {"text": "".join(turns[s:e]), "offset": offsets[s] if s < len(offsets) else 0}
+            for s, e in _pack(turns, chunk_chars, overlap)
+        ]
+
+    chunks = build(overlap_chars)
+    if sum(estimate_tokens(c["text"]) for c in chunks) > token_budget and overlap_chars:
+        chunks = build(0)
+    for i, chunk in enumerate(chunks):
+        chunk["index"] = i
+
+    kept = list(chunks)
+    skipped = []
+    while len(kept) > 2 and sum(estimate_tokens(c["text"]) for c in kept) > token_budget:
+        drop = kept[len(kept) // 2]
+        kept.remove(drop)
+        skipped.append(drop["index"])
+
+    return {
+        "chunks": kept,
+        "skipped": sorted(skipped),
+        "total": len(chunks),
+        "tokens": sum(estimate_tokens(c["text"]) for c in kept),
+    }
+
+
+def chunk_text(chunk: dict, total: int) -> str:
+    """チャンク本文の先頭に位置情報の注記を付ける（モデルに部分評価であることを伝える）"""
+    return (
+        f"[注記: この文字起こしは長時間の相談を分割したパート {chunk['index'] + 1}/{total} です。"
+        "このパートに含まれる発言の範囲で評価してください。]\n\n"
+        + chunk["text"]
+    )
+
+
+def _round_half_up(value: float) -> int:
+    return int(math.floor(value + 0.5))
+
+
+def reduce_category(chunk_results: list) -> dict:
+    """チャンクごとのカテゴリ結果を1つの結果に統合する
+
+    Args:
+        chunk_results: [(chunk, result), ...]（chunk["index"] 昇順、result は失敗時 None）
+
+    Returns:
+        call_claude と同じ形式の結果 dict（items / ng_words）、全チャンク失敗時は None
+    """
+    ok = [(c, r) for c, r in sorted(chunk_results, key=lambda x: x[0]["index"]) if r is not None]
+    if not ok:
+        return None
+
+    item_nums = []
+    for _, result in ok:
+        for num in result.get("items", {}):
+            if num not in item_nums:
+                item_nums.append(num)
+
+    items = {}
+    for num in item_nums:
+        scored = []
+        for chunk, result in ok:
+            data = result.get("items", {}).get(num)
+            if data is None:
+                continue
+            score = max(1, min(5, int(data.get("score", 3))))
+            scored.append((chunk, score, data))
+
+        rule = ITEM_REDUCE_RULES.get(num, "mean")
+        if rule == "last":
+            merged = scored[-1][1]
+        elif rule == "min":
+            merged = min(score for _, score, _ in scored)
+        else:
+            weight = sum(len(chunk["text"]) for chunk, _, _ in scored) or 1
+            merged = _round_half_up(
+                sum(score * len(chunk["text"]) for chunk, score, _ in scored) / weight
+            )
+
+        best_chunk, _, best = min(scored, key=lambda x: (abs(x[1] - merged), x[0]["index"]))
+        items[num] = {
+            "evidence": best.get("evidence", ""),
+            "reasoning": best.get("reasoning", ""),
+            "score": merged,
+            "chunk": best_chunk["index"],
+        }
+
+    ng_words = []
+    seen = set()
+    for _, result in ok:
+        ng = result.get("ng_words", [])
+        for word in ng if isinstance(ng, list) else []:
+            if isinstance(word, dict):
+                key = (word.get("category"), word.get("text"), word.get("context"))
+            else:
+                key = (None, str(word), None)
+            if key not in seen:
+                seen.add(key)
+                ng_words.append(word)
+
+    return {"items": items, "ng_words": ng_words}
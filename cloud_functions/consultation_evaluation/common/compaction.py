@@ -0,0 +1,179 @@
+"""
+文字起こしのコンパクション（評価・レポート生成前のトークン削減）
+
+決定的なルールでフィラー・冗長な話者ラベル・空白・認識ノイズを除去する。
+出力文字ごとに元テキストの位置を追跡し、オフセット表（offsets）として返すため、
+コンパクション後のテキストから引用した根拠を元の文字起こしに対応付けられる。
+
+Rules（適用順）:
+    noise           : [音楽] 等のマーカー、同一文字の過剰な連続、連続する同一行
+    fillers         : えー / えっと / あのー / うーん 等のフィラー
+    speaker_headers : 直前と同じ話者の【話者N】ラベル行
+    whitespace      : 連続空白・行末空白・3行以上の空行
+"""
+
+import bisect
+import re
+
+from common.tokens import estimate_tokens
+
+DEFAULT_RULES = ("noise", "fillers", "speaker_headers", "whitespace")
+
+# 文脈によっては意味を持つ語（あの・まあ・なんか）は読点が続く場合のみ除去する
+FILLER_PATTERNS = (
+    r"えー+っと",
+    r"えー+と?",
+    r"ええと",
+    r"えっと",
+    r"あのー+",
+    r"あの(?=[、,])",
+    r"そのー+",
+    r"まあ(?=[、,])",
+    r"なんか(?=[、,])",
+    r"うー+ん",
+    r"んー+",
+)
+
+NOISE_MARKERS = r"\[(?:音楽|拍手|笑|雑音|無音|不明瞭|咳)\]|（(?:笑|咳|雑音|不明瞭)）|♪+"
+
+SPEAKER_LINE = re.compile(r"^[ \t　]*(【[^】\n]{1,20}】)[ \t　]*\n", re.MULTILINE)
+
+_RULE_PATTERNS = {
+    "noise": [
+        (re.compile(NOISE_MARKERS), ""),
+        (re.compile(r"([^\s\d])\1{4,}"), r"\1"),
+        (re.compile(r"^([^\n]+\n)(?:\1)+", re.MULTILINE), r"\1"),
+    ],
+    "fillers": [
+        (re.compile(r"(?:" + "|".join(FILLER_PATTERNS) + r")[、,]?[ 　]?"), ""),
+    ],
+    "whitespace": [
+        (re.compile(r"[ \t　]+(?=\n)"), ""),
+        (re.compile(r"[ \t　]{2,}"), " "),
+        (re.compile(r"\n{3,}"), "\n\n"),
+    ],
+}
+
+
+def _substitute(text: str, index_map: list, pattern, repl):
+    """正規表現置換を行い、出力各文字の元位置（index_map 経由）を追跡する"""
+    out = []
+    new_map = []
+    pos = 0
+    count = 0
+    for m in pattern.finditer(text):
+        start, end = m.span()
+        replacement = repl(m) if callable(repl) else m.expand(repl)
+        if replacement == m.group(0):
+            continue
+        out.append(text[pos:start])
+        new_map.extend(index_map[pos:start])
+        out.append(replacement)
+        if m.group(0).startswith(replacement):
+            new_map.extend(index_map[start:start + len(replacement)])
+        else:
+            new_map.extend([index_map[start]] * len(replacement))
+        pos = end
+        count += 1
+    out.append(text[pos:])
+    new_map.extend(index_map[pos:])
+    return "".join(out), new_map, count
+
+
+def _speaker_header_repl():
+    last = {"speaker": None}
+
+    def repl(m):
+        speaker = m.group(1)
+        if speaker == last["speaker"]:
+            return ""
+        last["speaker"] = speaker
+        return m.group(0)
+
+    return repl
+
+
+def _offset_table(index_map: list) -> list:
+    """出力位置→元位置の対応を [out_start, orig_start, length] の区間列に圧縮する"""
+    table = []
+    for out_pos, orig_pos in enumerate(index_map):
+        if table:
+            seg = table[-1]
+            if out_pos == seg[0] + seg[2] and orig_pos == seg[1] + seg[2]:
+                seg[2] += 1
+                continue
+        table.append([out_pos, orig_pos, 1])
+    return table
+
+
+def compact_transcript(text: str, rules=None) -> dict:
+    """文字起こしをコンパクションする
+
+    Args:
+        text: 元の文字起こし
+        rules: 適用するルール名のリスト（既定: DEFAULT_RULES）
+
+    Returns:
+        {"text": コンパクション後テキスト,
+         "offsets": [[out_start, orig_start, length], ...],
+         "stats": {"chars_before", "chars_after", "tokens_before", "tokens_after", "removed": {rule: 件数}}}
+    """
+    rules = [r for r in DEFAULT_RULES if r in (rules or DEFAULT_RULES)]
+    index_map = list(range(len(text)))
+    current = text
+    removed = {}
+
+    for rule in rules:
+        if rule == "speaker_headers":
+            steps = [(SPEAKER_LINE, _speaker_header_repl())]
+        else:
+            steps = _RULE_PATTERNS[rule]
+        total = 0
+        for pattern, repl in steps:
+            current, index_map, count = _substitute(current, index_map, pattern, repl)
+            total += count
+        removed[rule] = total
+
+    return {
+        "text": current,
+        "offsets": _offset_table(index_map),
+        "stats": {
+            "rules": rules,
+            "chars_before": len(text),
+            "chars_after": len(current),
+            "tokens_before": estimate_tokens(text),
+            "tokens_after": estimate_tokens(current),
+            "removed": removed,
+        },
+    }
+
+
+def to_original_offset(offsets: list, pos: int) -> int:
+    """コンパクション後の位置を元テキストの位置に変換する"""
+    if not offsets:
+        return pos
+    i = bisect.bisect_right([seg[0] for seg in offsets], pos) - 1
+    out_start, orig_start, length = offsets[max(i, 0)]
+    return orig_start + min(max(pos - out_start, 0), length)
+
+
+def to_original_span(offsets: list, start: int, end: int) -> list:
+    """コンパクション後の区間 [start, end) を元テキストの区間に変換する"""
+    if end <= start:
+        s = to_original_offset(offsets, start)
+        return [s, s]
+    return [to_original_offset(offsets, start), to_original_offset(offsets, end - 1) + 1]
+
+
+def locate_quote(compacted: dict, quote: str):
+    """引用文をコンパクション後テキストから探し、元テキストの区間 [start, end) を返す
+
+    見つからない場合は None。
+    """
+    quote = (quote or "").strip()
+    if not quote:
+        return None
+    pos = compacted["text"].find(quote)
+    if pos < 0:
+        return None
+    return to_original_span(compacted["offsets"], pos, pos + len(quote))
@@ -0,0 +1,291 @@
+"""
+Claude 呼出の事前見積もり（トークン数・呼出回数・推定コスト・所要時間）
+
+評価・レポート生成を実行する前に、呼出計画（呼出ごとの入力トークン数と出力トークン数の見込み）
+から推定コストと所要時間を返す（評価 CF の action=estimate、レポート CF の dry_run）。
+入力トークン数は common/tokens.py の概算、コストは common/telemetry.py の PRICING による。
+
+所要時間のモデル（LatencyModel）:
+    1呼出の所要時間（スケジューラの待ち時間を除く）
+        = 基本 + 入力トークン × a + キャッシュ読込トークン × b + 出力トークン × c
+    係数はモデル（DEFAULT_LATENCY の前方一致）ごとに、記録済みの呼出（Telemetry の calls）から
+    最小二乗で当てはめる。記録が少ないうちは DEFAULT_LATENCY に寄せる（PRIOR_CALLS 回分の重み）。
+    当てはめに使うのは再試行・エラーのない呼出だけ（Message Batches 経由は除く）。
+    出力トークン数の見込みはラベル（カテゴリ等）ごとの記録の中央値、記録が無ければ呼出側の既定値。
+
+記録の入手先:
+    ANTHROPIC_LATENCY_MODEL: 当てはめ済みのモデル（LatencyModel.to_dict() の JSON）、または
+        Telemetry の記録を含む JSON（{"calls": [...]}・評価結果 JSON・それらのリスト）のパス
+    このインスタンスで最近実行した呼出（common/telemetry.py の recent_calls）
+
+全体の所要時間は、呼出を段（wave）ごとに同時実行数 concurrency で順に割り当てた完了時刻の
+合計とし、レート制御（ANTHROPIC_RPM / ANTHROPIC_ITPM）で待つ時間の下限と比べて大きい方をとる。
+
+使い方:
+    model = load_latency_model()
+    estimate_calls([{"label": "report", "model": ..., "input_tokens": 40000, "output_tokens": 3000}],
+                   model, concurrency=1)
+"""
+
+import heapq
+import json
+import os
+import statistics
+import threading
+
+from common.telemetry import USAGE_FIELDS, estimate_cost, recent_calls
+
+LATENCY_MODEL_PATH = os.environ.get("ANTHROPIC_LATENCY_MODEL", "")
+
+# 秒: (基本, 入力1トークン, キャッシュ読込1トークン, 出力1トークン)。モデル名の前方一致で引く
+DEFAULT_LATENCY = {
+    "claude-opus-4": (2.5, 0.00005, 0.00001, 0.035),
+    "claude-sonnet-4": (1.5, 0.00003, 0.000006, 0.018),
+    "claude-3-7-sonnet": (1.5, 0.00003, 0.000006, 0.018),
+    "claude-3-5-sonnet": (1.5, 0.00003, 0.000006, 0.018),
+    "claude-haiku-4": (0.8, 0.00001, 0.000002, 0.008),
+    "claude-3-5-haiku": (0.8, 0.00001, 0.000002, 0.015),
+}
+FALLBACK_LATENCY = DEFAULT_LATENCY["claude-sonnet-4"]
+PRIOR_CALLS = 20  # 既定の係数の重み（呼出何回分か）
+FEATURE_SCALES = (1.0, 10000.0, 10000.0, 1000.0)  # 係数を既定値に寄せる強さの目安（各特徴量の典型値）
+
+
+def _family(model: str) -> str:
+    for prefix in DEFAULT_LATENCY:
+        if model.startswith(prefix):
+            return prefix
+    return model
+
+
+def _features(call: dict) -> tuple:
+    return (
+        1.0,
+        float(call.get("input_tokens", 0) + call.get("cache_creation_input_tokens", 0)),
+        float(call.get("cache_read_input_tokens", 0)),
+        float(call.get("output_tokens", 0)),
+    )
+
+
+def _usable(call: dict) -> bool:
+    """当てはめに使える呼出（成功・再試行なし・バッチでない・所要時間あり）"""
+    return (
+        not call.get("error")
+        and not call.get("retries")
+        and not call.get("batch")
+        and call.get("call_time", 0) - call.get("queue_wait", 0) > 0
+        and call.get("output_tokens", 0) > 0
+    )
+
+
+def _solve(a: list, b: list) -> list:
+    """連立一次方程式 a x = b（部分ピボット付きガウス消去、a は正定値を想定）"""
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(col + 1, n):
+            f = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= f * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+
+def _fit_family(calls: list, prior: tuple) -> tuple:
+    """既定値 prior に寄せたリッジ回帰: (XᵀX + Λ) β = Xᵀy + Λ prior"""
+    n = len(prior)
+    penalty = [PRIOR_CALLS * s * s for s in FEATURE_SCALES]
+    a = [[penalty[i] if i == j else 0.0 for j in range(n)] for i in range(n)]
+    b = [penalty[i] * prior[i] for i in range(n)]
+    for call in calls:
+        x = _features(call)
+        y = call["call_time"] - call.get("queue_wait", 0)
+        for i in range(n):
+            b[i] += x[i] * y
+            for j in range(n):
+                a[i][j] += x[i] * x[j]
+    # 負の係数（記録の偏りによる）は既定値に戻す
+    return tuple(c if c >= 0 else p for c, p in zip(_solve(a, b), prior))
+
+
+def calls_from_records(data) -> list:
+    """Telemetry の summary・評価結果 JSON・それらのリストから呼出の記録を取り出す"""
+    if isinstance(data, list):
+        if data and all(isinstance(c, dict) and "call_time" in c for c in data):
+            return data
+        return [call for item in data for call in calls_from_records(item)]
+    if isinstance(data, dict):
+        if isinstance(data.get("calls"), list):
+            return calls_from_records(data["calls"])
+        if isinstance(data.get("telemetry"), dict):
+            return calls_from_records(data["telemetry"])
+    return []
+
+
+class LatencyModel:
+    """モデルごとの呼出所要時間の係数と、ラベルごとの出力トークン数の見込み"""
+
+    def __init__(self, coefficients: dict = None, output_tokens: dict = None, observations: dict = None):
+        self.coefficients = {k: tuple(v) for k, v in {**DEFAULT_LATENCY, **(coefficients or {})}.items()}
+        self.output_tokens = dict(output_tokens or {})
+        self.observations = dict(observations or {})
+
+    @classmethod
+    def fit(cls, calls: list, prior: "LatencyModel" = None) -> "LatencyModel":
+        """呼出の記録から当てはめる（prior の係数・出力見込みを既定値とする）"""
+        prior = prior or cls()
+        by_family = {}
+        outputs = {}
+        for call in calls:
+            if not _usable(call):
+                continue
+            by_family.setdefault(_family(call.get("model", "")), []).append(call)
+            if ":" not in call.get("label", ""):
+                outputs.setdefault(call.get("label", ""), []).append(call["output_tokens"])
+
+        coefficients = dict(prior.coefficients)
+        observations = dict(prior.observations)
+        for family, family_calls in by_family.items():
+            beta = _fit_family(family_calls, prior.coefficients_for(family))
+            residuals = [
+                call["call_time"] - call.get("queue_wait", 0)
+                - sum(c * x for c, x in zip(beta, _features(call)))
+                for call in family_calls
+            ]
+            coefficients[family] = beta
+            observations[family] = {
+                "calls": len(family_calls),
+                "rmse": round(statistics.mean(r * r for r in residuals) ** 0.5, 3),
+            }
+        output_tokens = dict(prior.output_tokens)
+        output_tokens.update({label: int(statistics.median(v)) for label, v in outputs.items()})
+        return cls(coefficients, output_tokens, observations)
+
+    def coefficients_for(self, model: str) -> tuple:
+        return self.coefficients.get(_family(model)) or FALLBACK_LATENCY
+
+    def call_time(self, model: str, call: dict) -> float:
+        """1呼出の所要時間の見込み（秒、スケジューラの待ち時間を除く）"""
+        return sum(c * x for c, x in zip(self.coefficients_for(model), _features(call)))
+
+    def expected_output(self, label: str, default: int) -> int:
+        return self.output_tokens.get(label, default)
+
+    def to_dict(self) -> dict:
+        return {
+            "coefficients": {k: [round(c, 9) for c in v] for k, v in self.coefficients.items()},
+            "output_tokens": self.output_tokens,
+            "observations": self.observations,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyModel":
+        return cls(data.get("coefficients"), data.get("output_tokens"), data.get("observations"))
+
+
+# ── Module-level model ──
+_file_model = None
+_file_calls = []
+_file_lock = threading.Lock()
+
+
+def _load_file():
+    """ANTHROPIC_LATENCY_MODEL を1回だけ読む（当てはめ済みモデル、または呼出の記録）"""
+    global _file_model, _file_calls
+    with _file_lock:
+        if _file_model is None:
+            _file_model = LatencyModel()
+            if LATENCY_MODEL_PATH:
+                try:
+                    with open(LATENCY_MODEL_PATH, encoding="utf-8") as f:
+                        data = json.load(f)
+                    if isinstance(data, dict) and "coefficients" in data:
+                        _file_model = LatencyModel.from_dict(data)
+                    else:
+                        _file_calls = calls_from_records(data)
+                except (OSError, ValueError) as e:
+                    print(f"Latency model not loaded from {LATENCY_MODEL_PATH}: {e}")
+        return _file_model, _file_calls
+
+
+def load_latency_model() -> LatencyModel:
+    """ANTHROPIC_LATENCY_MODEL とこのインスタンスの最近の呼出から当てはめたモデルを返す"""
+    prior, calls = _load_file()
+    calls = calls + recent_calls()
+    return LatencyModel.fit(calls, prior) if calls else prior
+
+
+def makespan(durations: list, concurrency: int) -> float:
+    """所要時間のリストを順に、空いた枠（同時実行数 concurrency）へ割り当てたときの完了時刻"""
+    slots = [0.0] * max(1, min(concurrency, len(durations)))
+    for duration in durations:
+        heapq.heapreplace(slots, slots[0] + duration)
+    return max(slots) if durations else 0.0
+
+
+def rate_limit_floor(calls: list, rpm: float = 0, itpm: float = 0) -> float:
+    """RPM/ITPM の予算（1分分のバケットが満杯から始まる）で最低限かかる秒数"""
+    floor = 0.0
+    if rpm and len(calls) > rpm:
+        floor = max(floor, (len(calls) - rpm) / rpm * 60)
+    tokens = sum(c.get("input_tokens", 0) + c.get("cache_creation_input_tokens", 0) for c in calls)
+    if itpm and tokens > itpm:
+        floor = max(floor, (tokens - itpm) / itpm * 60)
+    return floor
+
+
+def estimate_calls(
+    calls: list,
+    latency_model: LatencyModel,
+    concurrency: int = 1,
+    rpm: float = 0,
+    itpm: float = 0,
+) -> dict:
+    """呼出計画の合計トークン数・推定コスト・所要時間
+
+    calls の各要素は {"label", "model", USAGE_FIELDS の見込み, "wave"（省略時 0）}。
+    同じ wave の呼出は並列に、wave は番号順に実行するものとして所要時間を見積もる。
+    """
+    totals = {field: 0 for field in USAGE_FIELDS}
+    by_label = {}
+    waves = {}
+    cost = 0.0
+    call_time = 0.0
+    for call in calls:
+        seconds = latency_model.call_time(call["model"], call)
+        call_cost = estimate_cost(call["model"], call)
+        cost += call_cost
+        call_time += seconds
+        waves.setdefault(call.get("wave", 0), []).append(seconds)
+        label = by_label.setdefault(call["label"], {"calls": 0, **{f: 0 for f in USAGE_FIELDS},
+                                                    "cost_usd": 0.0, "call_time": 0.0})
+        label["calls"] += 1
+        label["cost_usd"] += call_cost
+        label["call_time"] += seconds
+        for field in USAGE_FIELDS:
+            totals[field] += call.get(field, 0)
+            label[field] += call.get(field, 0)
+
+    schedule = sum(makespan(durations, concurrency) for _, durations in sorted(waves.items()))
+    floor = rate_limit_floor(calls, rpm, itpm)
+    for label in by_label.values():
+        label["cost_usd"] = round(label["cost_usd"], 6)
+        label["call_time"] = round(label["call_time"], 2)
+    return {
+        "calls": len(calls),
+        **totals,
+        "cost_usd": round(cost, 6),
+        "call_time": round(call_time, 2),
+        "wall_time": round(max(schedule, floor), 2),
+        "rate_limit_floor": round(floor, 2),
+        "by_label": dict(sorted(by_label.items())),
+    }
+
+
+def latency_model_info(latency_model: LatencyModel) -> dict:
+    """応答に添える所要時間モデルの出所（読み込んだファイル・モデルごとの当てはめた呼出数と残差）"""
+    return {"file": LATENCY_MODEL_PATH or None, "fitted": latency_model.observations}
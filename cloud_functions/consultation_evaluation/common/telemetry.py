@@ -0,0 +1,149 @@
+"""
+Claude 呼出の計測（所要時間・待ち時間・トークン数・再試行・推定コスト）
+
+1回の評価・レポート生成ごとに Telemetry を作って create_message に渡すと、
+呼出ごとの記録を取り、ラベル（カテゴリ等）別と全体の集計を返す。
+集計は応答 JSON や保存する結果ファイルの "telemetry" にそのまま入れる。
+
+コストは PRICING（USD / 100万トークン）による推定値。Message Batches 経由の呼出は
+BATCH_DISCOUNT を掛ける。表に無いモデルのコストは 0 として数え、unpriced に名前を残す。
+
+記録した呼出はプロセス内の直近 RECENT_CALLS 件も残し（recent_calls）、事前見積もりの
+所要時間モデルの当てはめに使う（common/estimate.py）。
+
+使い方:
+    telemetry = Telemetry()
+    response = create_message(client, telemetry=telemetry, label="c1", model=..., messages=[...])
+    telemetry.summary()  # {"total": {...}, "by_label": {...}, "calls": [...]}
+"""
+
+import threading
+from collections import deque
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+# USD / 100万トークン: (入力, 出力, キャッシュ書込, キャッシュ読込)。モデル名の前方一致で引く
+PRICING = {
+    "claude-opus-4": (15.0, 75.0, 18.75, 1.50),
+    "claude-sonnet-4": (3.0, 15.0, 3.75, 0.30),
+    "claude-3-7-sonnet": (3.0, 15.0, 3.75, 0.30),
+    "claude-3-5-sonnet": (3.0, 15.0, 3.75, 0.30),
+    "claude-haiku-4": (1.0, 5.0, 1.25, 0.10),
+    "claude-3-5-haiku": (0.80, 4.0, 1.0, 0.08),
+}
+BATCH_DISCOUNT = 0.5
+RECENT_CALLS = 500
+
+_recent = deque(maxlen=RECENT_CALLS)
+
+
+def usage_of(response) -> dict:
+    """応答のトークン使用量を dict で返す（無い項目は 0）"""
+    usage = getattr(response, "usage", None)
+    return {field: getattr(usage, field, 0) or 0 for field in USAGE_FIELDS}
+
+
+def model_pricing(model: str):
+    for prefix, prices in PRICING.items():
+        if model.startswith(prefix):
+            return prices
+    return None
+
+
+def estimate_cost(model: str, usage: dict, batch: bool = False) -> float:
+    """使用量の推定コスト（USD）。料金表に無いモデルは 0"""
+    prices = model_pricing(model)
+    if prices is None:
+        return 0.0
+    cost = sum(usage.get(field, 0) * price for field, price in zip(USAGE_FIELDS, prices)) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def recent_calls() -> list:
+    """このプロセスで最近記録した呼出（全 Telemetry 共通、古い順）"""
+    return list(_recent)
+
+
+def _empty_totals() -> dict:
+    totals = {"calls": 0, "errors": 0, "call_time": 0.0, "queue_wait": 0.0, "retries": 0}
+    totals.update({field: 0 for field in USAGE_FIELDS})
+    totals["cost_usd"] = 0.0
+    return totals
+
+
+def _add(totals: dict, call: dict):
+    totals["calls"] += 1
+    totals["errors"] += bool(call["error"])
+    for field in ("call_time", "queue_wait", "retries", "cost_usd", *USAGE_FIELDS):
+        totals[field] += call[field]
+
+
+def _rounded(totals: dict) -> dict:
+    out = dict(totals)
+    out["call_time"] = round(out["call_time"], 2)
+    out["queue_wait"] = round(out["queue_wait"], 2)
+    out["cost_usd"] = round(out["cost_usd"], 6)
+    return out
+
+
+class Telemetry:
+    """1回の処理に含まれる Claude 呼出の記録（スレッドセーフ）"""
+
+    def __init__(self):
+        self._calls = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        label: str,
+        model: str,
+        usage: dict = None,
+        call_time: float = 0.0,
+        queue_wait: float = 0.0,
+        retries: int = 0,
+        error: str = None,
+        batch: bool = False,
+    ) -> dict:
+        """呼出1回分を記録する。call_time はスケジューラの待ち時間を含む所要時間（秒）"""
+        usage = usage or {}
+        call = {
+            "label": label,
+            "model": model,
+            "call_time": round(call_time, 3),
+            "queue_wait": round(queue_wait, 3),
+            "retries": retries,
+            **{field: usage.get(field, 0) for field in USAGE_FIELDS},
+            "cost_usd": round(estimate_cost(model, usage, batch), 6),
+            "batch": batch,
+            "error": error,
+        }
+        with self._lock:
+            self._calls.append(call)
+        _recent.append(call)
+        return call
+
+    def calls(self) -> list:
+        with self._lock:
+            return list(self._calls)
+
+    def summary(self, include_calls: bool = True) -> dict:
+        """全体（total）・ラベル別（by_label）の集計と呼出ごとの記録（calls）"""
+        calls = self.calls()
+        total = _empty_totals()
+        by_label = {}
+        for call in calls:
+            _add(total, call)
+            _add(by_label.setdefault(call["label"], _empty_totals()), call)
+        summary = {
+            "total": _rounded(total),
+            "by_label": {label: _rounded(t) for label, t in sorted(by_label.items())},
+            "unpriced": sorted({c["model"] for c in calls if model_pricing(c["model"]) is None}),
+        }
+        if include_calls:
+            summary["calls"] = calls
+        return summary
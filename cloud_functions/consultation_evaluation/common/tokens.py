@@ -0,0 +1,11 @@
+"""
+トークン数の概算（API呼出なしでのローカル見積もり用）
+"""
+
+import math
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（日本語は1文字≒1トークン、ASCIIは4文字≒1トークン）"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil((len(text) - ascii_chars) + ascii_chars / 4)
@@ -0,0 +1,1936 @@
+"""
+評価エンジン（Cloud Function・eval-app 共通）
+
+文字起こしの評価の本体。呼出計画（plan_evaluation）、カテゴリ呼出・再試行・JSON 修復、
+並列実行・結果キャッシュ・evaluation_id ごとの再開、分割評価の統合、NG語句・根拠引用の照合、
+tiered / samples、スコアの集計とスケーリング、事前見積もり（estimate_evaluation）までを持つ。
+main.py（HTTP エントリポイント・ジョブ）と eval-app の modules/evaluator.py はこのモジュールの
+薄いラッパーで、同じ入力・同じオプションなら同じ結果を返す。
+
+Claude への呼出はトランスポートを経由する（evaluate_transcript の transport）:
+    ApiTransport:    Messages API を直接呼ぶ（既定）。共有のレート制御スケジューラ（common/ratelimit.py）を
+                     経由し、ANTHROPIC_REPLAY_MODE=record / replay では記録・再生クライアントを使う
+    ReplayTransport: 指定ディレクトリの記録から応答する（環境変数によらない再生、API キー不要）
+    BatchTransport:  Message Batches API に全呼出をまとめて投入し、完了後の結果を各呼出に返す
+                     （evaluate_batch。料金はおよそ半額、結果は最大24時間後）
+evaluate_many は複数の文字起こしを並行して評価し、全カテゴリ呼出で1つの同時実行数を共有する
+（LimitedTransport でトランスポートを包む）。
+
+結果の "categories" は 90点満点に換算したカテゴリ得点、"category_scores" はカテゴリ小計（素点）。
+
+設定は環境変数（一覧は main.py の Optional env）。バッチモードのみ:
+    EVAL_BATCH_BASE_URL: Batches API の接続先（スタンドインサーバー等、空なら本番API）
+    EVAL_BATCH_POLL_INTERVAL: 完了確認の間隔秒 (default: 60)
+    EVAL_BATCH_TIMEOUT: 完了を待つ上限秒 (default: 86400)
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from chunking import chunk_text, plan_chunks, reduce_category
+from common.clients import anthropic_client
+from common.compaction import DEFAULT_RULES, compact_transcript, locate_quote
+from common.estimate import estimate_calls, latency_model_info, load_latency_model
+from common.ratelimit import RETRY_STATUS, create_message, get_limiter, request_tokens
+from common.replay import ReplayClient, request_key
+from common.telemetry import Telemetry
+from common.tokens import estimate_tokens
+from evidence import (
+    EvidenceIndex,
+    reask_prompt,
+    summarize_verifications,
+    unlocated_items,
+    verify_evidence,
+)
+from json_repair import REPAIR_PROMPT, REPAIR_SYSTEM_PROMPT, parse_json_response
+from ng_scan import apply_ng_mode, scan_transcript, summarize_hits
+from retrieval import BM25Index, item_queries, segment, select_context
+from result_cache import (
+    PartialResults,
+    ResultCache,
+    category_key,
+    normalize_transcript,
+    sha256,
+)
+from sampling import merge_samples, sample_cost, sampling_report
+from single_call import SINGLE_MAX_TOKENS, build_single_prompt, split_result
+from tiers import ESCALATE_REASONS, escalation_reasons, tier_savings
+from store import get_store
+
+if TYPE_CHECKING:
+    import anthropic  # 実行時は common/clients.py が初回の評価で import する
+
+# ── Config ──
+ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
+MODEL = "claude-sonnet-4-20250514"
+MAX_TRANSCRIPT_CHARS = 120000  # Claude context limit safety margin
+EVAL_PARALLEL = os.environ.get("EVAL_PARALLEL", "true").lower() != "false"
+EVAL_CONCURRENCY = int(os.environ.get("EVAL_CONCURRENCY", "6"))
+EVAL_CALL_TIMEOUT = float(os.environ.get("EVAL_CALL_TIMEOUT", "240"))
+EVAL_PROMPT_CACHE = os.environ.get("EVAL_PROMPT_CACHE", "false").lower() == "true"
+EVAL_CACHE_BACKEND = os.environ.get("EVAL_CACHE_BACKEND", "none")
+EVAL_CACHE_LOCATION = os.environ.get("EVAL_CACHE_LOCATION", "/tmp/eval_cache")
+EVAL_JOB_BACKEND = os.environ.get("EVAL_JOB_BACKEND", "local")
+EVAL_JOB_LOCATION = os.environ.get("EVAL_JOB_LOCATION", "/tmp/eval_jobs")
+EVAL_RECORD_TTL_HOURS = float(os.environ.get("EVAL_RECORD_TTL_HOURS", "168"))
+EVAL_LONG_MODE = os.environ.get("EVAL_LONG_MODE", "truncate")
+EVAL_CHUNK_CHARS = int(os.environ.get("EVAL_CHUNK_CHARS", "60000"))
+EVAL_CHUNK_OVERLAP_CHARS = int(os.environ.get("EVAL_CHUNK_OVERLAP_CHARS", "3000"))
+EVAL_TOKEN_BUDGET = int(os.environ.get("EVAL_TOKEN_BUDGET", "300000"))
+EVAL_COMPACT = os.environ.get("EVAL_COMPACT", "false").lower() == "true"
+EVAL_COMPACT_RULES = [
+    r.strip() for r in os.environ.get("EVAL_COMPACT_RULES", ",".join(DEFAULT_RULES)).split(",")
+    if r.strip()
+]
+EVAL_CONTEXT_MODE = os.environ.get("EVAL_CONTEXT_MODE", "full")
+EVAL_PASSAGE_CHARS = int(os.environ.get("EVAL_PASSAGE_CHARS", "800"))
+EVAL_RETRIEVAL_TOKENS = int(os.environ.get("EVAL_RETRIEVAL_TOKENS", "20000"))
+EVAL_ENGINE = os.environ.get("EVAL_ENGINE", "split")
+EVAL_CATEGORY_RETRIES = int(os.environ.get("EVAL_CATEGORY_RETRIES", "2"))
+EVAL_RETRY_BASE = float(os.environ.get("EVAL_RETRY_BASE", "2"))
+EVAL_NG_MODE = os.environ.get("EVAL_NG_MODE", "llm")
+EVAL_EVIDENCE_CHECK = os.environ.get("EVAL_EVIDENCE_CHECK", "flag")
+EVAL_EVIDENCE_MIN_SIMILARITY = float(os.environ.get("EVAL_EVIDENCE_MIN_SIMILARITY", "0.7"))
+EVAL_TIERED = os.environ.get("EVAL_TIERED", "false").lower() == "true"
+EVAL_FAST_MODEL = os.environ.get("EVAL_FAST_MODEL", "claude-3-5-haiku-20241022")
+EVAL_ESCALATE_ON = tuple(
+    r.strip() for r in os.environ.get("EVAL_ESCALATE_ON", ",".join(ESCALATE_REASONS)).split(",")
+    if r.strip()
+)
+EVAL_ESCALATE_SCORES = tuple(
+    int(v) for v in os.environ.get("EVAL_ESCALATE_SCORES", "3").split(",") if v.strip()
+)
+EVAL_ESCALATE_MIN_ITEMS = int(os.environ.get("EVAL_ESCALATE_MIN_ITEMS", "2"))
+EVAL_TIER_LATENCY_RATIO = float(os.environ.get("EVAL_TIER_LATENCY_RATIO", "2.0"))
+EVAL_SAMPLES = int(os.environ.get("EVAL_SAMPLES", "1"))
+EVAL_SAMPLE_TEMPERATURE = float(os.environ.get("EVAL_SAMPLE_TEMPERATURE", "1.0"))
+EVAL_SAMPLE_BUDGET_USD = float(os.environ.get("EVAL_SAMPLE_BUDGET_USD", "0"))
+EVAL_SAMPLE_DEADLINE = float(os.environ.get("EVAL_SAMPLE_DEADLINE", "0"))
+EVAL_MULTI_CONCURRENCY = int(os.environ.get("EVAL_MULTI_CONCURRENCY", "12"))
+EVAL_BATCH_BASE_URL = os.environ.get("EVAL_BATCH_BASE_URL", "")
+EVAL_BATCH_POLL_INTERVAL = float(os.environ.get("EVAL_BATCH_POLL_INTERVAL", "60"))
+EVAL_BATCH_TIMEOUT = float(os.environ.get("EVAL_BATCH_TIMEOUT", str(24 * 3600)))
+BATCH_MAX_REQUESTS = 10000  # 1バッチあたりの投入リクエスト数（API上限 100,000 件・256MB 未満に抑える）
+
+# ── Prompt loading ──
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+def load_prompt(filename: str) -> str:
+    """Load a prompt template from the prompts directory."""
+    path = PROMPTS_DIR / filename
+    if path.exists():
+        return path.read_text(encoding="utf-8")
+    return ""
+
+SYSTEM_PROMPT = load_prompt("system.txt")
+
+CALL_PROMPTS = [
+    ("c1", "call1_problem.txt"),
+    ("c2", "call2_solution.txt"),
+    ("c3", "call3_communication.txt"),
+    ("c4", "call4_time.txt"),
+    ("c5", "call5_logic.txt"),
+    ("c6", "call6_ethics.txt"),
+]
+
+# engine=single 用の一括評価テンプレート（カテゴリ部分は CALL_PROMPTS から埋め込む）
+SINGLE_PROMPT_FILE = "call_all.txt"
+SINGLE_GROUP = "all"
+
+# ── Category metadata ──
+CATEGORY_MAX_SCORES = {
+    "c1": 20,  # 4 items x 5 points
+    "c2": 25,  # 5 items x 5 points
+    "c3": 20,  # 4 items x 5 points
+    "c4": 15,  # 3 items x 5 points
+    "c5": 15,  # 3 items x 5 points
+    "c6": 15,  # 3 items x 5 points
+}  # Total max: 110 points raw, scaled to 90
+
+TOTAL_RAW_MAX = sum(CATEGORY_MAX_SCORES.values())  # 110
+AI_SCALED_MAX = 90
+
+# Output token limit per model (prefix match); requests never ask for more
+MAX_OUTPUT_TOKENS = {
+    "claude-opus-4": 32000,
+    "claude-sonnet-4": 64000,
+    "claude-3-7-sonnet": 64000,
+    "claude-3-5-sonnet": 8192,
+    "claude-haiku-4": 64000,
+    "claude-3-5-haiku": 8192,
+}
+
+
+def output_limit(model: str, max_tokens: int) -> int:
+    """``max_tokens`` capped at the output limit of ``model`` (unknown models are not capped)."""
+    for prefix, limit in MAX_OUTPUT_TOKENS.items():
+        if model.startswith(prefix):
+            return min(max_tokens, limit)
+    return max_tokens
+
+# ── Result cache ──
+_result_cache = None
+
+
+def get_result_cache():
+    """Return the module-level result cache, or None if disabled."""
+    global _result_cache
+    if _result_cache is None:
+        store = get_store(EVAL_CACHE_BACKEND, EVAL_CACHE_LOCATION)
+        if store is None:
+            return None
+        _result_cache = ResultCache(store)
+    return _result_cache
+
+
+# ── Partial results (resume by evaluation_id) ──
+_partial_results = None
+
+
+def get_partial_results() -> PartialResults:
+    """Partial results live in the job store so that any instance can resume.
+
+    That needs a shared store (EVAL_JOB_BACKEND=gcs); the default local one
+    is per instance, so a retry routed elsewhere starts over.
+    """
+    global _partial_results
+    if _partial_results is None:
+        _partial_results = PartialResults(
+            get_store(EVAL_JOB_BACKEND, EVAL_JOB_LOCATION), max_age=EVAL_RECORD_TTL_HOURS * 3600
+        )
+    return _partial_results
+
+
+def scale_to_90(raw_total: int) -> int:
+    """Scale raw score (0-110) to AI score (0-90)."""
+    if raw_total <= 0:
+        return 0
+    return round(raw_total * AI_SCALED_MAX / TOTAL_RAW_MAX)
+
+
+def scale_category(raw_score: int, category: str) -> float:
+    """Scale individual category score proportionally to 90-point total."""
+    max_raw = CATEGORY_MAX_SCORES.get(category, 15)
+    if max_raw == 0:
+        return 0
+    return round(raw_score * (max_raw / TOTAL_RAW_MAX) * AI_SCALED_MAX, 1)
+
+
+# ── Claude API call ──
+
+# Shared-prefix layout: the transcript is sent as the first user block (marked
+# cacheable) and each category prompt refers back to it instead of embedding it.
+TRANSCRIPT_PREFIX = "以下は評価対象となる経営相談の文字起こしテキストです。\n\n<transcript>\n{transcript}\n</transcript>"
+TRANSCRIPT_REFERENCE = "（上記 <transcript> タグ内の文字起こしテキストを参照）"
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+def build_messages(prompt: str, transcript: str, prompt_cache: bool = False):
+    """Build (system, messages) for a category call.
+
+    With ``prompt_cache`` the system prompt and transcript form an identical
+    prefix across all six category calls, so calls 2-6 read it from cache.
+    """
+    if not prompt_cache:
+        user_content = prompt.replace("{transcript}", transcript)
+        return SYSTEM_PROMPT, [{"role": "user", "content": user_content}]
+
+    system = [{"type": "text", "text": SYSTEM_PROMPT}]
+    content = [
+        {
+            "type": "text",
+            "text": TRANSCRIPT_PREFIX.format(transcript=transcript),
+            "cache_control": {"type": "ephemeral"},
+        },
+        {"type": "text", "text": prompt.replace("{transcript}", TRANSCRIPT_REFERENCE)},
+    ]
+    return system, [{"role": "user", "content": content}]
+
+
+def message_params(
+    prompt: str,
+    transcript: str,
+    prompt_cache: bool = False,
+    max_tokens: int = 4096,
+    model: str = None,
+    temperature: float = 0,
+) -> dict:
+    """messages.create arguments of a category call (shared by every transport).
+
+    ``max_tokens`` is capped at the model's output limit (output_limit), e.g.
+    the single-call budget for the fast model of a tiered run.
+    """
+    model = model or MODEL
+    system, messages = build_messages(prompt, transcript, prompt_cache)
+    return {
+        "model": model,
+        "max_tokens": output_limit(model, max_tokens),
+        "temperature": temperature,
+        "system": system,
+        "messages": messages,
+    }
+
+
+def extract_usage(response) -> dict:
+    """Token usage of a response as a plain dict (missing fields count as 0)."""
+    usage = getattr(response, "usage", None)
+    return {field: getattr(usage, field, 0) or 0 for field in USAGE_FIELDS}
+
+
+def sum_usage(usages) -> dict:
+    total = {field: 0 for field in USAGE_FIELDS}
+    for usage in usages:
+        for field in USAGE_FIELDS:
+            total[field] += usage.get(field, 0)
+    return total
+
+
+# ── Transports ──
+
+class ApiTransport:
+    """Call the Messages API directly, through the shared rate-limit scheduler.
+
+    ``client`` defaults to the process-wide client of common/clients.py
+    (recording or replaying per ANTHROPIC_REPLAY_MODE), created on first use.
+    """
+
+    name = "api"
+    retry = True  # run_category retries failed calls
+
+    def __init__(self, client: "anthropic.Anthropic" = None, api_key: str = None):
+        self._client = client
+        self.api_key = api_key
+
+    @property
+    def client(self):
+        if self._client is None:
+            # ウォームインスタンスでは接続プールごと再利用する（429/529 の再試行はスケジューラが行う）
+            self._client = anthropic_client(self.api_key or ANTHROPIC_API_KEY)
+        return self._client
+
+    def create(self, stats=None, telemetry=None, label="", priority=None, **params):
+        return create_message(
+            self.client, stats=stats, telemetry=telemetry, label=label, priority=priority, **params
+        )
+
+
+class LimitedTransport:
+    """Wrap a transport so that at most ``limit`` of its calls are in flight.
+
+    Shared by the evaluations of one evaluate_many call, it is their global
+    concurrency limit; a call holds its slot while the scheduler delays it.
+    """
+
+    def __init__(self, transport, limit: int):
+        self.transport = transport
+        self.name = transport.name
+        self.retry = transport.retry
+        self._slots = threading.BoundedSemaphore(max(1, limit))
+
+    def create(self, **kwargs):
+        with self._slots:
+            return self.transport.create(**kwargs)
+
+
+class ReplayTransport(ApiTransport):
+    """Answer from recordings in ``directory`` (common/replay.py) regardless of the environment."""
+
+    name = "replay"
+
+    def __init__(self, directory, latency="recorded", **replay_options):
+        super().__init__(ReplayClient(directory, latency=latency, **replay_options))
+
+
+class BatchTransport:
+    """Message Batches API: submit every call up front, then answer calls from the results.
+
+    ``run`` submits ``{custom_id: params}`` (in batches of ``max_requests``)
+    and polls until all have ended; ``create`` then returns the result of
+    the request with the same parameters, without waiting or retrying.
+    Calls that were not submitted or did not succeed raise RuntimeError.
+    """
+
+    name = "batch"
+    retry = False
+
+    def __init__(
+        self,
+        client: "anthropic.Anthropic" = None,
+        poll_interval: float = None,
+        timeout: float = None,
+        max_requests: int = BATCH_MAX_REQUESTS,
+    ):
+        self._client = client
+        self.poll_interval = poll_interval or EVAL_BATCH_POLL_INTERVAL
+        self.timeout = timeout or EVAL_BATCH_TIMEOUT
+        self.max_requests = max_requests
+        self.batch_ids = []
+        self._results = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            import anthropic
+
+            self._client = anthropic.Anthropic(base_url=EVAL_BATCH_BASE_URL or None)
+        return self._client
+
+    def run(self, requests: dict, progress_callback=None):
+        """Submit the requests and wait until every batch has ended."""
+        client = self.client
+        custom_ids = list(requests)
+        started = time.monotonic()
+        for i in range(0, len(custom_ids), self.max_requests):
+            part = custom_ids[i:i + self.max_requests]
+            batch = client.messages.batches.create(
+                requests=[{"custom_id": cid, "params": requests[cid]} for cid in part]
+            )
+            self.batch_ids.append(batch.id)
+            print(f"Batch submitted: {batch.id} ({len(part)} requests)")
+
+        pending = list(self.batch_ids)
+        counts = {}
+        while pending:
+            for batch_id in list(pending):
+                batch = client.messages.batches.retrieve(batch_id)
+                c = batch.request_counts
+                counts[batch_id] = c.succeeded + c.errored + c.canceled + c.expired
+                if batch.processing_status == "ended":
+                    pending.remove(batch_id)
+            if progress_callback:
+                done = sum(counts.values())
+                progress_callback(done, len(custom_ids), f"バッチ処理中...（{done}/{len(custom_ids)}件完了）")
+            if not pending:
+                break
+            if time.monotonic() > started + self.timeout:
+                raise TimeoutError(f"Batches {', '.join(pending)} did not end within {self.timeout:.0f}s")
+            time.sleep(self.poll_interval)
+
+        for batch_id in self.batch_ids:
+            for entry in client.messages.batches.results(batch_id):
+                self._results[request_key(requests[entry.custom_id])] = entry
+
+    def create(self, stats=None, telemetry=None, label="", priority=None, **params):
+        entry = self._results.get(request_key(params))
+        if entry is None:
+            raise RuntimeError(f"{label}: not in the batch")
+        if entry.result.type != "succeeded":
+            if telemetry:
+                telemetry.record(label, params["model"], error=entry.result.type, batch=True)
+            raise RuntimeError(f"{entry.custom_id}: {entry.result.type}")
+        message = entry.result.message
+        if telemetry:
+            # バッチ内の個々の呼出の所要時間は分からないため 0（全体は latency）
+            telemetry.record(label, message.model or params["model"], extract_usage(message), batch=True)
+        return message
+
+
+class IncompleteResultError(ValueError):
+    """A parsed response is missing some of the items it was asked to score."""
+
+
+def missing_items(result: dict, expected_items: dict) -> list:
+    """Item numbers of ``expected_items`` ({cat_key: [item numbers]}) without a score in ``result``.
+
+    A result with several categories is the single-call form (split_result).
+    """
+    if len(expected_items) > 1 or "items" not in (result or {}):
+        parts = split_result(result, list(expected_items))
+    else:
+        parts = {cat_key: result for cat_key in expected_items}
+    missing = []
+    for cat_key, nums in expected_items.items():
+        items = (parts.get(cat_key) or {}).get("items")
+        items = items if isinstance(items, dict) else {}
+        missing += [
+            num for num in nums
+            if not isinstance(items.get(num), dict) or items[num].get("score") is None
+        ]
+    return missing
+
+
+def check_items(result: dict, expected_items: dict, label: str = "") -> dict:
+    """Return ``result`` if it scores every expected item, else raise IncompleteResultError."""
+    if expected_items:
+        missing = missing_items(result, expected_items)
+        if missing:
+            raise IncompleteResultError(
+                f"{label}: items {', '.join(missing)} missing from the response"
+            )
+    return result
+
+
+def call_claude(
+    transport: ApiTransport,
+    prompt: str,
+    transcript: str,
+    timeout: float = None,
+    prompt_cache: bool = False,
+    max_tokens: int = 4096,
+    stats: dict = None,
+    telemetry: Telemetry = None,
+    label: str = "",
+    model: str = None,
+    temperature: float = 0,
+    priority: str = None,
+    expected_items: dict = None,
+):
+    """Call Claude API with a specific evaluation prompt.
+
+    The call goes through ``transport`` (for ApiTransport the shared
+    rate-limit scheduler); ``stats`` collects
+    its queue wait and retries, ``telemetry`` records each call under ``label``
+    (a repair call under ``"{label}:repair"``) and ``priority`` is its
+    scheduling class.  ``model`` defaults to MODEL.
+
+    A response cut off at ``max_tokens`` is continued once (``"{label}:continue"``).
+    With ``expected_items`` ({cat_key: [item numbers]}) a parsed result that
+    lacks any of them, e.g. a truncated response closed by the JSON repair,
+    raises IncompleteResultError instead of being returned.
+    Returns (parsed JSON result, token usage).
+    """
+    kwargs = {}
+    if timeout:
+        kwargs["timeout"] = timeout
+
+    params = message_params(prompt, transcript, prompt_cache, max_tokens, model, temperature)
+    response = transport.create(
+        stats=stats, telemetry=telemetry, label=label, priority=priority, **params, **kwargs,
+    )
+    usage = extract_usage(response)
+    text = response.content[0].text.rstrip()
+
+    if getattr(response, "stop_reason", None) == "max_tokens":
+        # Cut off mid-JSON: let the model continue from where it stopped
+        print(f"{label}: response hit max_tokens, continuing it")
+        continued = transport.create(
+            stats=stats,
+            telemetry=telemetry,
+            label=f"{label}:continue",
+            priority=priority,
+            **dict(params, messages=params["messages"] + [{"role": "assistant", "content": text}]),
+            **kwargs,
+        )
+        usage = sum_usage([usage, extract_usage(continued)])
+        text = (text + continued.content[0].text).rstrip()
+
+    text = text.strip()
+    try:
+        return check_items(parse_json_response(text), expected_items, label), usage
+    except json.JSONDecodeError as e:
+        print(f"Malformed JSON ({e}), asking for a repaired copy")
+
+    # Ask only for the syntax fix; the transcript is not sent again
+    repair = transport.create(
+        stats=stats,
+        telemetry=telemetry,
+        label=f"{label}:repair",
+        priority=priority,
+        model=params["model"],
+        max_tokens=params["max_tokens"],
+        temperature=0,
+        system=REPAIR_SYSTEM_PROMPT,
+        messages=[{"role": "user", "content": REPAIR_PROMPT.format(text=text)}],
+        **kwargs,
+    )
+    usage = sum_usage([usage, extract_usage(repair)])
+    return check_items(parse_json_response(repair.content[0].text), expected_items, label), usage
+
+
+# ── Main evaluation pipeline ──
+
+def run_category(
+    transport: ApiTransport,
+    cat_key: str,
+    prompt_template: str,
+    transcript: str,
+    timeout: float = None,
+    prompt_cache: bool = False,
+    max_tokens: int = 4096,
+    telemetry: Telemetry = None,
+    model: str = None,
+    priority: str = None,
+    expected_items: dict = None,
+) -> dict:
+    """Run one category call and return its result, error, usage, latency and scheduling stats.
+
+    Failed calls are retried up to EVAL_CATEGORY_RETRIES times with jittered
+    backoff.  Not retried: client errors (4xx), 429/529 (the scheduler has
+    already backed off and retried those up to ANTHROPIC_MAX_RETRIES times)
+    and calls of a transport without ``retry`` (batch results).  A response
+    missing any of ``expected_items`` counts as a failed call (call_claude),
+    so an incomplete result is retried and never returned as the result.
+    """
+    start = time.monotonic()
+    result = None
+    error = None
+    usage = {}
+    stats = {}
+    attempts = 0
+    retries = EVAL_CATEGORY_RETRIES if transport.retry else 0
+    while True:
+        attempts += 1
+        try:
+            result, usage = call_claude(
+                transport, prompt_template, transcript, timeout=timeout, prompt_cache=prompt_cache,
+                max_tokens=max_tokens, stats=stats, telemetry=telemetry, label=cat_key,
+                model=model, priority=priority, expected_items=expected_items,
+            )
+            error = None
+            break
+        except Exception as e:
+            print(f"Error in {cat_key} (attempt {attempts}): {e}")
+            traceback.print_exc()
+            error = str(e)
+            status = getattr(e, "status_code", None)
+            if attempts > retries or status in RETRY_STATUS or (status and 400 <= status < 500):
+                break
+            time.sleep(random.uniform(0.5, 1.0) * EVAL_RETRY_BASE * (2 ** (attempts - 1)))
+
+    return {
+        "result": result,
+        "error": error,
+        "usage": usage,
+        "latency": round(time.monotonic() - start, 2),
+        "queue_wait": round(stats.get("queue_wait", 0.0), 2),
+        "retries": stats.get("retries", 0),
+        "attempts": attempts,
+    }
+
+
+def summarize_category(result: dict) -> dict:
+    """Clamp item scores to 1-5 and collect subtotal, evidence and NG words."""
+    item_scores = {}
+    evidence = {}
+    subtotal = 0
+    for item_num, item_data in result.get("items", {}).items():
+        score = int(item_data.get("score", 3))
+        score = max(1, min(5, score))  # Clamp to 1-5
+        item_scores[item_num] = score
+        evidence[item_num] = {
+            "evidence": item_data.get("evidence", ""),
+            "reasoning": item_data.get("reasoning", ""),
+        }
+        subtotal += score
+
+    ng = result.get("ng_words", [])
+    return {
+        "subtotal": subtotal,
+        "item_scores": item_scores,
+        "evidence": evidence,
+        "ng_words": ng if isinstance(ng, list) else [],
+    }
+
+
+def plan_evaluation(
+    transcript: str,
+    model: str = None,
+    prompt_cache: bool = None,
+    long_mode: str = None,
+    chunk_chars: int = None,
+    chunk_overlap_chars: int = None,
+    token_budget: int = None,
+    compact: bool = None,
+    compact_rules: list = None,
+    context_mode: str = None,
+    retrieval_tokens: int = None,
+    engine: str = None,
+    ng_mode: str = None,
+) -> dict:
+    """Prepare the call units of an evaluation without calling Claude.
+
+    Applies the NG-word prescan, compaction, retrieval or truncation/chunking
+    and the engine's call grouping; one unit is one (group, chunk) call with
+    its text in ``unit_texts``.  ``cache_keys`` are the units' result-cache
+    keys for ``model`` (default MODEL).  Used by evaluate_transcript and
+    estimate_evaluation, so an estimate sees exactly the calls a run makes.
+    """
+    model = model or MODEL
+    if prompt_cache is None:
+        prompt_cache = EVAL_PROMPT_CACHE
+    long_mode = long_mode or EVAL_LONG_MODE
+    engine = engine or EVAL_ENGINE
+    context_mode = context_mode or EVAL_CONTEXT_MODE
+    ng_mode = ng_mode or EVAL_NG_MODE
+    if compact is None:
+        compact = EVAL_COMPACT
+
+    ng_scan = None
+    ng_hits = []
+    if ng_mode != "llm":
+        scan_started = time.monotonic()
+        ng_hits = scan_transcript(transcript)
+        ng_scan = {
+            "mode": ng_mode,
+            **summarize_hits(ng_hits),
+            "elapsed_ms": round((time.monotonic() - scan_started) * 1000, 1),
+        }
+
+    source_text = transcript
+    compacted = None
+    if compact:
+        compacted = compact_transcript(transcript, compact_rules or EVAL_COMPACT_RULES)
+        transcript = compacted["text"]
+
+    chunk_plan = None
+    truncated = False
+    retrieval = None
+    if context_mode == "retrieval":
+        passages = segment(transcript, EVAL_PASSAGE_CHARS)
+        bm25 = BM25Index(passages)
+        retrieval = {
+            "passages_total": len(passages),
+            "transcript_tokens": estimate_tokens(transcript),
+            "categories": {},
+        }
+        # Per-category contexts share no prefix worth caching
+        prompt_cache = False
+    elif len(transcript) > MAX_TRANSCRIPT_CHARS:
+        if long_mode == "chunk":
+            chunk_plan = plan_chunks(
+                transcript,
+                chunk_chars or EVAL_CHUNK_CHARS,
+                EVAL_CHUNK_OVERLAP_CHARS if chunk_overlap_chars is None else chunk_overlap_chars,
+                token_budget or EVAL_TOKEN_BUDGET,
+            )
+        else:
+            # Truncate transcript if too long
+            transcript = transcript[:MAX_TRANSCRIPT_CHARS] + "\n\n[...テキストが長いため省略されました...]"
+            truncated = True
+
+    if chunk_plan:
+        chunks = chunk_plan["chunks"]
+        texts = {c["index"]: chunk_text(c, chunk_plan["total"]) for c in chunks}
+    else:
+        chunks = [{"index": 0, "text": transcript}]
+        texts = {0: transcript}
+
+    tasks = []
+    for cat_key, prompt_file in CALL_PROMPTS:
+        prompt_template = load_prompt(prompt_file)
+        if not prompt_template:
+            print(f"Warning: prompt file {prompt_file} not found, skipping")
+            continue
+        tasks.append((cat_key, apply_ng_mode(prompt_template, ng_mode, ng_hits)))
+    templates = dict(tasks)
+
+    # A call group is one category (split) or all categories at once (single)
+    if engine == "single":
+        groups = {SINGLE_GROUP: [cat_key for cat_key, _ in tasks]}
+        group_templates = {
+            SINGLE_GROUP: build_single_prompt(load_prompt(SINGLE_PROMPT_FILE), tasks)
+        }
+        max_tokens = SINGLE_MAX_TOKENS
+    else:
+        groups = {cat_key: [cat_key] for cat_key, _ in tasks}
+        group_templates = templates
+        max_tokens = 4096
+
+    # Item numbers each group's response must score (call_claude rejects incomplete ones)
+    expected_items = {
+        group: {cat_key: list(item_queries(templates[cat_key])) for cat_key in cat_keys}
+        for group, cat_keys in groups.items()
+    }
+
+    # One unit of work = one (group, chunk) call
+    unit_texts = {}
+    for group, cat_keys in groups.items():
+        if retrieval is not None:
+            queries = {}
+            for cat_key in cat_keys:
+                queries.update(item_queries(templates[cat_key]))
+            context = select_context(
+                bm25, queries, retrieval_tokens or EVAL_RETRIEVAL_TOKENS
+            )
+            retrieval["categories"][group] = {
+                "passages": len(context["passages"]),
+                "tokens": context["tokens"],
+            }
+            unit_texts[(group, 0)] = context["text"]
+        else:
+            for c in chunks:
+                unit_texts[(group, c["index"])] = texts[c["index"]]
+    units = list(unit_texts)
+
+    # Content keys identify a unit's inputs for both the result cache and resume
+    cache_keys = {}
+    unit_ids = {}
+    text_hashes = {}
+    for unit in units:
+        group, text = unit[0], unit_texts[unit]
+        if text not in text_hashes:
+            text_hashes[text] = sha256(normalize_transcript(text))
+        cache_keys[unit] = category_key(
+            text_hashes[text], SYSTEM_PROMPT, group_templates[group], model
+        )
+        unit_ids[unit] = f"{group}:{unit[1]}"
+
+    return {
+        "prompt_cache": prompt_cache,
+        "engine": engine,
+        "context_mode": context_mode,
+        "ng_mode": ng_mode,
+        "ng_scan": ng_scan,
+        "ng_hits": ng_hits,
+        "source_text": source_text,
+        "compacted": compacted,
+        "truncated": truncated,
+        "chunk_plan": chunk_plan,
+        "retrieval": retrieval,
+        "chunks": chunks,
+        "tasks": tasks,
+        "templates": templates,
+        "groups": groups,
+        "group_templates": group_templates,
+        "expected_items": expected_items,
+        "max_tokens": max_tokens,
+        "unit_texts": unit_texts,
+        "units": units,
+        "cache_keys": cache_keys,
+        "unit_ids": unit_ids,
+        "text_hashes": text_hashes,
+    }
+
+
+# ── Evaluation stages (evaluate_transcript) ──
+
+def add_usage(outcome: dict, usage: dict, extra_usages: list):
+    """Count a follow-up call's usage in the total (``extra_usages``) and in its category."""
+    extra_usages.append(usage)
+    if outcome["usage"]:
+        outcome["usage"] = sum_usage([outcome["usage"], usage])
+
+
+def part_result(plan: dict, group: str, cat_key: str, part: dict):
+    """``cat_key``'s result within a unit outcome of ``group`` (split out of a single call)."""
+    if group == cat_key or part["result"] is None:
+        return part["result"]
+    return split_result(part["result"], plan["groups"][group])[cat_key]
+
+
+def combine_chunks(plan: dict, results: list):
+    """Reduce one category's per-chunk results (the only result when not chunked)."""
+    if plan["chunk_plan"]:
+        return reduce_category(list(zip(plan["chunks"], results)))
+    return results[0]
+
+
+def category_outcome(plan: dict, unit_outcomes: dict, cat_key: str, group: str) -> dict:
+    """Combine the chunk outcomes of ``group`` into the outcome of ``cat_key``."""
+    parts = [unit_outcomes[(group, c["index"])] for c in plan["chunks"]]
+    result = combine_chunks(plan, [part_result(plan, group, cat_key, part) for part in parts])
+    errors = [part["error"] for part in parts if part["error"]]
+    if not errors and result is None:
+        errors = [f"{cat_key} missing from single-call response"]
+    return {
+        "result": result,
+        "error": "; ".join(errors) if errors else None,
+        "usage": sum_usage(part["usage"] for part in parts) if group == cat_key else {},
+        "latency": max(part["latency"] for part in parts),
+        "cached": all(part.get("cached") for part in parts),
+        "resumed": all(part.get("resumed") for part in parts),
+    }
+
+
+def save_unit(
+    plan: dict,
+    unit: tuple,
+    outcome: dict,
+    result_cache: ResultCache = None,
+    partials: PartialResults = None,
+    evaluation_id: str = "",
+):
+    """Write a newly evaluated unit to the result cache and the evaluation's partial results."""
+    if outcome["result"] is None or outcome.get("cached"):
+        return
+    if result_cache:
+        try:
+            result_cache.put(plan["cache_keys"][unit], outcome["result"], outcome["usage"])
+        except Exception as e:
+            print(f"Result cache write failed for {unit[0]}: {e}")
+    if partials:
+        try:
+            partials.record(
+                evaluation_id, plan["unit_ids"][unit], plan["cache_keys"][unit],
+                outcome["result"], outcome["usage"],
+            )
+        except Exception as e:
+            print(f"Partial result write failed for {unit[0]}: {e}")
+
+
+def verify_result(index: EvidenceIndex, result: dict) -> dict:
+    """Locate the evidence quotes of a category result in the transcript."""
+    return verify_evidence(
+        index, summarize_category(result)["evidence"], EVAL_EVIDENCE_MIN_SIMILARITY
+    )
+
+
+def rerun_category(
+    transport: ApiTransport,
+    plan: dict,
+    cat_key: str,
+    template: str,
+    label: str,
+    call_timeout: float = None,
+    telemetry: Telemetry = None,
+    priority: str = None,
+    result_cache: ResultCache = None,
+    use_cache: bool = True,
+) -> dict:
+    """Evaluate one category again with MODEL over its chunks (escalation or re-ask)."""
+    group = next(g for g, cat_keys in plan["groups"].items() if cat_key in cat_keys)
+    parts = []
+    for c in plan["chunks"]:
+        text = plan["unit_texts"][(group, c["index"])]
+        key = category_key(plan["text_hashes"][text], SYSTEM_PROMPT, template, MODEL)
+        cached = result_cache.get(key) if result_cache and use_cache else None
+        if cached is not None:
+            parts.append({"result": cached, "error": None, "usage": {}})
+            continue
+        part = run_category(
+            transport, label, template, text, call_timeout,
+            max_tokens=4096, telemetry=telemetry, priority=priority,
+            expected_items={cat_key: plan["expected_items"][group][cat_key]},
+        )
+        if part["result"] is not None and result_cache:
+            try:
+                result_cache.put(key, part["result"], part["usage"])
+            except Exception as e:
+                print(f"Result cache write failed for {label}: {e}")
+        parts.append(part)
+    errors = [part["error"] for part in parts if part["error"]]
+    return {
+        "result": None if errors else combine_chunks(plan, [part["result"] for part in parts]),
+        "error": "; ".join(errors) if errors else None,
+        "usage": sum_usage(part["usage"] for part in parts),
+    }
+
+
+def rerun_categories(
+    transport: ApiTransport,
+    plan: dict,
+    jobs: dict,
+    concurrency: int = 1,
+    call_timeout: float = None,
+    telemetry: Telemetry = None,
+    priority: str = None,
+    result_cache: ResultCache = None,
+    use_cache: bool = True,
+):
+    """Run rerun_category for ``jobs`` ({cat_key: (template, label)}), yielding (cat_key, outcome)."""
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(jobs))) as pool:
+        futures = {
+            pool.submit(
+                rerun_category, transport, plan, cat_key, template, label,
+                call_timeout, telemetry, priority, result_cache, use_cache,
+            ): cat_key
+            for cat_key, (template, label) in jobs.items()
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_sample(
+    transport: ApiTransport,
+    plan: dict,
+    unit: tuple,
+    model: str,
+    call_timeout: float,
+    deadline_at: float = None,
+    telemetry: Telemetry = None,
+    priority: str = None,
+) -> dict:
+    """One extra sample of a unit: no retries, bounded by ``deadline_at`` (monotonic time)."""
+    group = unit[0]
+    timeout = call_timeout
+    if deadline_at:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            return {"result": None, "usage": {}}
+        timeout = min(timeout, max(1.0, remaining))
+    try:
+        result, usage = call_claude(
+            transport, plan["group_templates"][group], plan["unit_texts"][unit], timeout=timeout,
+            prompt_cache=plan["prompt_cache"], max_tokens=plan["max_tokens"], telemetry=telemetry,
+            label=f"{group}:sample", model=model, temperature=EVAL_SAMPLE_TEMPERATURE,
+            priority=priority, expected_items=plan["expected_items"][group],
+        )
+        return {"result": result, "usage": usage}
+    except Exception as e:
+        print(f"Sample of {group} failed: {e}")
+        return {"result": None, "usage": {}}
+
+
+def run_samples(
+    transport: ApiTransport,
+    plan: dict,
+    unit_outcomes: dict,
+    outcomes: dict,
+    extra_usages: list,
+    samples: int,
+    model: str,
+    budget_usd: float = 0,
+    deadline: float = 0,
+    started: float = None,
+    call_timeout: float = None,
+    concurrency: int = 1,
+    telemetry: Telemetry = None,
+    priority: str = None,
+) -> dict:
+    """Run the extra sample rounds the budget allows and merge them into ``outcomes``.
+
+    Returns (``sampling`` report without the per-category part, per-item stats,
+    per-sample subtotals), so the caller can build that part with
+    ``sampling_report`` once it knows which merged results were replaced.
+    ``deadline`` counts from ``started`` (monotonic time); the usage of every
+    call made goes to ``extra_usages``.
+    """
+    groups, chunks = plan["groups"], plan["chunks"]
+    sampled = [unit for unit in plan["units"] if unit_outcomes[unit]["result"] is not None]
+    round_cost = sum(
+        sample_cost(model, unit_outcomes[unit]["usage"] or {
+            "input_tokens": estimate_tokens(plan["group_templates"][unit[0]] + plan["unit_texts"][unit]),
+            "output_tokens": output_limit(model, plan["max_tokens"]) // 4,
+        })
+        for unit in sampled
+    )
+    rounds = samples - 1
+    if budget_usd and round_cost > 0:
+        rounds = min(rounds, int(budget_usd // round_cost))
+    jobs = [(s, unit) for s in range(1, rounds + 1) for unit in sampled]
+
+    extra = {}
+    if jobs:
+        deadline_at = started + deadline if deadline else None
+        remaining = max(0.0, deadline_at - time.monotonic()) if deadline_at else None
+        pool = ThreadPoolExecutor(max_workers=min(concurrency, len(jobs)))
+        futures = {
+            pool.submit(
+                run_sample, transport, plan, unit, model, call_timeout, deadline_at, telemetry, priority,
+            ): (s, unit)
+            for s, unit in jobs
+        }
+        done, _ = wait(futures, timeout=remaining)
+        # Calls still running time out by the deadline (run_sample); wait for them
+        # so their tokens are counted, but drop their late results
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future, (s, unit) in futures.items():
+            if future.cancelled():
+                continue
+            outcome = future.result()
+            if future in done:
+                extra[(s, unit)] = outcome
+            if unit[0] in outcomes:
+                add_usage(outcomes[unit[0]], outcome["usage"], extra_usages)
+            else:
+                extra_usages.append(outcome["usage"])
+
+    category_stats = {}
+    category_subtotals = {}
+    for group, cat_keys in groups.items():
+        for cat_key in cat_keys:
+            outcome = outcomes[cat_key]
+            if outcome["result"] is None:
+                continue
+            results = [outcome["result"]]
+            for s in range(1, rounds + 1):
+                parts = [extra.get((s, (group, c["index"]))) for c in chunks]
+                if all(part and part["result"] is not None for part in parts):
+                    results.append(combine_chunks(
+                        plan, [part_result(plan, group, cat_key, part) for part in parts]
+                    ))
+            merged, stats = merge_samples(results)
+            category_stats[cat_key] = stats
+            category_subtotals[cat_key] = [
+                sum(summarize_category(r)["item_scores"].values()) for r in results if r
+            ]
+            outcome["result"] = merged
+    report = {
+        "samples": samples,
+        "rounds_run": rounds,
+        "temperature": EVAL_SAMPLE_TEMPERATURE,
+        "budget_usd": budget_usd or None,
+        "estimated_cost_usd": round(round_cost * rounds, 6),
+        "deadline": deadline or None,
+        "dropped": len(jobs) - sum(1 for o in extra.values() if o["result"] is not None),
+    }
+    return report, category_stats, category_subtotals
+
+
+def escalate_categories(
+    transport: ApiTransport,
+    plan: dict,
+    outcomes: dict,
+    extra_usages: list,
+    index: EvidenceIndex,
+    first_pass_time: float,
+    concurrency: int = 1,
+    call_timeout: float = None,
+    telemetry: Telemetry = None,
+    priority: str = None,
+    result_cache: ResultCache = None,
+    use_cache: bool = True,
+) -> dict:
+    """Evaluate again with MODEL the categories the fast model did not settle.
+
+    A successful re-evaluation replaces the fast result in ``outcomes``.
+    Returns the ``tiers`` report (tiers.py).
+    """
+    escalate_started = time.monotonic()
+    escalated = {}
+    for cat_key, _ in plan["tasks"]:
+        result = outcomes[cat_key]["result"]
+        reasons = escalation_reasons(
+            result,
+            list(item_queries(plan["templates"][cat_key])),
+            verify_result(index, result) if result is not None and "evidence" in EVAL_ESCALATE_ON else None,
+            EVAL_ESCALATE_SCORES,
+            EVAL_ESCALATE_MIN_ITEMS,
+            EVAL_ESCALATE_ON,
+        )
+        if reasons:
+            escalated[cat_key] = reasons
+    failed = []
+    if escalated:
+        print(f"Escalating to {MODEL}: {escalated}")
+        jobs = {cat_key: (plan["templates"][cat_key], f"{cat_key}:escalate") for cat_key in escalated}
+        for cat_key, retry in rerun_categories(
+            transport, plan, jobs, concurrency, call_timeout, telemetry, priority, result_cache, use_cache,
+        ):
+            outcome = outcomes[cat_key]
+            add_usage(outcome, retry["usage"], extra_usages)
+            if retry["result"] is None:
+                failed.append(cat_key)  # keep the fast model's result, if any
+                continue
+            outcome.update(result=retry["result"], error=None, cached=False, resumed=False)
+    return {
+        "escalated": escalated,
+        "escalation_failed": sorted(failed),
+        **tier_savings(
+            telemetry.calls(), EVAL_FAST_MODEL, MODEL, first_pass_time,
+            time.monotonic() - escalate_started, EVAL_TIER_LATENCY_RATIO,
+        ),
+    }
+
+
+def check_evidence(
+    transport: ApiTransport,
+    plan: dict,
+    outcomes: dict,
+    extra_usages: list,
+    index: EvidenceIndex,
+    mode: str,
+    concurrency: int = 1,
+    call_timeout: float = None,
+    telemetry: Telemetry = None,
+    priority: str = None,
+    result_cache: ResultCache = None,
+    use_cache: bool = True,
+) -> tuple:
+    """Locate every evidence quote; with ``mode="reask"`` re-ask categories with unlocated quotes.
+
+    A re-asked result replaces the old one in ``outcomes`` if it has fewer
+    unlocated quotes.  Returns ({cat_key: verifications}, ``evidence_check`` report).
+    """
+    check_started = time.monotonic()
+    verifications = {}
+    for cat_key, _ in plan["tasks"]:
+        if outcomes[cat_key]["result"] is not None:
+            verifications[cat_key] = verify_result(index, outcomes[cat_key]["result"])
+    check_ms = (time.monotonic() - check_started) * 1000
+
+    reasked = {
+        cat_key: unlocated_items(v) for cat_key, v in verifications.items() if unlocated_items(v)
+    } if mode == "reask" else {}
+    improved = []
+    if reasked:
+        print(f"Re-asking categories with unlocated evidence: {reasked}")
+        jobs = {
+            cat_key: (reask_prompt(plan["templates"][cat_key], items), f"{cat_key}:reask")
+            for cat_key, items in reasked.items()
+        }
+        for cat_key, retry in rerun_categories(
+            transport, plan, jobs, concurrency, call_timeout, telemetry, priority, result_cache, use_cache,
+        ):
+            outcome = outcomes[cat_key]
+            add_usage(outcome, retry["usage"], extra_usages)
+            if retry["result"] is None:
+                continue
+            retry_check = verify_result(index, retry["result"])
+            if len(unlocated_items(retry_check)) < len(reasked[cat_key]):
+                outcome["result"] = retry["result"]
+                verifications[cat_key] = retry_check
+                improved.append(cat_key)
+
+    item_categories = {num: cat_key for cat_key, v in verifications.items() for num in v}
+    return verifications, {
+        "mode": mode,
+        "min_similarity": EVAL_EVIDENCE_MIN_SIMILARITY,
+        **summarize_verifications(
+            {num: v for cat_v in verifications.values() for num, v in cat_v.items()},
+            item_categories,
+        ),
+        "reasked": sorted(reasked),
+        "improved": sorted(improved),
+        "elapsed_ms": round(check_ms, 1),
+    }
+
+
+def aggregate_scores(plan: dict, outcomes: dict, verifications: dict) -> dict:
+    """Sum the category results into item scores, evidence, NG words and subtotals.
+
+    Failed categories score 0 and are returned in ``errors``.  Evidence
+    gets ``original_offset`` (compaction) and ``verification`` entries.
+    """
+    item_scores = {}
+    evidence = {}
+    ng_words = []
+    raw_total = 0
+    category_scores = {}
+    errors = {}
+    for cat_key, _ in plan["tasks"]:
+        outcome = outcomes[cat_key]
+        if outcome["result"] is None:
+            # Failed category scores 0 and is reported in failed_categories
+            category_scores[cat_key] = 0
+            errors[cat_key] = outcome["error"]
+            continue
+
+        summary = summarize_category(outcome["result"])
+        item_scores.update(summary["item_scores"])
+        evidence.update(summary["evidence"])
+        if plan["ng_mode"] != "local":
+            ng_words.extend(summary["ng_words"])
+        raw_total += summary["subtotal"]
+        category_scores[cat_key] = summary["subtotal"]
+
+    if plan["ng_mode"] == "local":
+        ng_words = plan["ng_hits"]
+    if plan["compacted"]:
+        for ev in evidence.values():
+            ev["original_offset"] = locate_quote(plan["compacted"], ev["evidence"])
+    for cat_v in verifications.values():
+        for num, verification in cat_v.items():
+            if num in evidence:
+                evidence[num]["verification"] = verification
+    return {
+        "item_scores": item_scores,
+        "evidence": evidence,
+        "ng_words": ng_words,
+        "raw_total": raw_total,
+        "category_scores": category_scores,
+        "errors": errors,
+    }
+
+
+def evaluate_transcript(
+    transcript: str,
+    metadata: dict,
+    parallel: bool = None,
+    concurrency: int = None,
+    call_timeout: float = None,
+    prompt_cache: bool = None,
+    use_cache: bool = True,
+    long_mode: str = None,
+    chunk_chars: int = None,
+    chunk_overlap_chars: int = None,
+    token_budget: int = None,
+    compact: bool = None,
+    compact_rules: list = None,
+    context_mode: str = None,
+    retrieval_tokens: int = None,
+    engine: str = None,
+    ng_mode: str = None,
+    evidence_check: str = None,
+    tiered: bool = None,
+    samples: int = None,
+    sample_budget_usd: float = None,
+    sample_deadline: float = None,
+    priority: str = None,
+    on_category=None,
+    transport: ApiTransport = None,
+) -> dict:
+    """Run the full 6-call evaluation pipeline.
+
+    In parallel mode the category calls are fanned out over a thread pool
+    (at most ``concurrency`` at a time).  Results are always aggregated in
+    CALL_PROMPTS order, so the output is identical to the serial path.
+
+    With ``prompt_cache`` the first category runs alone to write the shared
+    prefix to the cache before the remaining calls are fanned out.
+
+    Categories found in the result cache are not called again; with
+    ``use_cache=False`` the cache is bypassed for reads but still refreshed.
+
+    Completed calls are also saved under ``metadata["evaluation_id"]``: a
+    repeated request with the same id reuses them (``resumed``) and only
+    re-runs the calls that failed.  Categories that still fail after retries
+    score 0 and are listed in ``failed_categories`` with ``partial=True``.
+
+    Transcripts longer than MAX_TRANSCRIPT_CHARS are truncated, or with
+    ``long_mode="chunk"`` split into overlapping chunks (see chunking.py):
+    every category is evaluated per chunk and the chunk results reduced.
+
+    With ``compact`` the transcript is compacted first (common/compaction.py)
+    and each evidence quote gets ``original_offset`` into the original text.
+
+    With ``context_mode="retrieval"`` each category only sees the passages
+    retrieved for its item descriptions (see retrieval.py), within
+    ``retrieval_tokens``; truncation/chunking and prompt caching do not apply.
+
+    With ``engine="single"`` all 22 items are evaluated in one call per
+    chunk (see single_call.py) and the response is split back into the six
+    categories before the usual aggregation.  Usage and the result cache are
+    then tracked for the combined call under the ``"all"`` key.
+
+    ``on_category(cat_key, summary)`` is called as each category finishes
+    (in completion order); ``summary`` is the summarize_category() output
+    plus ``latency``/``cached``/``error``.
+
+    With ``ng_mode="candidates"`` NG words found by the local dictionary
+    scan (ng_scan.py) are listed in the prompt that asks for NG words, for
+    the model to confirm; with ``ng_mode="local"`` that instruction is
+    removed and the dictionary hits are returned as ``ng_words`` directly.
+    Hits are located on the original (pre-compaction) transcript.
+
+    Unless ``evidence_check="off"``, every evidence quote is fuzzy-located in
+    the evaluated transcript (evidence.py) and gets a ``verification`` entry
+    with its status, similarity and offsets into the original text; counts go
+    to ``evidence_check``.  With ``evidence_check="reask"`` a category with
+    unlocated quotes is asked once more, naming those items, and the new
+    result replaces the old one if it has fewer unlocated quotes.  Streamed
+    category events report the results before this step.
+
+    With ``tiered`` the first pass uses EVAL_FAST_MODEL; categories whose
+    result fails validation, has several borderline scores or unlocated
+    quotes (EVAL_ESCALATE_ON) are evaluated again with MODEL, which replaces
+    the fast result.  ``tiers`` lists the escalations and estimates the cost
+    and latency saved against using MODEL for every call (tiers.py).
+
+    With ``samples`` > 1 every unit is sampled ``samples - 1`` more times at
+    EVAL_SAMPLE_TEMPERATURE, concurrently and with the prompt cache on so the
+    extra samples read the shared prefix.  Item scores are the median over
+    the samples and ``sampling`` reports per-item scores and variance.
+    Whole rounds of extra samples are dropped when their estimated cost
+    would exceed ``sample_budget_usd``.  With ``sample_deadline`` each sample
+    call times out when that many seconds have passed since the start;
+    results that arrive later are dropped, but their tokens are counted.
+    Escalation and evidence checks see the merged result; categories whose
+    merged result escalation replaces are left out of the ``sampling`` stats
+    and listed under ``replaced``.
+
+    ``priority`` (interactive / pipeline / bulk) is the scheduling class of
+    every call; the shared scheduler serves waiting calls by weighted fair
+    queueing across classes, so bulk work yields at category boundaries.
+
+    ``telemetry`` records every Claude call made (including retries that
+    failed and JSON repairs) with wall time, queue wait, tokens and estimated
+    cost, aggregated per call group; cached and resumed units make no calls.
+
+    Every call goes through ``transport`` (default ApiTransport; see
+    ReplayTransport and BatchTransport).  ``category_scores`` are the raw
+    category subtotals and ``categories`` the same scaled to the 90 points.
+    """
+    if parallel is None:
+        parallel = EVAL_PARALLEL
+    evidence_check = evidence_check or EVAL_EVIDENCE_CHECK
+    tiered = EVAL_TIERED if tiered is None else tiered
+    priority = get_limiter().priority_class(priority)
+    first_model = EVAL_FAST_MODEL if tiered else MODEL
+    samples = max(1, samples or EVAL_SAMPLES)
+    sample_budget_usd = EVAL_SAMPLE_BUDGET_USD if sample_budget_usd is None else sample_budget_usd
+    sample_deadline = EVAL_SAMPLE_DEADLINE if sample_deadline is None else sample_deadline
+    if samples > 1:
+        # Extra samples of a unit share its whole prefix; write it once, read it N-1 times
+        prompt_cache = True
+    concurrency = max(1, concurrency or EVAL_CONCURRENCY)
+    call_timeout = call_timeout or EVAL_CALL_TIMEOUT
+
+    transport = transport or ApiTransport()
+
+    plan = plan_evaluation(
+        transcript,
+        model=first_model,
+        prompt_cache=prompt_cache,
+        long_mode=long_mode,
+        chunk_chars=chunk_chars,
+        chunk_overlap_chars=chunk_overlap_chars,
+        token_budget=token_budget,
+        compact=compact,
+        compact_rules=compact_rules,
+        context_mode=context_mode,
+        retrieval_tokens=retrieval_tokens,
+        engine=engine,
+        ng_mode=ng_mode,
+    )
+    prompt_cache, engine = plan["prompt_cache"], plan["engine"]
+    chunks, tasks, groups = plan["chunks"], plan["tasks"], plan["groups"]
+    units, cache_keys, unit_ids = plan["units"], plan["cache_keys"], plan["unit_ids"]
+    chunk_plan, compacted = plan["chunk_plan"], plan["compacted"]
+
+    started = time.monotonic()
+    telemetry = Telemetry()
+    unit_outcomes = {}
+    outcomes = {}
+    extra_usages = []
+    result_cache = get_result_cache()
+    evaluation_id = metadata.get("evaluation_id", "")
+    partials = get_partial_results() if evaluation_id else None
+    rerun_concurrency = concurrency if parallel else 1
+
+    def finish(unit, outcome):
+        unit_outcomes[unit] = outcome
+        save_unit(plan, unit, outcome, result_cache, partials, evaluation_id)
+        group = unit[0]
+        if not all((group, c["index"]) in unit_outcomes for c in chunks):
+            return
+        for cat_key in groups[group]:
+            outcomes[cat_key] = category_outcome(plan, unit_outcomes, cat_key, group)
+            if on_category:
+                summary = summarize_category(outcomes[cat_key]["result"] or {})
+                summary.update(
+                    latency=outcomes[cat_key]["latency"],
+                    cached=bool(outcomes[cat_key].get("cached")),
+                    error=outcomes[cat_key]["error"],
+                )
+                on_category(cat_key, summary)
+
+    def run_unit(unit):
+        group = unit[0]
+        return run_category(
+            transport, group, plan["group_templates"][group], plan["unit_texts"][unit],
+            call_timeout, prompt_cache, max_tokens=plan["max_tokens"], telemetry=telemetry,
+            model=first_model, priority=priority, expected_items=plan["expected_items"][group],
+        )
+
+    resumed = partials.load(evaluation_id) if partials and use_cache else {}
+    for unit in units:
+        saved = resumed.get(unit_ids[unit])
+        if saved and saved.get("key") == cache_keys[unit]:
+            finish(unit, {
+                "result": saved["result"], "error": None, "usage": {}, "latency": 0.0,
+                "cached": True, "resumed": True,
+            })
+            continue
+        cached = result_cache.get(cache_keys[unit]) if result_cache and use_cache else None
+        if cached is not None:
+            finish(unit, {
+                "result": cached, "error": None, "usage": {}, "latency": 0.0, "cached": True,
+            })
+
+    pending = [unit for unit in units if unit not in unit_outcomes]
+    if parallel and concurrency > 1:
+        waves = [pending]
+        if prompt_cache:
+            # Write each chunk's shared prefix with one call before fanning out
+            first = {}
+            for unit in pending:
+                first.setdefault(unit[1], unit)
+            warm = list(first.values())
+            waves = [warm, [unit for unit in pending if unit not in warm]]
+        with ThreadPoolExecutor(max_workers=min(concurrency, max(1, len(pending)))) as pool:
+            for wave in waves:
+                futures = {pool.submit(run_unit, unit): unit for unit in wave}
+                for future in as_completed(futures):
+                    finish(futures[future], future.result())
+    else:
+        for unit in pending:
+            finish(unit, run_unit(unit))
+
+    # Self-consistency: extra samples per unit, merged by median per item
+    sampling = None
+    if samples > 1:
+        sampling, category_stats, category_subtotals = run_samples(
+            transport, plan, unit_outcomes, outcomes, extra_usages, samples, first_model,
+            sample_budget_usd, sample_deadline, started, call_timeout, concurrency, telemetry, priority,
+        )
+    first_pass_time = time.monotonic() - started
+
+    index = None
+    if evidence_check != "off" or (tiered and "evidence" in EVAL_ESCALATE_ON):
+        index = EvidenceIndex(plan["source_text"], compacted)
+
+    # Escalate categories the fast model did not settle to the primary model
+    tiers = None
+    if tiered:
+        tiers = escalate_categories(
+            transport, plan, outcomes, extra_usages, index, first_pass_time,
+            rerun_concurrency, call_timeout, telemetry, priority, result_cache, use_cache,
+        )
+    if sampling is not None:
+        # Escalated categories now hold the primary model's single result
+        replaced = [
+            cat_key for cat_key in (tiers["escalated"] if tiers else {})
+            if cat_key not in tiers["escalation_failed"]
+        ]
+        sampling.update(sampling_report(category_stats, category_subtotals, replaced))
+
+    # Locate every evidence quote; re-ask categories with unlocated quotes
+    verifications = {}
+    evidence_summary = None
+    if evidence_check != "off":
+        verifications, evidence_summary = check_evidence(
+            transport, plan, outcomes, extra_usages, index, evidence_check,
+            rerun_concurrency, call_timeout, telemetry, priority, result_cache, use_cache,
+        )
+    wall_time = round(time.monotonic() - started, 2)
+
+    scores = aggregate_scores(plan, outcomes, verifications)
+    errors = scores["errors"]
+    latency = {cat_key: outcomes[cat_key]["latency"] for cat_key, _ in tasks}
+    usage = {cat_key: outcomes[cat_key]["usage"] for cat_key, _ in tasks}
+    resumed_categories = [cat_key for cat_key, _ in tasks if outcomes[cat_key].get("resumed")]
+    cache_hits = [
+        cat_key for cat_key, _ in tasks
+        if outcomes[cat_key].get("cached") and not outcomes[cat_key].get("resumed")
+    ]
+
+    latency["total"] = wall_time
+    usage["total"] = sum_usage(
+        [part["usage"] for part in unit_outcomes.values()] + extra_usages
+    )
+    if engine == "single":
+        # Per-category usage is not separable within one call
+        usage[SINGLE_GROUP] = usage["total"]
+
+    # Scale scores
+    ai_total = scale_to_90(scores["raw_total"])
+    scaled_categories = {}
+    for cat_key in ["c1", "c2", "c3", "c4", "c5", "c6"]:
+        scaled_categories[cat_key] = scale_category(
+            scores["category_scores"].get(cat_key, 0), cat_key
+        )
+
+    if errors:
+        print(f"Partial result, failed categories: {', '.join(errors)}")
+    elif partials:
+        try:
+            partials.clear(evaluation_id)  # nothing left to resume
+        except Exception as e:
+            print(f"Partial result cleanup failed: {e}")
+
+    return {
+        "success": True,
+        "partial": bool(errors),
+        "failed_categories": list(errors),
+        "errors": errors,
+        "resumed": resumed_categories,
+        "evaluation_id": evaluation_id,
+        "ai_total": ai_total,
+        "raw_total": scores["raw_total"],
+        "categories": scaled_categories,
+        "category_scores": scores["category_scores"],
+        "item_scores": scores["item_scores"],
+        "evidence": scores["evidence"],
+        "ng_words": scores["ng_words"],
+        "mode": "parallel" if parallel and concurrency > 1 else "serial",
+        "latency": latency,
+        "prompt_cache": bool(prompt_cache),
+        "usage": usage,
+        "result_cache": {
+            "enabled": result_cache is not None,
+            "hits": cache_hits,
+            "misses": [
+                k for k, _ in tasks if k not in cache_hits and k not in resumed_categories
+            ] if result_cache else [],
+        },
+        "truncated": plan["truncated"],
+        "chunking": {
+            "chunks": len(chunks),
+            "total": chunk_plan["total"],
+            "skipped": chunk_plan["skipped"],
+            "transcript_tokens": chunk_plan["tokens"],
+        } if chunk_plan else None,
+        "compaction": compacted["stats"] if compacted else None,
+        "context_mode": plan["context_mode"],
+        "retrieval": plan["retrieval"],
+        "engine": engine,
+        "ng_scan": plan["ng_scan"],
+        "evidence_check": evidence_summary,
+        "tiers": tiers,
+        "sampling": sampling,
+        "priority": priority,
+        "transport": transport.name,
+        "rate_limit": {
+            "queue_wait": round(sum(p.get("queue_wait", 0.0) for p in unit_outcomes.values()), 2),
+            "retries": sum(p.get("retries", 0) for p in unit_outcomes.values()),
+            "attempts": sum(p.get("attempts", 0) for p in unit_outcomes.values()),
+        },
+        "telemetry": telemetry.summary(),
+    }
+
+
+def iter_evaluation(transcript: str, metadata: dict, **options):
+    """Run evaluate_transcript and yield events as categories complete.
+
+    Yields {"type": "category", "category": ..., **summary} per category,
+    then {"type": "result", **result} (or {"type": "error", ...}).  Used by
+    the eval-app dashboard's local mode (iter_evaluate_local).
+    """
+    events = queue.Queue()
+
+    def on_category(cat_key, summary):
+        events.put({"type": "category", "category": cat_key, **summary})
+
+    def run():
+        try:
+            result = evaluate_transcript(transcript, metadata, on_category=on_category, **options)
+            events.put({"type": "result", **result})
+        except Exception as e:
+            print(f"Error: {e}")
+            traceback.print_exc()
+            events.put({"type": "error", "success": False, "error": str(e)})
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        yield event
+
+
+def evaluate_many(
+    evaluations: list,
+    concurrency: int = None,
+    transport: ApiTransport = None,
+    on_category=None,
+    **options,
+) -> dict:
+    """Evaluate several transcripts in one call under one concurrency limit.
+
+    ``evaluations`` is a list of (transcript, metadata).  The transcripts run
+    concurrently through evaluate_transcript with the same ``options``, and
+    all of their category calls share ``concurrency`` slots (default
+    EVAL_MULTI_CONCURRENCY, see LimitedTransport), so 6 x N calls keep that
+    many in flight instead of one transcript's six at a time.
+
+    Each evaluation succeeds, is ``partial`` or fails on its own: a
+    transcript whose evaluation raised gets {"success": False, "error": ...}
+    and the others are returned as usual.  ``results`` are in input order;
+    ``on_category(f"{n}:{cat_key}", summary)`` reports categories of the
+    n-th transcript as they finish.
+    """
+    concurrency = max(1, concurrency or EVAL_MULTI_CONCURRENCY)
+    transport = LimitedTransport(transport or ApiTransport(), concurrency)
+    started = time.monotonic()
+
+    def run(n):
+        transcript, metadata = evaluations[n]
+        report = (lambda cat_key, summary: on_category(f"{n}:{cat_key}", summary)) if on_category else None
+        try:
+            return evaluate_transcript(
+                transcript, metadata, concurrency=concurrency, on_category=report,
+                transport=transport, **options,
+            )
+        except Exception as e:
+            print(f"Evaluation {n} ({metadata.get('evaluation_id', 'unknown')}) failed: {e}")
+            traceback.print_exc()
+            return {
+                "success": False,
+                "error": str(e),
+                "evaluation_id": metadata.get("evaluation_id", ""),
+            }
+
+    # A transcript keeps at least one call in flight, so more than ``concurrency`` would only wait
+    with ThreadPoolExecutor(max_workers=min(concurrency, max(1, len(evaluations)))) as pool:
+        results = list(pool.map(run, range(len(evaluations))))
+
+    failed = [n for n, r in enumerate(results) if not r["success"]]
+    partial = [n for n, r in enumerate(results) if r["success"] and r["partial"]]
+    return {
+        "success": True,
+        "count": len(results),
+        "succeeded": len(results) - len(failed) - len(partial),
+        "partial": partial,
+        "failed": failed,
+        "concurrency": concurrency,
+        "latency": round(time.monotonic() - started, 2),
+        "cost_usd": round(sum(
+            r["telemetry"]["total"]["cost_usd"] for r in results if r["success"]
+        ), 6),
+        "results": results,
+    }
+
+
+# evaluate_transcript options that shape the plan (and so the batch requests)
+PLAN_OPTIONS = (
+    "prompt_cache",
+    "long_mode",
+    "chunk_chars",
+    "chunk_overlap_chars",
+    "token_budget",
+    "compact",
+    "compact_rules",
+    "context_mode",
+    "retrieval_tokens",
+    "engine",
+    "ng_mode",
+)
+
+
+def evaluate_batch(
+    transcripts: dict,
+    transport: BatchTransport = None,
+    progress_callback=None,
+    **options,
+) -> dict:
+    """Evaluate many transcripts with one Message Batches submission.
+
+    Each transcript is planned as evaluate_transcript plans it with the same
+    ``options`` and the first-pass calls of all of them are submitted
+    together (units already in the result cache are not, and identical
+    requests are submitted once).  Every transcript
+    then runs through evaluate_transcript against the batch results, so
+    chunk reduction, scoring and evidence checks are the same as a direct
+    run.  Follow-up calls that depend on results are not batched: ``tiered``
+    and ``samples`` are off and an evidence ``reask`` only flags.  A unit
+    whose request failed fails its categories (``partial``).
+
+    Returns {id: result}; each result has ``batch`` with the batch ids,
+    request count and the wall time of the whole submission.
+    """
+    transport = transport or BatchTransport()
+    options.update(tiered=False, samples=1)
+    if (options.get("evidence_check") or EVAL_EVIDENCE_CHECK) == "reask":
+        options["evidence_check"] = "flag"
+    plan_options = {name: options.get(name) for name in PLAN_OPTIONS}
+    result_cache = get_result_cache() if options.get("use_cache", True) else None
+
+    requests = {}
+    submitted = set()
+    for n, transcript in enumerate(transcripts.values()):
+        plan = plan_evaluation(transcript, **plan_options)
+        for unit in plan["units"]:
+            if result_cache and result_cache.get(plan["cache_keys"][unit]) is not None:
+                continue
+            group = unit[0]
+            params = message_params(
+                plan["group_templates"][group], plan["unit_texts"][unit],
+                plan["prompt_cache"], plan["max_tokens"],
+            )
+            if request_key(params) in submitted:
+                continue
+            submitted.add(request_key(params))
+            # custom_id は英数字・-・_ の64文字以内
+            requests[f"t{n}-{group}-{unit[1]}"] = params
+
+    started = time.monotonic()
+    if requests:
+        transport.run(requests, progress_callback)
+    batch = {
+        "ids": transport.batch_ids,
+        "requests": len(requests),
+        "wall_time": round(time.monotonic() - started, 2),
+    }
+    return {
+        tid: {**evaluate_transcript(transcript, {}, transport=transport, **options), "batch": batch}
+        for tid, transcript in transcripts.items()
+    }
+
+
+# Expected output of a category call before telemetry has one (JSON per item)
+ESTIMATE_OUTPUT_BASE = 150
+ESTIMATE_OUTPUT_PER_ITEM = 220
+
+
+def estimate_evaluation(
+    transcript: str,
+    metadata: dict = None,
+    parallel: bool = None,
+    concurrency: int = None,
+    prompt_cache: bool = None,
+    use_cache: bool = True,
+    long_mode: str = None,
+    chunk_chars: int = None,
+    chunk_overlap_chars: int = None,
+    token_budget: int = None,
+    compact: bool = None,
+    compact_rules: list = None,
+    context_mode: str = None,
+    retrieval_tokens: int = None,
+    engine: str = None,
+    ng_mode: str = None,
+    tiered: bool = None,
+    samples: int = None,
+    sample_budget_usd: float = None,
+    **_options,
+) -> dict:
+    """Estimate tokens, calls, cost and wall time of an evaluation without running it.
+
+    Takes the same options as evaluate_transcript and plans the same units
+    (plan_evaluation); units found in the result cache or saved for
+    ``metadata["evaluation_id"]`` are not counted.  Input tokens are the
+    local estimate of each call's request, split into cache writes/reads
+    when the prompt cache is on; output tokens are the per-group median from
+    telemetry, or ESTIMATE_OUTPUT_PER_ITEM per item.  Call times come from
+    the latency model fitted to recorded telemetry (common/estimate.py) and
+    are scheduled over ``concurrency`` the way evaluate_transcript runs them
+    (prefix-writing wave first, then extra samples), bounded below by the
+    rate limits.  Escalations (``tiered``) and evidence re-asks depend on the
+    results, so they are not in the totals; ``tiers`` reports the worst case
+    of escalating every category.  Options that only affect a run (timeouts,
+    priority, evidence check, sample deadline) are accepted and ignored.
+    """
+    started = time.monotonic()
+    metadata = metadata or {}
+    if parallel is None:
+        parallel = EVAL_PARALLEL
+    tiered = EVAL_TIERED if tiered is None else tiered
+    first_model = EVAL_FAST_MODEL if tiered else MODEL
+    samples = max(1, samples or EVAL_SAMPLES)
+    sample_budget_usd = EVAL_SAMPLE_BUDGET_USD if sample_budget_usd is None else sample_budget_usd
+    if samples > 1:
+        prompt_cache = True
+    concurrency = max(1, concurrency or EVAL_CONCURRENCY) if parallel else 1
+
+    plan = plan_evaluation(
+        transcript,
+        model=first_model,
+        prompt_cache=prompt_cache,
+        long_mode=long_mode,
+        chunk_chars=chunk_chars,
+        chunk_overlap_chars=chunk_overlap_chars,
+        token_budget=token_budget,
+        compact=compact,
+        compact_rules=compact_rules,
+        context_mode=context_mode,
+        retrieval_tokens=retrieval_tokens,
+        engine=engine,
+        ng_mode=ng_mode,
+    )
+    prompt_cache = plan["prompt_cache"]
+    latency_model = load_latency_model()
+    limiter = get_limiter()
+    if limiter.max_concurrent:
+        concurrency = min(concurrency, limiter.max_concurrent)
+
+    # Units a run would not call: resumed by evaluation_id or in the result cache
+    skipped = []
+    evaluation_id = metadata.get("evaluation_id", "")
+    if use_cache:
+        resumed = get_partial_results().load(evaluation_id) if evaluation_id else {}
+        result_cache = get_result_cache()
+        for unit in plan["units"]:
+            saved = resumed.get(plan["unit_ids"][unit])
+            if (saved and saved.get("key") == plan["cache_keys"][unit]) or (
+                result_cache and result_cache.get(plan["cache_keys"][unit]) is not None
+            ):
+                skipped.append(unit)
+    pending = [unit for unit in plan["units"] if unit not in skipped]
+
+    def planned_call(unit, label, model, wave, cache, write=False, cat_key=None):
+        """Expected usage of one call; ``cat_key`` re-runs that category alone (escalation)."""
+        group = cat_key or unit[0]
+        if cat_key:
+            template, cat_keys, max_tokens = plan["templates"][cat_key], [cat_key], 4096
+        else:
+            template, cat_keys = plan["group_templates"][group], plan["groups"][group]
+            max_tokens = plan["max_tokens"]
+        max_tokens = output_limit(model, max_tokens)
+        system, messages = build_messages(template, plan["unit_texts"][unit], cache)
+        items = sum(len(item_queries(plan["templates"][c])) for c in cat_keys)
+        call = {
+            "label": label,
+            "model": model,
+            "wave": wave,
+            "input_tokens": request_tokens(system, messages),
+            "output_tokens": latency_model.expected_output(
+                group, min(max_tokens, ESTIMATE_OUTPUT_BASE + ESTIMATE_OUTPUT_PER_ITEM * items)
+            ),
+        }
+        if cache:
+            prefix = request_tokens(system, [{"content": messages[0]["content"][:1]}])
+            call["input_tokens"] -= prefix
+            call["cache_creation_input_tokens" if write else "cache_read_input_tokens"] = prefix
+        return call
+
+    # First pass: with the prompt cache one unit per chunk writes the prefix first
+    warm = {}
+    if prompt_cache:
+        for unit in pending:
+            warm.setdefault(unit[1], unit)
+    calls = [
+        planned_call(
+            unit, unit[0], first_model,
+            wave=0 if unit in warm.values() or not warm else 1,
+            cache=prompt_cache, write=unit in warm.values(),
+        )
+        for unit in pending
+    ]
+
+    # Extra sample rounds, as many as the budget allows
+    sampling = None
+    if samples > 1:
+        sample_round = [
+            planned_call(unit, f"{unit[0]}:sample", first_model, wave=2, cache=True)
+            for unit in plan["units"]
+        ]
+        round_cost = sum(sample_cost(first_model, call) for call in sample_round)
+        rounds = samples - 1
+        if sample_budget_usd and round_cost > 0:
+            rounds = min(rounds, int(sample_budget_usd // round_cost))
+        calls += sample_round * rounds
+        sampling = {"samples": samples, "rounds": rounds, "round_cost_usd": round(round_cost, 6)}
+
+    rate = {"rpm": limiter.requests.capacity, "itpm": limiter.tokens.capacity}
+    tiers = None
+    if tiered:
+        # Worst case: every category escalated to MODEL, one call per chunk
+        escalations = []
+        for group, cat_keys in plan["groups"].items():
+            for cat_key in cat_keys:
+                for c in plan["chunks"]:
+                    escalations.append(planned_call(
+                        (group, c["index"]), f"{cat_key}:escalate", MODEL, wave=0, cache=False,
+                        cat_key=cat_key,
+                    ))
+        tiers = {
+            "fast_model": EVAL_FAST_MODEL,
+            "primary_model": MODEL,
+            "max_escalation": estimate_calls(escalations, latency_model, concurrency, **rate),
+        }
+
+    chunk_plan = plan["chunk_plan"]
+    return {
+        "model": first_model,
+        "engine": plan["engine"],
+        "context_mode": plan["context_mode"],
+        "ng_mode": plan["ng_mode"],
+        "prompt_cache": bool(prompt_cache),
+        "concurrency": concurrency,
+        "transcript_chars": len(transcript),
+        "transcript_tokens": estimate_tokens(plan["source_text"]),
+        "truncated": plan["truncated"],
+        "chunking": {
+            "chunks": len(plan["chunks"]),
+            "total": chunk_plan["total"],
+            "skipped": chunk_plan["skipped"],
+            "transcript_tokens": chunk_plan["tokens"],
+        } if chunk_plan else None,
+        "compaction": plan["compacted"]["stats"] if plan["compacted"] else None,
+        "retrieval": plan["retrieval"],
+        "units": len(plan["units"]),
+        "cached_units": [plan["unit_ids"][unit] for unit in skipped],
+        **estimate_calls(calls, latency_model, concurrency, **rate),
+        "sampling": sampling,
+        "tiers": tiers,
+        "latency_model": latency_model_info(latency_model),
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+
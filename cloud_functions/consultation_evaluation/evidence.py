@@ -0,0 +1,208 @@
+"""
+根拠引用（evidence）の照合
+
+評価結果の各項目の evidence は文字起こしからの引用のはずだが、モデルが言い換えたり
+存在しない発言を作ったりすることがある。文字起こしに1回だけ文字 n-gram の位置索引を作り、
+各引用を索引で探して元テキスト上の位置と類似度を付け、見つからない引用を検出する。
+
+照合の手順（引用の長さにほぼ比例する時間。22件で数ミリ秒〜数十ミリ秒）:
+    1. 文字起こし・引用とも NFKC 正規化・小文字化し、空白・句読点・括弧を除く
+    2. 引用を「…」等の省略記号で断片に分け、断片の n-gram ごとに索引の出現位置を引き、
+       （出現位置 − 断片内位置）の対角線ごとに票を数える（出現が多すぎる n-gram は数えない）
+    3. 票の多い対角線の周辺を断片と整列し、一致した文字数 / 断片の文字数を類似度とする
+
+照合結果（verification）:
+    {"status": "exact" | "fuzzy" | "unlocated" | "none", "similarity", "offset", "end"}
+    none は引用が空・「該当なし」等で照合しなかったもの。offset / end は元テキスト上の位置
+    （unlocated・none では None）。
+"""
+
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+from common.compaction import to_original_span
+from ng_scan import normalize
+
+NGRAM = 3
+MIN_SIMILARITY = 0.7       # これ未満は unlocated
+MAX_POSTINGS = 500         # 出現がこれより多い n-gram は票に使わない（「ですね」等）
+CANDIDATES = 3             # 整列を試す対角線の数
+BAND = 8                   # 対角線をまとめる幅（脱字・挿入の許容）
+
+# 照合しない文字（空白・句読点・括弧・引用符）
+_IGNORED = re.compile(r"[\s、。，．,.!?！？「」『』（）()\[\]【】〔〕\"'“”‘’・:：;；\-—―─…‥〜~]")
+# 引用内の省略（断片の区切り）
+_ELLIPSIS = re.compile(r"…+|\.{2,}|・{2,}|‥+|〔…中略…〕|（中略）|\(中略\)")
+# 引用がないことを示す回答
+_NO_EVIDENCE = re.compile(r"^(該当(なし|する(発言|箇所)はありません)|なし|特になし|n/?a|none|-+|…+|\.+)$",
+                          re.IGNORECASE)
+
+
+def _fold(text: str) -> tuple:
+    """照合用に正規化したテキストと、各文字 → 元の文字位置の対応を返す"""
+    normalized, offsets = normalize(text)
+    chars = []
+    positions = []
+    for ch, pos in zip(normalized, offsets):
+        if not _IGNORED.match(ch):
+            chars.append(ch)
+            positions.append(pos)
+    return "".join(chars), positions
+
+
+def _fragments(quote: str) -> list:
+    """引用を省略記号で断片に分け、照合用に正規化する（短すぎる断片は除く）"""
+    fragments = []
+    for part in _ELLIPSIS.split(quote):
+        folded = _fold(part)[0]
+        if len(folded) >= 2:
+            fragments.append(folded)
+    return fragments
+
+
+class EvidenceIndex:
+    """文字 n-gram の位置索引（評価1回につき1つ作る）
+
+    compacted（common/compaction.py の結果）を渡すとコンパクション後のテキストを索引し、
+    位置はコンパクション前の元テキスト上で返す。
+    """
+
+    def __init__(self, text: str, compacted: dict = None, ngram: int = NGRAM):
+        if compacted:
+            text = compacted["text"]
+        self.text = text
+        self.compacted = compacted
+        self.ngram = ngram
+        self.folded, self.positions = _fold(text)
+        postings = {}
+        folded = self.folded
+        for i in range(len(folded) - ngram + 1):
+            gram = folded[i:i + ngram]
+            found = postings.get(gram)
+            if found is None:
+                postings[gram] = [i]
+            else:
+                found.append(i)
+        self.postings = postings
+
+    def _candidates(self, fragment: str) -> list:
+        """断片の n-gram の票が多い対角線（断片の推定開始位置）を返す"""
+        n = self.ngram
+        if len(fragment) < n:
+            starts = []
+            pos = self.folded.find(fragment)
+            while pos >= 0 and len(starts) < CANDIDATES:
+                starts.append(pos)
+                pos = self.folded.find(fragment, pos + 1)
+            return starts
+
+        votes = Counter()
+        for q in range(len(fragment) - n + 1):
+            found = self.postings.get(fragment[q:q + n])
+            if not found or len(found) > MAX_POSTINGS:
+                continue
+            for p in found:
+                votes[(p - q) // BAND] += 1
+        return [band * BAND for band, _ in votes.most_common(CANDIDATES)]
+
+    def _align(self, fragment: str, start: int) -> tuple:
+        """推定開始位置の周辺と断片を整列し、(一致文字数, 開始, 終了) を返す（正規化テキスト上）"""
+        slack = BAND + len(fragment) // 4
+        lo = max(0, start - slack)
+        window = self.folded[lo:start + len(fragment) + slack]
+        blocks = [b for b in SequenceMatcher(None, fragment, window, autojunk=False).get_matching_blocks()
+                  if b.size]
+        if not blocks:
+            return 0, None, None
+        matched = sum(b.size for b in blocks)
+        return matched, lo + blocks[0].b, lo + blocks[-1].b + blocks[-1].size
+
+    def locate(self, quote: str, min_similarity: float = MIN_SIMILARITY) -> dict:
+        """引用を探し、照合結果（verification）を返す"""
+        quote = (quote or "").strip()
+        if not quote or _NO_EVIDENCE.match(_fold(quote)[0] or quote):
+            return {"status": "none", "similarity": None, "offset": None, "end": None}
+
+        fragments = _fragments(quote)
+        total = sum(len(f) for f in fragments)
+        matched = 0
+        spans = []
+        for fragment in fragments:
+            best = (0, None, None)
+            for start in self._candidates(fragment):
+                aligned = self._align(fragment, start)
+                if aligned[0] > best[0]:
+                    best = aligned
+                    if aligned[0] == len(fragment):
+                        break
+            matched += best[0]
+            if best[1] is not None and best[0] >= len(fragment) * min_similarity:
+                spans.append(best[1:])
+
+        similarity = round(matched / total, 3) if total else 0.0
+        if similarity < min_similarity or not spans:
+            return {"status": "unlocated", "similarity": similarity, "offset": None, "end": None}
+        start = self.positions[min(s for s, _ in spans)]
+        end = self.positions[max(e for _, e in spans) - 1] + 1
+        if self.compacted:
+            start, end = to_original_span(self.compacted["offsets"], start, end)
+        return {
+            "status": "exact" if matched == total else "fuzzy",
+            "similarity": similarity,
+            "offset": start,
+            "end": end,
+        }
+
+
+def verify_evidence(index: EvidenceIndex, evidence: dict, min_similarity: float = MIN_SIMILARITY) -> dict:
+    """{項目番号: {"evidence", ...}} の各引用を照合し、{項目番号: verification} を返す"""
+    return {
+        num: index.locate(ev.get("evidence", "") if isinstance(ev, dict) else "", min_similarity)
+        for num, ev in evidence.items()
+    }
+
+
+def unlocated_items(verifications: dict) -> list:
+    return sorted((num for num, v in verifications.items() if v["status"] == "unlocated"), key=int)
+
+
+def summarize_verifications(verifications: dict, item_categories: dict) -> dict:
+    """照合結果の件数をまとめる（item_categories は {項目番号: カテゴリキー}）"""
+    counts = Counter(v["status"] for v in verifications.values())
+    categories = {}
+    for num, v in verifications.items():
+        cat = categories.setdefault(item_categories.get(num, ""), {"checked": 0, "unlocated": []})
+        cat["checked"] += 1
+        if v["status"] == "unlocated":
+            cat["unlocated"].append(num)
+    for cat in categories.values():
+        cat["unlocated"].sort(key=int)
+    return {
+        "checked": len(verifications),
+        "exact": counts["exact"],
+        "fuzzy": counts["fuzzy"],
+        "unlocated": unlocated_items(verifications),
+        "none": counts["none"],
+        "categories": categories,
+    }
+
+
+REASK_NOTE = """
+
+### 根拠引用の確認（再評価）
+
+前回の評価では、以下の項目の evidence が文字起こしの中に見つかりませんでした: {items}
+evidence には文字起こしの発言をそのまま（要約・言い換えをせずに）引用してください。
+該当する発言がない場合は evidence を「該当なし」とし、その旨を reasoning に書いてください。
+"""
+
+
+def reask_prompt(prompt_template: str, items: list) -> str:
+    """見つからなかった項目を明示して引用し直させるプロンプト"""
+    note = REASK_NOTE.format(items="、".join(f"No.{num}" for num in items))
+    marker = "### 文字起こしテキスト"
+    if marker in prompt_template:
+        head, tail = prompt_template.split(marker, 1)
+        return head.rstrip("\n") + note + "\n" + marker + tail
+    return prompt_template + note
@@ -0,0 +1,129 @@
+"""
+評価ジョブ管理（非同期ジョブモード）
+
+action=submit でジョブIDを即時に返し、評価はバックグラウンドスレッドで実行する。
+進捗（カテゴリ別の途中結果）と最終結果はストア（store.py）に保存され、
+action=status で参照できる。callback_url を指定すると完了時に結果を POST する。
+コールバックの本文に共有シークレットは入れず、X-Signature ヘッダー
+（"sha256=" + HMAC-SHA256(共有シークレット, 本文) の16進）で署名する。受信側は
+同じ計算で本文を検証すること（callback_signature）。
+
+注意:
+    Cloud Functions Gen2 はレスポンス返却後に CPU が絞られるため、
+    ジョブモードを使う場合は CPU 常時割り当て（Cloud Run: --no-cpu-throttling）で運用する。
+    複数インスタンスで status を参照する場合、ストアは gcs を使用すること。
+    ジョブの記録は max_age 秒（EVAL_RECORD_TTL_HOURS）更新がなければ submit 時の sweep で削除する。
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+import traceback
+import uuid
+from datetime import datetime, timezone
+
+from store import sweep_expired
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_ERROR = "error"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def callback_signature(secret: str, body: bytes) -> str:
+    """コールバック本文の X-Signature ヘッダー値"""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class JobManager:
+    """ジョブの登録・進捗更新・完了通知"""
+
+    def __init__(self, store, callback_secret: str = "", callback_timeout: float = 30, max_age: float = 0):
+        self.store = store
+        self.callback_secret = callback_secret
+        self.callback_timeout = callback_timeout
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _key(self, job_id: str) -> str:
+        return f"jobs/{job_id}"
+
+    def get(self, job_id: str):
+        return self.store.get_json(self._key(job_id))
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self.get(job_id) or {"job_id": job_id}
+            job.update(fields)
+            job["updated_at"] = _now()
+            self.store.put_json(self._key(job_id), job)
+            return job
+
+    def record_partial(self, job_id: str, cat_key: str, summary: dict):
+        """カテゴリ1件分の途中結果を追記する"""
+        with self._lock:
+            job = self.get(job_id) or {"job_id": job_id}
+            job.setdefault("partial", {})[cat_key] = summary
+            job["updated_at"] = _now()
+            self.store.put_json(self._key(job_id), job)
+
+    def submit(self, run, metadata: dict, callback_url: str = "") -> str:
+        """ジョブを登録してバックグラウンドで run(on_category) を実行する
+
+        run は on_category(cat_key, summary) を受け取り最終結果 dict を返す関数。
+        """
+        sweep_expired(self.store, "jobs", self.max_age)
+        job_id = uuid.uuid4().hex
+        self._update(
+            job_id,
+            status=JOB_STATUS_QUEUED,
+            evaluation_id=metadata.get("evaluation_id", ""),
+            created_at=_now(),
+            callback_url=callback_url,
+            partial={},
+        )
+        thread = threading.Thread(
+            target=self._run, args=(job_id, run, callback_url), name=f"eval-job-{job_id[:8]}"
+        )
+        thread.start()
+        return job_id
+
+    def _run(self, job_id: str, run, callback_url: str):
+        self._update(job_id, status=JOB_STATUS_RUNNING, started_at=_now())
+        try:
+            result = run(lambda cat_key, summary: self.record_partial(job_id, cat_key, summary))
+            job = self._update(job_id, status=JOB_STATUS_DONE, result=result, finished_at=_now())
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            traceback.print_exc()
+            job = self._update(job_id, status=JOB_STATUS_ERROR, error=str(e), finished_at=_now())
+
+        if callback_url:
+            self._send_callback(job_id, job, callback_url)
+
+    def _send_callback(self, job_id: str, job: dict, callback_url: str):
+        payload = {
+            "job_id": job_id,
+            "status": job.get("status"),
+            "evaluation_id": job.get("evaluation_id", ""),
+            "result": job.get("result"),
+            "error": job.get("error"),
+        }
+        try:
+            import requests  # コールバック指定時のみ使うため遅延 import
+
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            if self.callback_secret:
+                headers["X-Signature"] = callback_signature(self.callback_secret, body)
+            resp = requests.post(callback_url, data=body, headers=headers, timeout=self.callback_timeout)
+            callback_status = resp.status_code
+        except Exception as e:
+            print(f"Job {job_id} callback failed: {e}")
+            callback_status = f"error: {e}"
+        self._update(job_id, callback_status=callback_status)
@@ -0,0 +1,98 @@
+"""
+評価応答の JSON 抽出と修復
+
+モデル応答からコードブロック・前後の説明文を除いて JSON を取り出し、
+よくある崩れ（末尾カンマ・全角引用符・max_tokens による途中切れ）を決定的に直す。
+ローカルで直せない場合は呼出側が REPAIR_PROMPT で整形のみを再依頼する（文字起こしは再送しない）。
+"""
+
+import json
+import re
+
+REPAIR_SYSTEM_PROMPT = "あなたは壊れたJSONを修復するツールです。内容は変更せず、有効なJSONのみを出力してください。"
+
+REPAIR_PROMPT = """以下は評価結果のJSONですが、構文が壊れていて読み込めません。
+キー・値・スコアは変更せず、構文だけを直した有効なJSONを出力してください。
+途中で切れている場合は、最後の完全な項目までを残して括弧を閉じてください。
+説明文やマークダウンは不要です。
+
+{text}"""
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+
+def strip_fences(text: str) -> str:
+    """マークダウンのコードブロックを外す"""
+    text = text.strip()
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0].strip()
+    return text
+
+
+def _scan(text: str):
+    """文字列リテラル外の未閉括弧（閉じ文字のスタック）と、最後に値が完結した位置を返す"""
+    stack = []
+    in_string = False
+    escaped = False
+    last_complete = 0
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            last_complete = i + 1
+        elif ch == ",":
+            last_complete = i
+    return stack, in_string, last_complete
+
+
+def _close_truncated(text: str) -> str:
+    """途中で切れた JSON を最後の完全な値までで閉じる"""
+    stack, in_string, last_complete = _scan(text)
+    if not stack and not in_string:
+        return text
+    head = text[:last_complete].rstrip().rstrip(",")
+    stack, _, _ = _scan(head)
+    return head + "".join(reversed(stack))
+
+
+def parse_json_response(text: str) -> dict:
+    """モデル応答から JSON を読み込む。直せない場合は json.JSONDecodeError"""
+    text = strip_fences(text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        error = e
+
+    start = text.find("{")
+    candidate = text[start:] if start >= 0 else text
+    end = candidate.rfind("}")
+    attempts = []
+    if end >= 0:
+        attempts.append(candidate[:end + 1])
+    attempts.append(candidate)
+
+    for attempt in attempts:
+        attempt = _TRAILING_COMMA.sub(r"\1", attempt.translate(_SMART_QUOTES))
+        for fixed in (attempt, _close_truncated(attempt)):
+            try:
+                result = json.loads(fixed)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(result, dict):
+                return result
+    raise error
@@ -3,178 +3,232 @@
 
 ICMCI CMC・Schein理論・SERVQUAL・MITIに基づく22項目の学術的評価。
 Claude API × 6回分割呼出による精密評価を実行。
+評価の本体は engine.py（eval-app の modules/evaluator.py と共用）、このモジュールは HTTP の入口とジョブ。
+6カテゴリの呼出はスレッドで並列実行する（parallel=false で従来の逐次実行）。
+prompt_cache=true ではシステムプロンプト＋文字起こしを共通プレフィックスとして
+キャッシュし、2回目以降のカテゴリ呼出で再利用する。
+EVAL_CACHE_BACKEND を設定するとカテゴリ単位の評価結果をキャッシュし、
+同一の文字起こし・プロンプト・モデルでの再実行では Claude を呼び出さない。
+
+Actions (request body "action"):
+    evaluate (default): 評価を実行して結果を返す（同期）
+    submit: ジョブIDを即時に返し、バックグラウンドで評価する（callback_url 任意）
+    status: job_id のジョブ状態・途中結果（partial）・最終結果（result）を返す
+    metrics: レート制御スケジューラの待ち行列の深さ・待ち時間・再試行回数を返す
+    estimate: Claude を呼ばずに、同じオプションで評価した場合の呼出回数・入出力トークン数・
+              推定コスト・所要時間を返す（estimate_evaluation、所要時間は common/estimate.py）
+
+engine=single では6カテゴリ・22項目を1回の呼出でまとめて評価する（prompts/call_all.txt）。
+比較用ベンチマークは eval-app/benchmark.py。
+
+Claude 呼出はすべて common/ratelimit.py のスケジューラを経由し、RPM/ITPM 予算内で
+実行する（429/529 はバックオフして再試行）。action=metrics で待ち行列の状況を返す。
+リクエストの priority（interactive / pipeline / bulk、既定 pipeline）で優先度クラスを指定し、
+スケジューラはクラスの重みによる公平キューで順番を決める（一括の再採点がダッシュボードの
+評価を待たせない）。クラス別の待ち時間・所要時間は action=metrics の "classes"。
+各呼出の所要時間・待ち時間・トークン数・再試行・推定コストは応答の "telemetry" に集計する
+（common/telemetry.py、ラベルは呼出グループ＝カテゴリまたは "all"）。
+
+失敗したカテゴリ呼出はバックオフして再試行し、壊れた JSON 応答は修復する（json_repair.py）。
+それでも失敗したカテゴリがあれば partial=true・failed_categories を返す。完了済みの呼出は
+evaluation_id ごとに保存され、同じ evaluation_id の再リクエストでは失敗分だけを再実行する。
+保存先はジョブと同じストアで、インスタンスをまたいで再開するには EVAL_JOB_BACKEND=gcs が必要
+（local は /tmp でインスタンスごと）。全カテゴリが揃った時点で削除する。
+
+ng_mode（EVAL_NG_MODE）が candidates / local のときは NG語句を辞書（ng_words.tsv）で
+事前検出し、候補としてプロンプトに添える（candidates）か、モデルによる検出を省いてそのまま
+ng_words とする（local）。検出件数は応答の "ng_scan" に入る（ng_scan.py 参照）。
+
+各項目の evidence（根拠引用）は文字起こしの n-gram 索引で照合し（evidence.py）、元テキスト上の
+位置と類似度を evidence の "verification" に、件数を応答の "evidence_check" に入れる。
+evidence_check=reask では引用が見つからない項目のあるカテゴリだけを、その項目を示して1回再評価する。
+
+tiered=true（EVAL_TIERED）では高速モデル（EVAL_FAST_MODEL）で全カテゴリを評価し、結果の不備・
+際どいスコア・見つからない引用のあるカテゴリだけを主モデル（MODEL）で再評価する（tiers.py）。
+エスカレーションの内容と、常に主モデルを使った場合と比べたコスト・所要時間の見積もりは応答の "tiers" に入る。
+
+samples=N（EVAL_SAMPLES）では各カテゴリを N 回評価し、項目スコアを中央値で統合して項目ごとの
+ばらつきを応答の "sampling" に返す（sampling.py）。追加サンプルは共通プレフィックスをプロンプト
+キャッシュから読んで並列に実行し、予算（sample_budget_usd）・期限（sample_deadline）を超えない範囲で打ち切る。
+
+"transcript" の代わりに "transcripts"（[{"transcript", "evaluation_id", "consultant_name", ...}, ...]、
+最大 EVAL_MAX_TRANSCRIPTS 件）を送ると、複数の文字起こしを1回のリクエストでまとめて評価する
+（action=evaluate / submit、engine.py の evaluate_many）。全文字起こしのカテゴリ呼出は1つの
+同時実行数（concurrency、既定 EVAL_MULTI_CONCURRENCY）を共有し、応答の "results" に入力順で
+各文字起こしの結果を返す。カテゴリが失敗した文字起こしの番号は "partial"、評価自体が失敗した
+（{"success": false, "error"}）ものは "failed" に入り、他の文字起こしの結果には影響しない。
+submit では途中結果（partial）のキーが "{番号}:{カテゴリ}" になる。
 
 Deploy:
     gcloud functions deploy consultation_evaluation \
         --gen2 --runtime python311 --trigger-http \
         --timeout 600 --memory 1024MB \
-        --set-env-vars SHARED_SECRET=xxx,ANTHROPIC_API_KEY=xxx
+        --set-env-vars SHARED_SECRET=xxx,ANTHROPIC_API_KEY=xxx,EVAL_JOB_BACKEND=gcs,EVAL_JOB_LOCATION=xxx
+    # ジョブモード（action=submit）: 応答後もバックグラウンドの評価に CPU を割り当てる
+    gcloud run services update consultation-evaluation --no-cpu-throttling --region xxx
+
+デプロイ先（K_SERVICE が設定された環境）で EVAL_JOB_BACKEND=local のときは、status が別インスタンスに
+届くとジョブが見つからないため action=submit を 409（"jobs_available": false）で断る。
+クライアントは同期の action=evaluate で評価し直す（eval-app の evaluate_via_cf）。
+
+Optional env:
+    EVAL_PARALLEL: "false" で逐次実行 (default: "true")
+    EVAL_CONCURRENCY: 同時実行するカテゴリ呼出数 (default: 6)
+    EVAL_CALL_TIMEOUT: 1呼出あたりのタイムアウト秒 (default: 240)
+    EVAL_PROMPT_CACHE: "true" で共通プレフィックスのプロンプトキャッシュを使用 (default: "false")
+    EVAL_CACHE_BACKEND: 結果キャッシュの保存先 none / local / gcs / gcs-local (default: "none")
+    EVAL_CACHE_LOCATION: local はディレクトリ、gcs はバケット名 (default: /tmp/eval_cache)
+    EVAL_JOB_BACKEND: ジョブ状態の保存先 local / gcs / gcs-local (default: "local")
+    EVAL_JOB_LOCATION: local はディレクトリ、gcs はバケット名 (default: /tmp/eval_jobs)
+    EVAL_LONG_MODE: 上限超過時の扱い truncate（切り詰め）/ chunk（分割評価） (default: "truncate")
+    EVAL_CHUNK_CHARS: 分割評価の1チャンク最大文字数 (default: 60000)
+    EVAL_CHUNK_OVERLAP_CHARS: 隣接チャンクの重複文字数 (default: 3000)
+    EVAL_TOKEN_BUDGET: 分割評価で1カテゴリに送る文字起こしトークン合計の上限 (default: 300000)
+    EVAL_COMPACT: "true" で評価前に文字起こしをコンパクション (default: "false")
+    EVAL_COMPACT_RULES: 適用するコンパクションルール（カンマ区切り、default: 全ルール）
+    EVAL_CONTEXT_MODE: full（全文）/ retrieval（カテゴリ別の関連箇所のみ） (default: "full")
+    EVAL_PASSAGE_CHARS: retrieval のパッセージ文字数目安 (default: 800)
+    EVAL_RETRIEVAL_TOKENS: retrieval で1カテゴリに送る抜粋のトークン上限 (default: 20000)
+    EVAL_ENGINE: split（カテゴリ別6回呼出）/ single（1回呼出で全22項目） (default: "split")
+    ANTHROPIC_RPM / ANTHROPIC_ITPM / ANTHROPIC_MAX_RETRIES: レート制御（common/ratelimit.py 参照）
+    ANTHROPIC_REPLAY_MODE: record / replay で Claude 呼出を記録・再生（common/replay.py 参照）
+    ANTHROPIC_LATENCY_MODEL: action=estimate の所要時間モデル・呼出記録の JSON（common/estimate.py 参照）
+    EVAL_CATEGORY_RETRIES: 失敗したカテゴリ呼出の再試行回数 (default: 2)
+    EVAL_NG_MODE: NG語句の検出 llm（モデル）/ candidates（辞書の候補をモデルが判定）/ local（辞書のみ） (default: "llm")
+    EVAL_RETRY_BASE: カテゴリ再試行のバックオフ基準秒 (default: 2)
+    EVAL_EVIDENCE_CHECK: 根拠引用の照合 off / flag（照合のみ）/ reask（見つからないカテゴリを再評価） (default: "flag")
+    EVAL_EVIDENCE_MIN_SIMILARITY: 照合できたとみなす類似度の下限 (default: 0.7)
+    EVAL_TIERED: "true" で高速モデルで評価し、際どいカテゴリだけ主モデルで再評価 (default: "false")
+    EVAL_FAST_MODEL: tiered の1回目に使うモデル (default: "claude-3-5-haiku-20241022")
+    EVAL_ESCALATE_ON: エスカレーションの条件 error / items / borderline / evidence (default: 全て)
+    EVAL_ESCALATE_SCORES: 際どいとみなす項目スコア（カンマ区切り） (default: "3")
+    EVAL_ESCALATE_MIN_ITEMS: borderline とする際どいスコアの項目数 (default: 2)
+    EVAL_TIER_LATENCY_RATIO: 主モデル/高速モデルの所要時間比の既定値（節約の見積もり用） (default: 2.0)
+    EVAL_SAMPLES: カテゴリごとのサンプル数（1 で従来どおり） (default: 1)
+    EVAL_SAMPLE_TEMPERATURE: 2本目以降のサンプルの temperature (default: 1.0)
+    EVAL_SAMPLE_BUDGET_USD: 追加サンプルの推定コスト上限（0 で無制限） (default: 0)
+    EVAL_SAMPLE_DEADLINE: 評価開始から追加サンプルを待つ秒数（0 で無制限） (default: 0)
+    EVAL_MAX_TRANSCRIPTS: 1リクエストの transcripts の上限件数 (default: 50)
+    EVAL_MULTI_CONCURRENCY: transcripts の全カテゴリ呼出で共有する同時実行数 (default: 12)
+    EVAL_RECORD_TTL_HOURS: ジョブ・途中結果の保存期限（時間、更新から。0 で無期限） (default: 168)
+    EVAL_CALLBACK_HOSTS: callback_url に許可するホスト（カンマ区切り、空なら制限なし） (default: "")
 """
 
 import json
 import os
 import traceback
-from pathlib import Path
+from urllib.parse import urlparse
 
-import anthropic
 import functions_framework
 
+from common.ratelimit import get_limiter
+from common.replay import replay_mode
+from engine import (
+    ANTHROPIC_API_KEY,
+    EVAL_JOB_BACKEND,
+    EVAL_JOB_LOCATION,
+    EVAL_RECORD_TTL_HOURS,
+    estimate_evaluation,
+    evaluate_many,
+    evaluate_transcript,
+)
+from jobs import JobManager
+from store import get_store
+
 # ── Config ──
 SHARED_SECRET = os.environ.get("SHARED_SECRET", "")
-ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
-MODEL = "claude-sonnet-4-20250514"
-MAX_TRANSCRIPT_CHARS = 120000  # Claude context limit safety margin
-
-# ── Prompt loading ──
-PROMPTS_DIR = Path(__file__).parent / "prompts"
-
-def load_prompt(filename: str) -> str:
-    """Load a prompt template from the prompts directory."""
-    path = PROMPTS_DIR / filename
-    if path.exists():
-        return path.read_text(encoding="utf-8")
-    return ""
-
-SYSTEM_PROMPT = load_prompt("system.txt")
-
-CALL_PROMPTS = [
-    ("c1", "call1_problem.txt"),
-    ("c2", "call2_solution.txt"),
-    ("c3", "call3_communication.txt"),
-    ("c4", "call4_time.txt"),
-    ("c5", "call5_logic.txt"),
-    ("c6", "call6_ethics.txt"),
-]
-
-# ── Category metadata ──
-CATEGORY_MAX_SCORES = {
-    "c1": 20,  # 4 items x 5 points
-    "c2": 25,  # 5 items x 5 points
-    "c3": 20,  # 4 items x 5 points
-    "c4": 15,  # 3 items x 5 points
-    "c5": 15,  # 3 items x 5 points
-    "c6": 15,  # 3 items x 5 points
-}  # Total max: 110 points raw, scaled to 90
-
-TOTAL_RAW_MAX = sum(CATEGORY_MAX_SCORES.values())  # 110
-AI_SCALED_MAX = 90
-
-
-def scale_to_90(raw_total: int) -> int:
-    """Scale raw score (0-110) to AI score (0-90)."""
-    if raw_total <= 0:
-        return 0
-    return round(raw_total * AI_SCALED_MAX / TOTAL_RAW_MAX)
-
-
-def scale_category(raw_score: int, category: str) -> float:
-    """Scale individual category score proportionally to 90-point total."""
-    max_raw = CATEGORY_MAX_SCORES.get(category, 15)
-    if max_raw == 0:
-        return 0
-    return round(raw_score * (max_raw / TOTAL_RAW_MAX) * AI_SCALED_MAX, 1)
-
-
-# ── Claude API call ──
-
-def call_claude(client: anthropic.Anthropic, prompt: str, transcript: str) -> dict:
-    """Call Claude API with a specific evaluation prompt."""
-    user_content = prompt.replace("{transcript}", transcript)
-
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=4096,
-        temperature=0,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_content}],
-    )
-
-    text = response.content[0].text.strip()
-
-    # Extract JSON from response (handle markdown code blocks)
-    if "```json" in text:
-        text = text.split("```json")[1].split("```")[0].strip()
-    elif "```" in text:
-        text = text.split("```")[1].split("```")[0].strip()
-
-    return json.loads(text)
-
-
-# ── Main evaluation pipeline ──
-
-def evaluate_transcript(transcript: str, metadata: dict) -> dict:
-    """Run the full 6-call evaluation pipeline."""
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
-    # Truncate transcript if too long
-    if len(transcript) > MAX_TRANSCRIPT_CHARS:
-        transcript = transcript[:MAX_TRANSCRIPT_CHARS] + "\n\n[...テキストが長いため省略されました...]"
-
-    results = {}
-    all_item_scores = {}
-    all_evidence = {}
-    all_ng_words = []
-    raw_total = 0
-    category_scores = {}
-
-    for cat_key, prompt_file in CALL_PROMPTS:
-        prompt_template = load_prompt(prompt_file)
-        if not prompt_template:
-            print(f"Warning: prompt file {prompt_file} not found, skipping")
-            continue
-
-        try:
-            result = call_claude(client, prompt_template, transcript)
-            results[cat_key] = result
-
-            # Collect item scores and evidence
-            items = result.get("items", {})
-            subtotal = 0
-            for item_num, item_data in items.items():
-                score = int(item_data.get("score", 3))
-                score = max(1, min(5, score))  # Clamp to 1-5
-                all_item_scores[item_num] = score
-                all_evidence[item_num] = {
-                    "evidence": item_data.get("evidence", ""),
-                    "reasoning": item_data.get("reasoning", ""),
-                }
-                subtotal += score
-
-            raw_total += subtotal
-            category_scores[cat_key] = subtotal
-
-            # Collect NG words
-            ng = result.get("ng_words", [])
-            if isinstance(ng, list):
-                all_ng_words.extend(ng)
-
-        except Exception as e:
-            print(f"Error in {cat_key}: {e}")
-            traceback.print_exc()
-            # Default scores for failed category
-            category_scores[cat_key] = 0
-
-    # Scale scores
-    ai_total = scale_to_90(raw_total)
-    scaled_categories = {}
-    for cat_key in ["c1", "c2", "c3", "c4", "c5", "c6"]:
-        scaled_categories[cat_key] = scale_category(
-            category_scores.get(cat_key, 0), cat_key
+EVAL_MAX_TRANSCRIPTS = int(os.environ.get("EVAL_MAX_TRANSCRIPTS", "50"))
+EVAL_CALLBACK_HOSTS = {
+    h.strip().lower() for h in os.environ.get("EVAL_CALLBACK_HOSTS", "").split(",") if h.strip()
+}
+
+# ── Job manager ──
+_job_manager = None
+
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            get_store(EVAL_JOB_BACKEND, EVAL_JOB_LOCATION),
+            callback_secret=SHARED_SECRET,
+            max_age=EVAL_RECORD_TTL_HOURS * 3600,
         )
+    return _job_manager
+
+
+def callback_error(callback_url: str):
+    """Why a submit's callback_url is refused, or None (https only; EVAL_CALLBACK_HOSTS if set)."""
+    if not callback_url:
+        return None
+    url = urlparse(callback_url)
+    if url.scheme != "https" or not url.hostname:
+        return "callback_url must be an https URL"
+    if EVAL_CALLBACK_HOSTS and url.hostname.lower() not in EVAL_CALLBACK_HOSTS:
+        return f"callback_url host is not allowed: {url.hostname}"
+    return None
+
+
+def jobs_available() -> bool:
+    """Whether job mode works here: a shared job store, or the local one outside a deployment."""
+    return EVAL_JOB_BACKEND != "local" or not os.environ.get("K_SERVICE")
 
+
+# ── HTTP entry point ──
+
+def evaluation_options(data: dict) -> dict:
+    """Pick evaluate_transcript keyword options out of a request body."""
     return {
-        "success": True,
-        "evaluation_id": metadata.get("evaluation_id", ""),
-        "ai_total": ai_total,
-        "raw_total": raw_total,
-        "categories": scaled_categories,
-        "item_scores": all_item_scores,
-        "evidence": all_evidence,
-        "ng_words": all_ng_words,
+        "parallel": data.get("parallel"),
+        "concurrency": data.get("concurrency"),
+        "call_timeout": data.get("call_timeout"),
+        "prompt_cache": data.get("prompt_cache"),
+        "use_cache": not data.get("refresh", False),
+        "long_mode": data.get("long_mode"),
+        "chunk_chars": data.get("chunk_chars"),
+        "chunk_overlap_chars": data.get("chunk_overlap_chars"),
+        "token_budget": data.get("token_budget"),
+        "compact": data.get("compact"),
+        "compact_rules": data.get("compact_rules"),
+        "context_mode": data.get("context_mode"),
+        "retrieval_tokens": data.get("retrieval_tokens"),
+        "engine": data.get("engine"),
+        "ng_mode": data.get("ng_mode"),
+        "evidence_check": data.get("evidence_check"),
+        "tiered": data.get("tiered"),
+        "samples": data.get("samples"),
+        "sample_budget_usd": data.get("sample_budget_usd"),
+        "sample_deadline": data.get("sample_deadline"),
+        "priority": data.get("priority"),
     }
 
 
-# ── HTTP entry point ──
+def request_metadata(data: dict) -> dict:
+    """Pick the evaluation metadata out of a request body or one "transcripts" item."""
+    return {
+        "evaluation_id": data.get("evaluation_id", ""),
+        "application_id": data.get("application_id", ""),
+        "consultant_name": data.get("consultant_name", ""),
+        "company_name": data.get("company_name", ""),
+        "industry": data.get("industry", ""),
+        "theme": data.get("theme", ""),
+    }
+
+
+def transcripts_error(data: dict, action: str):
+    """Why a multi-transcript request is invalid, or None."""
+    items = data["transcripts"]
+    if action not in ("evaluate", "submit"):
+        return f"transcripts is not supported by action={action}"
+    if not isinstance(items, list) or not items:
+        return "transcripts must be a non-empty list"
+    if len(items) > EVAL_MAX_TRANSCRIPTS:
+        return f"too many transcripts: {len(items)} (max {EVAL_MAX_TRANSCRIPTS})"
+    for n, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("transcript"):
+            return f"transcripts[{n}].transcript is required"
+    return None
+
 
 @functions_framework.http
 def consultation_evaluation(request):
@@ -199,38 +253,120 @@ def consultation_evaluation(request):
         if SHARED_SECRET and secret != SHARED_SECRET:
             return (json.dumps({"success": False, "error": "Unauthorized"}), 403, headers)
 
+        action = data.get("action", "evaluate")
+        if action not in ("evaluate", "submit", "status", "metrics", "estimate"):
+            return (
+                json.dumps({"success": False, "error": f"unknown action: {action}"}),
+                400,
+                headers,
+            )
+
+        if action == "submit" and not jobs_available():
+            return (
+                json.dumps({
+                    "success": False,
+                    "error": "job mode needs a shared job store (EVAL_JOB_BACKEND=gcs)",
+                    "jobs_available": False,
+                }),
+                409,
+                headers,
+            )
+
+        if action == "submit":
+            error = callback_error(data.get("callback_url", ""))
+            if error:
+                return (json.dumps({"success": False, "error": error}), 400, headers)
+
+        if action == "metrics":
+            return (json.dumps({"success": True, **get_limiter().metrics()}), 200, headers)
+
+        if action == "status":
+            job_id = data.get("job_id", "")
+            job = get_job_manager().get(job_id) if job_id else None
+            if not job:
+                return (
+                    json.dumps({"success": False, "error": "job not found"}),
+                    404,
+                    headers,
+                )
+            return (json.dumps({"success": True, **job}, ensure_ascii=False), 200, headers)
+
         # Validate
+        multi = "transcripts" in data
+        if multi:
+            error = transcripts_error(data, action)
+            if error:
+                return (json.dumps({"success": False, "error": error}), 400, headers)
         transcript = data.get("transcript", "")
-        if not transcript:
+        if not transcript and not multi:
             return (
                 json.dumps({"success": False, "error": "transcript is required"}),
                 400,
                 headers,
             )
 
-        if not ANTHROPIC_API_KEY:
+        if action == "estimate":
+            estimate = estimate_evaluation(
+                transcript, {"evaluation_id": data.get("evaluation_id", "")}, **evaluation_options(data)
+            )
+            return (json.dumps({"success": True, **estimate}, ensure_ascii=False), 200, headers)
+
+        if not ANTHROPIC_API_KEY and replay_mode() != "replay":
             return (
                 json.dumps({"success": False, "error": "ANTHROPIC_API_KEY not configured"}),
                 500,
                 headers,
             )
 
-        metadata = {
-            "evaluation_id": data.get("evaluation_id", ""),
-            "application_id": data.get("application_id", ""),
-            "consultant_name": data.get("consultant_name", ""),
-            "company_name": data.get("company_name", ""),
-            "industry": data.get("industry", ""),
-            "theme": data.get("theme", ""),
-        }
+        metadata = request_metadata(data)
+        options = evaluation_options(data)
+
+        if multi:
+            evaluations = [(item["transcript"], request_metadata(item)) for item in data["transcripts"]]
+            if action == "submit":
+                def run_many(on_category):
+                    return evaluate_many(evaluations, on_category=on_category, **options)
+
+                job_id = get_job_manager().submit(run_many, metadata, data.get("callback_url", ""))
+                print(f"Evaluation job submitted: {len(evaluations)} transcripts -> {job_id}")
+                return (
+                    json.dumps({"success": True, "job_id": job_id, "status": "queued"}),
+                    202,
+                    headers,
+                )
+
+            print(f"Starting evaluation of {len(evaluations)} transcripts")
+            result = evaluate_many(evaluations, **options)
+            print(
+                f"Evaluation complete: {result['count']} transcripts, "
+                f"{result['succeeded']} ok, {len(result['partial'])} partial, "
+                f"{len(result['failed'])} failed, {result['latency']}s, ${result['cost_usd']:.4f}"
+            )
+            return (json.dumps(result, ensure_ascii=False), 200, headers)
+
+        if action == "submit":
+            def run(on_category):
+                return evaluate_transcript(
+                    transcript, metadata, on_category=on_category, **options
+                )
+
+            job_id = get_job_manager().submit(run, metadata, data.get("callback_url", ""))
+            print(f"Evaluation job submitted: {metadata.get('evaluation_id', 'unknown')} -> {job_id}")
+            return (
+                json.dumps({"success": True, "job_id": job_id, "status": "queued"}),
+                202,
+                headers,
+            )
 
         print(f"Starting evaluation: {metadata.get('evaluation_id', 'unknown')}")
 
-        result = evaluate_transcript(transcript, metadata)
+        result = evaluate_transcript(transcript, metadata, **options)
 
         print(
             f"Evaluation complete: {metadata.get('evaluation_id', 'unknown')}, "
-            f"AI total: {result.get('ai_total', 0)}/90"
+            f"AI total: {result.get('ai_total', 0)}/90, "
+            f"{result['mode']} {result['latency']['total']}s, "
+            f"${result['telemetry']['total']['cost_usd']:.4f}"
         )
 
         return (json.dumps(result, ensure_ascii=False), 200, headers)
@@ -0,0 +1,215 @@
+"""
+NG語句の辞書による事前検出（Aho-Corasick 法）
+
+ng_words.tsv の語句一覧から Aho-Corasick オートマトンを作り、文字起こしを1回走査して
+全語句の出現を検出する（文字起こしの長さに比例する時間。10万文字で数十ミリ秒程度）。
+照合は NFKC 正規化・英字小文字化したテキストで行い、位置は元テキストの文字位置で返す。
+
+モード（EVAL_NG_MODE / リクエストの ng_mode）:
+    llm:        従来どおりカテゴリプロンプトの中でモデルが検出する（事前検出なし）
+    candidates: 事前検出した候補をプロンプトに添え、文脈上 NG かの判定をモデルに任せる
+    local:      事前検出の結果をそのまま ng_words とし、プロンプトから NG語句の検出指示を外す
+                （モデルの出力・入力トークンを節約する。文脈による判定は行わない）
+
+結果は LLM の ng_words と同じ {"text", "category", "context"} に
+offset / end（元テキスト上の位置）と source="dictionary" を加えた形式。
+"""
+
+import re
+import unicodedata
+from pathlib import Path
+
+NG_WORDS_FILE = Path(__file__).parent / "ng_words.tsv"
+NG_MODES = ("llm", "candidates", "local")
+CONTEXT_CHARS = 30
+MAX_CANDIDATES = 100  # candidates モードでプロンプトに載せる候補数の上限
+
+# カテゴリプロンプト内の「NG語句の検出」節（一括プロンプトでは見出しが1段深い）
+_NG_SECTION = re.compile(r"^#+ NG語句の検出\n.*?(?=^#+ |\Z)", re.MULTILINE | re.DOTALL)
+
+
+def _fold(ch: str) -> str:
+    return unicodedata.normalize("NFKC", ch).lower()
+
+
+def normalize(text: str) -> tuple:
+    """NFKC 正規化・小文字化したテキストと、正規化後の各文字 → 元の文字位置の対応を返す"""
+    table = {ord(ch): _fold(ch) for ch in set(text)}
+    if all(len(v) == 1 and not unicodedata.combining(v) for v in table.values()):
+        # 1文字 → 1文字（ほとんどの文字起こし）は位置がそのまま対応する
+        return text.translate(table), range(len(text))
+
+    chars = []
+    offsets = []
+    for i, ch in enumerate(text):
+        folded = table[ord(ch)]
+        if chars and len(folded) == 1 and unicodedata.combining(folded):
+            # 半角カナの濁点・半濁点（ｶﾞ → ガ）は直前の文字と合成する
+            composed = unicodedata.normalize("NFC", chars[-1] + folded)
+            if len(composed) == 1:
+                chars[-1] = composed
+                continue
+        chars.append(folded)
+        offsets.extend([i] * len(folded))
+    return "".join(chars), offsets
+
+
+def load_phrases(path: Path = NG_WORDS_FILE) -> list:
+    """辞書ファイルから [(語句, カテゴリ)] を読み込む"""
+    phrases = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        category, phrase = line.split("\t", 1)
+        phrases.append((phrase.strip(), category.strip()))
+    return phrases
+
+
+class NGScanner:
+    """語句一覧から作る Aho-Corasick オートマトン"""
+
+    def __init__(self, phrases: list):
+        # 状態ごとの遷移・失敗遷移・出力（語句番号）
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self.phrases = []
+        for phrase, category in phrases:
+            key = normalize(phrase)[0]
+            if not key:
+                continue
+            self.phrases.append({"phrase": phrase, "category": category, "length": len(key)})
+            state = 0
+            for ch in key:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state].append(len(self.phrases) - 1)
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matches(self, text: str) -> list:
+        """正規化済みテキスト中の全出現を [(開始, 終了, 語句番号)] で返す（重なりを含む）"""
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self.phrases
+        root = goto[0]
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            if state == 0:
+                state = root.get(ch, 0)
+            else:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            if out[state]:
+                for idx in out[state]:
+                    found.append((i + 1 - phrases[idx]["length"], i + 1, idx))
+        return found
+
+    def scan(self, text: str, context_chars: int = CONTEXT_CHARS) -> list:
+        """NG語句の候補を出現順に返す（重なる場合は先に始まる・長い方を採る）"""
+        normalized, offsets = normalize(text)
+        hits = []
+        last_end = -1
+        for start, end, idx in sorted(self.matches(normalized), key=lambda m: (m[0], -m[1])):
+            if start < last_end:
+                continue
+            last_end = end
+            orig_start = offsets[start]
+            orig_end = offsets[end - 1] + 1
+            if end < len(offsets) and offsets[end] > orig_end:
+                orig_end = offsets[end]  # 合成した濁点等を含める
+            phrase = self.phrases[idx]
+            hits.append({
+                "text": text[orig_start:orig_end],
+                "category": phrase["category"],
+                "context": text[max(0, orig_start - context_chars):orig_end + context_chars]
+                .replace("\n", " "),
+                "offset": orig_start,
+                "end": orig_end,
+                "phrase": phrase["phrase"],
+                "source": "dictionary",
+            })
+        return hits
+
+
+_scanner = None
+
+
+def get_scanner() -> NGScanner:
+    """ng_words.tsv から作ったオートマトン（プロセスで1回だけ構築する）"""
+    global _scanner
+    if _scanner is None:
+        _scanner = NGScanner(load_phrases())
+    return _scanner
+
+
+def scan_transcript(text: str) -> list:
+    return get_scanner().scan(text)
+
+
+def summarize_hits(hits: list) -> dict:
+    by_category = {}
+    for hit in hits:
+        by_category[hit["category"]] = by_category.get(hit["category"], 0) + 1
+    return {"hits": len(hits), "by_category": by_category}
+
+
+def has_ng_section(prompt: str) -> bool:
+    return bool(_NG_SECTION.search(prompt))
+
+
+def strip_ng_section(prompt: str) -> str:
+    """プロンプトから「NG語句の検出」節を除く（local モード）"""
+    return _NG_SECTION.sub("", prompt)
+
+
+def with_candidates(prompt: str, hits: list) -> str:
+    """「NG語句の検出」節の後に辞書で検出した候補を添える（candidates モード）"""
+    if not hits:
+        lines = ["辞書による事前検出では候補はありませんでした。"]
+    else:
+        lines = [
+            "以下は辞書で機械的に検出した候補です。文脈上NG語句に該当するものだけを ng_words に含めてください"
+            "（慣用的・肯定的な用法は除外。候補以外に見つけたNG語句も含めてよい）。",
+        ]
+        for hit in hits[:MAX_CANDIDATES]:
+            lines.append(f"- [{hit['category']}] 「{hit['text']}」… {hit['context']}")
+        if len(hits) > MAX_CANDIDATES:
+            lines.append(f"- （ほか {len(hits) - MAX_CANDIDATES} 件省略）")
+    block = "\n".join(lines) + "\n\n"
+
+    # 候補節は NG語句の検出節と同じ深さの見出しにする
+    match = _NG_SECTION.search(prompt)
+    if not match:
+        return prompt
+    level = match.group(0).split(" ", 1)[0]
+    return prompt[:match.end()] + f"{level} NG語句の候補（辞書による事前検出）\n\n{block}" + prompt[match.end():]
+
+
+def apply_ng_mode(prompt: str, mode: str, hits: list) -> str:
+    """ng_mode に応じてプロンプトを書き換える（NG語句の検出節が無いプロンプトはそのまま）"""
+    if mode == "llm" or not has_ng_section(prompt):
+        return prompt
+    if mode == "local":
+        return strip_ng_section(prompt)
+    return with_candidates(prompt, hits)
@@ -0,0 +1,97 @@
+"""
+評価結果キャッシュ（コンテンツアドレス方式）
+
+カテゴリ単位で (正規化した文字起こし, システムプロンプト, カテゴリプロンプト, MODEL)
+のハッシュをキーに結果を保存する。同一リクエストは即時に返り、
+プロンプトファイルを1つだけ変更した場合はそのカテゴリのみ再評価される。
+
+PartialResults は評価IDごとの途中結果で、一部カテゴリが失敗した評価を
+同じ evaluation_id で再実行すると、失敗したカテゴリだけを呼び出す。全カテゴリが揃った
+評価の途中結果は削除し、残ったもの（失敗したまま再実行されない評価）は max_age 秒で期限切れになる。
+"""
+
+import hashlib
+import json
+import threading
+import unicodedata
+from datetime import datetime, timezone
+
+from store import sweep_expired
+
+
+def normalize_transcript(text: str) -> str:
+    """キャッシュキー用の正規化（Unicode NFC・改行コード統一・行末空白除去）"""
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [line.rstrip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def category_key(transcript_hash: str, system_prompt: str, prompt_template: str, model: str) -> str:
+    """カテゴリ結果のキャッシュキー"""
+    parts = {
+        "transcript": transcript_hash,
+        "system": sha256(system_prompt),
+        "prompt": sha256(prompt_template),
+        "model": model,
+    }
+    return sha256(json.dumps(parts, sort_keys=True))
+
+
+class ResultCache:
+    """カテゴリ別評価結果のキャッシュ（保存先は store.py のストア）"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key: str):
+        entry = self.store.get_json(f"results/{key}")
+        if not entry or "result" not in entry:
+            return None
+        return entry["result"]
+
+    def put(self, key: str, result: dict, usage: dict = None):
+        self.store.put_json(f"results/{key}", {
+            "result": result,
+            "usage": usage or {},
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+
+class PartialResults:
+    """評価ID単位の途中結果（再実行時に完了済みの呼出を再利用する）
+
+    unit_id（"c1:0" 等）ごとに、結果と入力のキャッシュキーを保存する。
+    キーが一致する（文字起こし・プロンプト・モデルが同じ）ものだけを再利用する。
+    """
+
+    def __init__(self, store, max_age: float = 0):
+        self.store = store
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _key(self, evaluation_id: str) -> str:
+        return f"partials/{sha256(evaluation_id)}"
+
+    def clear(self, evaluation_id: str):
+        """完了した評価の途中結果を削除する"""
+        with self._lock:
+            self.store.delete(self._key(evaluation_id))
+
+    def load(self, evaluation_id: str) -> dict:
+        entry = self.store.get_json(self._key(evaluation_id)) or {}
+        return entry.get("units", {})
+
+    def record(self, evaluation_id: str, unit_id: str, key: str, result: dict, usage: dict = None):
+        sweep_expired(self.store, "partials", self.max_age)
+        with self._lock:
+            entry = self.store.get_json(self._key(evaluation_id)) or {
+                "evaluation_id": evaluation_id, "units": {},
+            }
+            entry["units"][unit_id] = {"key": key, "result": result, "usage": usage or {}}
+            entry["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self.store.put_json(self._key(evaluation_id), entry)
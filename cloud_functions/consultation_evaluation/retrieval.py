@@ -0,0 +1,171 @@
+"""
+カテゴリ別の関連箇所抽出（ローカル検索）
+
+文字起こしを話者ターン単位のパッセージに分割し、文字 bigram の BM25 索引を作る。
+各カテゴリプロンプトの評価項目説明（No.N ごと）をクエリとして、
+項目間で順番に上位パッセージを選び、トークン予算内の抜粋を作る。
+冒頭・末尾のパッセージ（導入・まとめ）は常に含める。
+
+外部サービス・追加依存なし。同一入力に対して結果は決定的。
+"""
+
+import math
+import re
+from collections import Counter
+
+from chunking import split_turns
+from common.tokens import estimate_tokens
+
+# BM25 パラメータ
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+OMISSION_MARK = "〔…中略…〕"
+CONTEXT_NOTE = (
+    "[注記: 以下は評価項目に関連する箇所を文字起こしから抜粋したものです。"
+    f"{OMISSION_MARK} は省略箇所を示します。]\n\n"
+)
+
+_ITEM_HEADER = re.compile(r"^\*\*No\.(\d+)\s*(.*?)\*\*", re.MULTILINE)
+_IGNORED_CHARS = re.compile(r"[\s、。，．,.!?！？「」『』（）()\[\]【】・:：\-—…〜~0-9０-９]")
+
+
+def _bigrams(text: str) -> list:
+    text = _IGNORED_CHARS.sub("", text)
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def item_queries(prompt_template: str) -> dict:
+    """カテゴリプロンプトの「### 評価項目」から項目番号ごとの説明文を取り出す"""
+    section = prompt_template
+    if "### 評価項目" in section:
+        section = section.split("### 評価項目", 1)[1]
+    section = section.split("### 文字起こしテキスト", 1)[0]
+
+    queries = {}
+    headers = list(_ITEM_HEADER.finditer(section))
+    for i, m in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(section)
+        body = "\n".join(
+            line for line in section[m.end():end].splitlines()
+            if "評価基準" not in line
+        )
+        title = re.sub(r"（.*?準拠）", "", m.group(2))
+        queries[m.group(1)] = f"{title}\n{body}"
+    return queries
+
+
+def segment(transcript: str, passage_chars: int = 800) -> list:
+    """話者ターンをまとめて passage_chars 前後のパッセージに分割する
+
+    Returns:
+        [{"index", "text", "offset"}]（offset は元テキスト上の開始位置）
+    """
+    passages = []
+    buf = ""
+    offset = 0
+    pos = 0
+    for turn in split_turns(transcript):
+        found = transcript.find(turn.strip("\n"), pos)
+        if found >= 0:
+            pos = found
+        if buf and len(buf) + len(turn) > passage_chars:
+            passages.append({"index": len(passages), "text": buf, "offset": offset})
+            buf = ""
+        if not buf:
+            offset = pos
+        buf += turn
+        pos += len(turn.strip("\n"))
+    if buf.strip():
+        passages.append({"index": len(passages), "text": buf, "offset": offset})
+    return passages
+
+
+class BM25Index:
+    """文字 bigram の BM25 索引"""
+
+    def __init__(self, passages: list):
+        self.passages = passages
+        self.term_freqs = [Counter(_bigrams(p["text"])) for p in passages]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        df = Counter()
+        for tf in self.term_freqs:
+            df.update(tf.keys())
+        n = len(passages)
+        self.idf = {
+            term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()
+        }
+
+    def scores(self, query: str) -> list:
+        terms = Counter(_bigrams(query))
+        result = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self.avg_length or 1))
+            score = 0.0
+            for term, qf in terms.items():
+                f = tf.get(term)
+                if f:
+                    score += self.idf[term] * f * (BM25_K1 + 1) / (f + norm)
+            result.append(score)
+        return result
+
+    def ranked(self, query: str) -> list:
+        """スコア降順（同点はパッセージ順）のパッセージ index 列"""
+        scores = self.scores(query)
+        return [i for i in sorted(range(len(scores)), key=lambda i: (-scores[i], i)) if scores[i] > 0]
+
+
+def select_context(index: BM25Index, queries: dict, token_budget: int) -> dict:
+    """項目ごとのランキングから順番に1件ずつ選び、予算内の抜粋を作る
+
+    Returns:
+        {"text": 抜粋（元の順序・省略記号付き）, "passages": [index...], "tokens": 概算トークン}
+    """
+    passages = index.passages
+    if not passages:
+        return {"text": "", "passages": [], "tokens": 0}
+
+    chosen = []
+    used = 0
+
+    def take(i):
+        nonlocal used
+        cost = estimate_tokens(passages[i]["text"])
+        if i in chosen or used + cost > token_budget:
+            return False
+        chosen.append(i)
+        used += cost
+        return True
+
+    # 導入・まとめは常に含める（時間管理・ネクストステップの評価に必要）
+    take(0)
+    take(len(passages) - 1)
+
+    rankings = [index.ranked(q) for _, q in sorted(queries.items(), key=lambda x: int(x[0]))]
+    cursors = [0] * len(rankings)
+    progressed = True
+    while progressed:
+        progressed = False
+        for r, ranking in enumerate(rankings):
+            while cursors[r] < len(ranking):
+                i = ranking[cursors[r]]
+                cursors[r] += 1
+                if i in chosen:
+                    continue
+                if take(i):
+                    progressed = True
+                break
+
+    chosen.sort()
+    parts = []
+    prev = -1
+    for i in chosen:
+        if i != prev + 1:
+            parts.append(OMISSION_MARK + "\n")
+        parts.append(passages[i]["text"])
+        prev = i
+    if prev != len(passages) - 1:
+        parts.append(OMISSION_MARK + "\n")
+
+    return {"text": CONTEXT_NOTE + "".join(parts), "passages": chosen, "tokens": used}
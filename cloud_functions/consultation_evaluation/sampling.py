@@ -0,0 +1,104 @@
+"""
+自己整合性サンプリング（samples=N）: 同じカテゴリを複数回評価し、項目スコアの中央値とばらつきを返す
+
+1本目は通常の評価（temperature=0・結果キャッシュ対象）、2本目以降は EVAL_SAMPLE_TEMPERATURE で
+サンプリングする（キャッシュしない）。各項目のスコアは全サンプルの中央値（.5 は切り上げ）とし、
+根拠・理由は中央値と同じスコアを付けたサンプル（1本目を優先）のものを使う。
+
+追加サンプルの呼出はカテゴリ・チャンクごとに並列に実行し、共通プレフィックス（システムプロンプト＋
+文字起こし）はプロンプトキャッシュから読む。コストは1本目の使用量から見積もり、予算（budget_usd）に
+収まる本数だけを実行する。期限（deadline）を過ぎた呼出は結果に含めない。
+
+段階評価（tiered）と併用した場合、エスカレーションの判定には統合後の結果を使う。主モデルの結果に
+置き換わったカテゴリはサンプリングの統計から外し、"replaced" に列挙する。
+"""
+
+import statistics
+
+from common.telemetry import estimate_cost
+
+
+def median_score(scores: list) -> int:
+    """スコアの中央値（偶数個で .5 になる場合は切り上げ）"""
+    return int(statistics.median(scores) + 0.5)
+
+
+def _score(item) -> int:
+    try:
+        return max(1, min(5, int(item.get("score"))))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def merge_samples(results: list) -> tuple:
+    """1カテゴリ分のサンプル結果（先頭が1本目）を中央値で統合する
+
+    Returns:
+        (統合した結果 dict（カテゴリ結果と同じ形式）, {項目番号: {"scores", "median", "mean", "variance"}})
+    """
+    results = [r for r in results if isinstance(r, dict)]
+    if not results:
+        return None, {}
+    base = results[0]
+    scores = {}
+    for result in results:
+        for num, item in (result.get("items") or {}).items():
+            score = _score(item)
+            if score is not None:
+                scores.setdefault(num, []).append((score, item))
+
+    items = {}
+    stats = {}
+    for num, pairs in scores.items():
+        values = [score for score, _ in pairs]
+        median = median_score(values)
+        chosen = next(item for score, item in pairs if score == median) if median in values else pairs[0][1]
+        items[num] = {**chosen, "score": median}
+        stats[num] = {
+            "scores": values,
+            "median": median,
+            "mean": round(statistics.mean(values), 2),
+            "variance": round(statistics.pvariance(values), 3),
+        }
+
+    merged = {**base, "items": items, "subtotal": sum(item["score"] for item in items.values())}
+    return merged, stats
+
+
+def sample_cost(model: str, usage: dict) -> float:
+    """1本目の使用量から追加サンプル1回のコストを見積もる（キャッシュ書込分はキャッシュ読込として数える）"""
+    usage = dict(usage)
+    usage["cache_read_input_tokens"] = (
+        usage.get("cache_read_input_tokens", 0) + usage.get("cache_creation_input_tokens", 0)
+    )
+    usage["cache_creation_input_tokens"] = 0
+    return estimate_cost(model, usage)
+
+
+def sampling_report(category_stats: dict, category_subtotals: dict, replaced=()) -> dict:
+    """カテゴリごとの項目統計・小計から応答の "sampling" の集計部分を作る
+
+    replaced のカテゴリ（サンプル後に別の結果へ置き換わったもの）は集計に含めない。
+    """
+    replaced = sorted(set(replaced) & set(category_stats))
+    items = {
+        num: s for cat_key, stats in category_stats.items() if cat_key not in replaced
+        for num, s in stats.items()
+    }
+    categories = {}
+    for cat_key, subtotals in category_subtotals.items():
+        if cat_key in replaced:
+            continue
+        categories[cat_key] = {
+            "samples": len(subtotals),
+            "subtotals": subtotals,
+            "variance": round(statistics.pvariance(subtotals), 3) if subtotals else None,
+        }
+    variances = [s["variance"] for s in items.values()]
+    return {
+        "items": dict(sorted(items.items(), key=lambda x: int(x[0]))),
+        "categories": categories,
+        "mean_item_variance": round(statistics.mean(variances), 3) if variances else None,
+        "unstable_items": sorted((num for num, s in items.items() if s["variance"] > 0), key=int),
+        "replaced": replaced,
+    }
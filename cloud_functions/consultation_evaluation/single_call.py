@@ -0,0 +1,80 @@
+"""
+全22項目の一括評価（1回呼出モード）
+
+6つのカテゴリプロンプトから評価項目・検出対象の部分と回答形式の例を取り出し、
+prompts/call_all.txt に埋め込んで1つのプロンプトにする。
+カテゴリ定義の正はカテゴリ別プロンプトのままとし、一括用に項目説明を重複させない。
+
+応答は {"categories": {"c1": {...}, ...}} で、split_result でカテゴリ別の
+結果（call_claude と同じ形式）に戻してから既存の集計処理に渡す。
+"""
+
+import json
+
+TRANSCRIPT_SECTION = "### 文字起こしテキスト"
+RESPONSE_FENCE = "```json"
+
+# 22項目の根拠・理由を1応答で返すため、カテゴリ別呼出より出力上限を大きくする
+SINGLE_MAX_TOKENS = 16000
+
+
+def category_section(prompt_template: str) -> str:
+    """カテゴリプロンプトから見出し・評価項目・検出対象の部分を取り出す
+
+    「以下の文字起こしテキストを分析し…」の指示文は一括プロンプト側で1回だけ述べる。
+    見出しは1段下げて一括プロンプトの中に収める。
+    """
+    section = prompt_template.split(TRANSCRIPT_SECTION, 1)[0]
+    lines = []
+    for line in section.strip().splitlines():
+        if line.startswith("以下の文字起こしテキストを分析し"):
+            continue
+        if not line.strip() and lines and not lines[-1].strip():
+            continue
+        if line.startswith("#"):
+            line = "#" + line
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def response_example(prompt_template: str) -> dict:
+    """カテゴリプロンプトの回答形式（JSON）の例を dict で返す"""
+    if RESPONSE_FENCE not in prompt_template:
+        return {}
+    block = prompt_template.split(RESPONSE_FENCE, 1)[1].split("```", 1)[0]
+    try:
+        example = json.loads(block)
+    except json.JSONDecodeError:
+        return {}
+    return example
+
+
+def build_single_prompt(template: str, tasks: list) -> str:
+    """一括評価プロンプトを組み立てる
+
+    Args:
+        template: prompts/call_all.txt の内容
+        tasks: [(cat_key, prompt_template), ...]（CALL_PROMPTS 順）
+
+    Returns:
+        {transcript} プレースホルダを残したプロンプト（カテゴリ別と同じく call_claude で置換する）
+    """
+    sections = "\n\n".join(category_section(prompt) for _, prompt in tasks)
+    example = {"categories": {cat_key: response_example(prompt) for cat_key, prompt in tasks}}
+    return (
+        template
+        .replace("{categories}", sections)
+        .replace("{response_format}", json.dumps(example, ensure_ascii=False, indent=2))
+    )
+
+
+def split_result(result: dict, cat_keys: list) -> dict:
+    """一括評価の応答をカテゴリ別の結果に分ける（欠けたカテゴリは None）"""
+    categories = (result or {}).get("categories", {})
+    if not isinstance(categories, dict):
+        categories = {}
+    split = {}
+    for cat_key in cat_keys:
+        data = categories.get(cat_key)
+        split[cat_key] = data if isinstance(data, dict) and "items" in data else None
+    return split
@@ -0,0 +1,215 @@
+"""
+JSON キー/値ストア（評価結果キャッシュ等の保存先）
+
+Backends:
+    local     : ローカルディレクトリ（LocalStore）
+    gcs       : GCS バケット（GCSStore + google.cloud.storage.Client）
+    gcs-local : GCSStore + LocalBucketClient（GCS API 互換のローカル代替。開発・検証用）
+
+キーは "/" 区切りの相対パス（例: "results/ab12.../c1"）。値は JSON 化可能な dict。
+
+sweep(prefix, max_age) は prefix 以下で max_age 秒以上更新されていないレコードを削除する
+（ジョブ・途中結果の保存期限。sweep_expired がプロセス内で間引いて呼ぶ）。gcs では
+バケットのライフサイクルルール（Age 条件の Delete）で同じ期限を設定してもよい。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+SWEEP_INTERVAL = 3600  # 同じストア・prefix の sweep はこの秒数に1回まで
+
+
+class LocalStore:
+    """ローカルディレクトリに JSON ファイルとして保存する"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get_json(self, key: str):
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+
+    def put_json(self, key: str, value: dict):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 書き込み途中のファイルを読まれないよう一時ファイル経由で置き換える
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def sweep(self, prefix: str, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in (self.root / prefix).rglob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass  # 並行する sweep が先に削除した
+        return removed
+
+
+class GCSStore:
+    """GCS バケットに JSON オブジェクトとして保存する
+
+    client は google.cloud.storage.Client 互換（bucket().blob() を持つ）であればよい。
+    """
+
+    def __init__(self, bucket_name: str, prefix: str = "", client=None):
+        if client is None:
+            from common.clients import storage_client
+            client = storage_client()
+        self.bucket = client.bucket(bucket_name)
+        self.prefix = prefix.strip("/")
+
+    def _blob(self, key: str):
+        name = f"{self.prefix}/{key}.json" if self.prefix else f"{key}.json"
+        return self.bucket.blob(name)
+
+    def get_json(self, key: str):
+        blob = self._blob(key)
+        if not blob.exists():
+            return None
+        try:
+            return json.loads(blob.download_as_text())
+        except ValueError:
+            return None
+
+    def put_json(self, key: str, value: dict):
+        self._blob(key).upload_from_string(
+            json.dumps(value, ensure_ascii=False),
+            content_type="application/json",
+        )
+
+    def delete(self, key: str):
+        blob = self._blob(key)
+        if blob.exists():
+            blob.delete()
+
+    def sweep(self, prefix: str, max_age: float) -> int:
+        name = f"{self.prefix}/{prefix}/" if self.prefix else f"{prefix}/"
+        cutoff = time.time() - max_age
+        removed = 0
+        for blob in self.bucket.list_blobs(prefix=name):
+            if blob.updated and blob.updated.timestamp() < cutoff:
+                blob.delete()
+                removed += 1
+        return removed
+
+
+# ── GCS 互換のローカル代替 ──
+
+class _LocalBlob:
+    def __init__(self, path: Path, name: str = ""):
+        self._path = path
+        self.name = name
+
+    @property
+    def updated(self):
+        if not self._path.exists():
+            return None
+        return datetime.fromtimestamp(self._path.stat().st_mtime, timezone.utc)
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def download_as_text(self) -> str:
+        return self._path.read_text(encoding="utf-8")
+
+    def upload_from_string(self, data, content_type=None):
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self._path)
+
+    def delete(self):
+        self._path.unlink()
+
+
+class _LocalBucket:
+    def __init__(self, root: Path):
+        self._root = root
+
+    def blob(self, name: str) -> _LocalBlob:
+        return _LocalBlob(self._root / name, name)
+
+    def list_blobs(self, prefix: str = ""):
+        if not self._root.exists():
+            return []
+        names = sorted(p.relative_to(self._root).as_posix() for p in self._root.rglob("*") if p.is_file())
+        return [self.blob(name) for name in names if name.startswith(prefix)]
+
+
+class LocalBucketClient:
+    """google.cloud.storage.Client の最小互換実装（root/<bucket>/<blob> に保存）"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def bucket(self, name: str) -> _LocalBucket:
+        return _LocalBucket(self.root / name)
+
+
+_last_sweep = {}
+_sweep_lock = threading.Lock()
+
+
+def sweep_expired(store, prefix: str, max_age: float) -> int:
+    """store の prefix 以下の古いレコードを削除する（max_age が 0 なら何もしない）
+
+    同じストア・prefix についてはプロセス内で SWEEP_INTERVAL 秒に1回だけ実際に走査する。
+    """
+    if store is None or max_age <= 0:
+        return 0
+    now = time.monotonic()
+    with _sweep_lock:
+        last = _last_sweep.get((id(store), prefix))
+        if last is not None and now - last < SWEEP_INTERVAL:
+            return 0
+        _last_sweep[(id(store), prefix)] = now
+    try:
+        removed = store.sweep(prefix, max_age)
+    except Exception as e:
+        print(f"Sweep of {prefix} failed: {e}")
+        return 0
+    if removed:
+        print(f"Swept {removed} expired records from {prefix}/")
+    return removed
+
+
+def get_store(backend: str, location: str, prefix: str = ""):
+    """backend 名からストアを生成する。"none" または空なら None。
+
+    location は local ではディレクトリ、gcs / gcs-local ではバケット名。
+    gcs-local のローカル保存先は STORE_LOCAL_GCS_ROOT（default: /tmp/gcs-local）。
+    """
+    backend = (backend or "none").lower()
+    if backend == "none":
+        return None
+    if backend == "local":
+        return LocalStore(Path(location) / prefix if prefix else location)
+    if backend == "gcs":
+        return GCSStore(location, prefix=prefix)
+    if backend == "gcs-local":
+        root = os.environ.get("STORE_LOCAL_GCS_ROOT", "/tmp/gcs-local")
+        return GCSStore(location, prefix=prefix, client=LocalBucketClient(root))
+    raise ValueError(f"Unknown store backend: {backend}")
@@ -0,0 +1,98 @@
+"""
+段階評価（tiered）: 高速・低コストのモデルで全カテゴリを評価し、判定が際どいカテゴリだけを主モデルで再評価する
+
+エスカレーションの条件（EVAL_ESCALATE_ON、カンマ区切り）:
+    error:      呼出・JSON の解析に失敗した（結果がない）
+    items:      プロンプトの評価項目（**No.N**）の一部が結果に無い、またはスコアが 1〜5 の整数でない
+    borderline: 際どいスコア（EVAL_ESCALATE_SCORES）の項目が EVAL_ESCALATE_MIN_ITEMS 件以上ある
+    evidence:   根拠引用が文字起こし中に見つからない項目がある（evidence.py の照合）
+
+節約の見積もり（tier_savings）:
+    コストは1回目の呼出（と修復呼出）のトークン数を主モデルの料金で数え直したものを「常に主モデル」の
+    コストとし、実際のコスト（高速モデル + エスカレーション）との差を節約額とする。
+    所要時間は1回目の経過時間に主モデル/高速モデルの所要時間比を掛けたものを「常に主モデル」の
+    経過時間とする。比はエスカレーションしたカテゴリの実測（同じカテゴリの呼出時間の比）、
+    実測が無ければ EVAL_TIER_LATENCY_RATIO を使う。
+"""
+
+from common.telemetry import estimate_cost
+
+ESCALATE_REASONS = ("error", "items", "borderline", "evidence")
+
+
+def escalation_reasons(
+    result: dict,
+    expected_items: list,
+    verifications: dict = None,
+    borderline_scores: tuple = (3,),
+    min_borderline: int = 2,
+    enabled: tuple = ESCALATE_REASONS,
+) -> list:
+    """カテゴリの1回目の結果を主モデルで再評価すべき理由の一覧（空ならエスカレーションしない）"""
+    reasons = []
+    if result is None:
+        return ["error"] if "error" in enabled else []
+
+    items = result.get("items") if isinstance(result.get("items"), dict) else {}
+    scores = {}
+    for num, item in items.items():
+        try:
+            score = int(item.get("score"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if 1 <= score <= 5:
+            scores[num] = score
+    if "items" in enabled and any(num not in scores for num in expected_items):
+        reasons.append("items")
+    if "borderline" in enabled:
+        borderline = sum(1 for score in scores.values() if score in borderline_scores)
+        if borderline >= min_borderline:
+            reasons.append("borderline")
+    if "evidence" in enabled and verifications:
+        if any(v["status"] == "unlocated" for v in verifications.values()):
+            reasons.append("evidence")
+    return reasons
+
+
+def tier_savings(
+    calls: list,
+    fast_model: str,
+    primary_model: str,
+    first_pass_time: float,
+    escalation_time: float,
+    latency_ratio: float,
+) -> dict:
+    """Telemetry の呼出記録から「常に主モデルで評価した場合」との差を見積もる
+
+    calls は Telemetry.calls()。ラベルが "<カテゴリ>:escalate" の呼出をエスカレーション、
+    fast_model の呼出を1回目として数える。
+    """
+    first = [c for c in calls if c["model"] == fast_model]
+    escalated = [c for c in calls if c["label"].split(":")[-1] == "escalate"]
+    actual_cost = sum(c["cost_usd"] for c in first + escalated)
+    baseline_cost = sum(estimate_cost(primary_model, c) for c in first)
+
+    # 同じカテゴリの1回目とエスカレーションの呼出時間の比（実測）
+    ratios = []
+    for call in escalated:
+        group = call["label"].split(":")[0]
+        fast_time = sum(c["call_time"] for c in first if c["label"].split(":")[0] == group)
+        if fast_time > 0 and not call["error"]:
+            ratios.append(call["call_time"] / fast_time)
+    measured = sum(ratios) / len(ratios) if ratios else None
+    ratio = measured or latency_ratio
+    baseline_time = first_pass_time * ratio
+    actual_time = first_pass_time + escalation_time
+
+    return {
+        "fast_model": fast_model,
+        "primary_model": primary_model,
+        "cost_usd": round(actual_cost, 6),
+        "baseline_cost_usd": round(baseline_cost, 6),
+        "cost_saved_usd": round(baseline_cost - actual_cost, 6),
+        "latency": round(actual_time, 2),
+        "baseline_latency": round(baseline_time, 2),
+        "latency_saved": round(baseline_time - actual_time, 2),
+        "latency_ratio": round(ratio, 2),
+        "latency_ratio_source": "measured" if measured else "default",
+    }
@@ -0,0 +1,93 @@
+"""
+consultation_evaluation のオフライン負荷試験（記録済みの Claude 応答を再生）
+
+common/replay.py の replay モードで evaluate_transcript を同時に複数実行し、
+並列実行・レート制御（429 注入時の再試行・待ち行列）・結果キャッシュの挙動と
+所要時間を API を呼ばずに測る。
+
+手順:
+    # 1. 実 API で1回評価して応答を記録する
+    ANTHROPIC_REPLAY_MODE=record ANTHROPIC_REPLAY_DIR=/tmp/rec python cloud_functions/load_test.py t1.txt t2.txt --requests 1
+    # 2. 記録を再生して負荷をかける（10% の呼出に 429、同時 8 評価、RPM 上限 50）
+    ANTHROPIC_REPLAY_429_RATE=0.1 ANTHROPIC_RPM=50 python cloud_functions/load_test.py t1.txt t2.txt \
+        --replay-dir /tmp/rec --requests 40 --concurrency 8
+
+Usage:
+    python cloud_functions/load_test.py TRANSCRIPT... [--requests 20] [--concurrency 4]
+        [--replay-dir DIR] [--options '{"engine": "single"}']
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for consultation_evaluation")
+    parser.add_argument("transcripts", nargs="+", help="Transcript files (used round-robin)")
+    parser.add_argument("--requests", type=int, default=20, help="Number of evaluations to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Evaluations running at once")
+    parser.add_argument("--replay-dir", help="Recording directory (sets ANTHROPIC_REPLAY_DIR)")
+    parser.add_argument("--options", default="{}", help="evaluate_transcript options as JSON")
+    args = parser.parse_args()
+
+    # main.py は import 時に環境変数を読むため先に設定する
+    if args.replay_dir:
+        os.environ["ANTHROPIC_REPLAY_DIR"] = args.replay_dir
+    os.environ.setdefault("ANTHROPIC_REPLAY_MODE", "replay")
+    sys.path.insert(0, str(Path(__file__).parent / "consultation_evaluation"))
+    import main as cf
+    from common.ratelimit import get_limiter
+
+    transcripts = [Path(p).read_text(encoding="utf-8") for p in args.transcripts]
+    options = json.loads(args.options)
+    print(f"Mode: {os.environ['ANTHROPIC_REPLAY_MODE']}, {args.requests} evaluations, "
+          f"concurrency {args.concurrency}, options {options}")
+
+    def run(n):
+        start = time.monotonic()
+        result = cf.evaluate_transcript(
+            transcripts[n % len(transcripts)], {"evaluation_id": f"load-{n}"}, **options
+        )
+        return result, time.monotonic() - start
+
+    latencies = []
+    partial = 0
+    retries = 0
+    queue_wait = 0.0
+    cache_hits = 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        futures = [pool.submit(run, n) for n in range(args.requests)]
+        for future in as_completed(futures):
+            result, latency = future.result()
+            latencies.append(latency)
+            partial += bool(result.get("partial"))
+            retries += result["rate_limit"]["retries"]
+            queue_wait += result["rate_limit"]["queue_wait"]
+            cache_hits += len(result["result_cache"]["hits"])
+    wall = time.monotonic() - started
+
+    print(f"\n{'='*50}")
+    print(f"Wall time: {wall:.1f}s  ({args.requests / wall * 60:.1f} evaluations/min)")
+    print(f"Latency: p50 {percentile(latencies, 50):.2f}s  p95 {percentile(latencies, 95):.2f}s  "
+          f"max {max(latencies):.2f}s  mean {statistics.mean(latencies):.2f}s")
+    print(f"Partial results: {partial}/{args.requests}")
+    print(f"Retries (429/529): {retries}  queue wait total: {queue_wait:.1f}s  result cache hits: {cache_hits}")
+    print(f"Scheduler: {json.dumps(get_limiter().metrics())}")
+
+
+if __name__ == "__main__":
+    main()
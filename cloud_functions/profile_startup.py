@@ -0,0 +1,143 @@
+"""
+Cloud Functions のコールドスタート計測（main.py の import 時間）
+
+各関数ディレクトリで新しい Python プロセスを起動して `import main` の所要時間を測り、
+python -X importtime の出力から main が直接 import するモジュールごとの累計時間と、
+トップレベルのパッケージ（anthropic・google・grpc 等）ごとの時間を集計する。
+import 時点で読み込まれた重い依存（HEAVY_MODULES）も表示する（遅延 import できていれば空）。
+
+依存パッケージが入っていない関数はエラーとして表示する（デプロイ環境と同じ requirements.txt を
+入れた環境で実行すること）。--json で結果を JSON 出力し、CI 等で推移を記録できる。
+
+Usage:
+    python cloud_functions/profile_startup.py [FUNCTION...] [--repeat 3] [--top 10] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+FUNCTIONS = [
+    "consultation_evaluation",
+    "transcript_to_report",
+    "report_to_notion",
+    "zoom_to_transcript",
+    "zoom_to_youtube",
+]
+
+# 初回の呼出まで読み込まずに済ませたいモジュール
+HEAVY_MODULES = [
+    "anthropic",
+    "googleapiclient.discovery",
+    "google.cloud.speech_v2",
+    "google.cloud.storage",
+    "google.oauth2.credentials",
+    "grpc",
+    "requests",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def parse_importtime(stderr: str) -> list:
+    """-X importtime の出力を [(深さ, モジュール名, 自身 us, 累計 us)] で返す（出力順）"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile_once(function: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT / function,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        lines = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        return {"error": lines[-1] if lines else f"exit {proc.returncode}"}
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+
+    # main の直下（深さ main+1）の import と、トップレベルのパッケージごとの自身時間
+    main_depth = next((d for d, name, _, _ in rows if name == "main"), 0)
+    direct = {}
+    packages = {}
+    for depth, name, self_us, cumulative_us in rows:
+        if depth == main_depth + 1:
+            direct[name] = direct.get(name, 0) + cumulative_us
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return {
+        "seconds": probe["seconds"],
+        "heavy": probe["heavy"],
+        "direct_ms": {k: v / 1000 for k, v in direct.items()},
+        "packages_ms": {k: v / 1000 for k, v in packages.items()},
+    }
+
+
+def profile(function: str, repeat: int) -> dict:
+    runs = [profile_once(function) for _ in range(max(1, repeat))]
+    errors = [r for r in runs if "error" in r]
+    if errors:
+        return {"function": function, "error": errors[0]["error"]}
+    # 時間は中央値の回のものを使う（OS のファイルキャッシュ等の揺れを避ける）
+    runs.sort(key=lambda r: r["seconds"])
+    median = runs[len(runs) // 2]
+    return {
+        "function": function,
+        "import_ms": round(statistics.median(r["seconds"] for r in runs) * 1000, 1),
+        "heavy_loaded": median["heavy"],
+        "direct_ms": {k: round(v, 1) for k, v in median["direct_ms"].items()},
+        "packages_ms": {k: round(v, 1) for k, v in median["packages_ms"].items()},
+    }
+
+
+def print_report(result: dict, top: int):
+    print(f"\n{result['function']}")
+    if "error" in result:
+        print(f"  error: {result['error']}")
+        return
+    print(f"  import main: {result['import_ms']:.1f}ms")
+    print(f"  heavy modules loaded at import: {', '.join(result['heavy_loaded']) or 'none'}")
+    print("  imported by main (cumulative):")
+    for name, ms in sorted(result["direct_ms"].items(), key=lambda x: -x[1])[:top]:
+        print(f"    {ms:>8.1f}ms  {name}")
+    print("  by top-level package (self):")
+    for name, ms in sorted(result["packages_ms"].items(), key=lambda x: -x[1])[:top]:
+        print(f"    {ms:>8.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile Cloud Function import (cold start) time")
+    parser.add_argument("functions", nargs="*", default=FUNCTIONS, help="Function directories")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per function (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Modules listed per section")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [profile(function, args.repeat) for function in args.functions]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        print_report(result, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Cloud Functions 共通モジュール
+
+正本は cloud_functions/common/。Cloud Functions は関数ディレクトリ単位で
+デプロイされるため、各関数ディレクトリに複製を置く（cloud_functions/sync_common.py で同期）。
+"""
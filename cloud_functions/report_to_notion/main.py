@@ -24,17 +24,9 @@ Google Docs の報告書ドラフトを PDF 化し、Notion Database にペー
 import os
 import json
 import tempfile
-import requests
 import functions_framework
-from googleapiclient.discovery import build
-import google.auth
 
-_creds = None
-def _get_creds():
-    global _creds
-    if _creds is None:
-        _creds, _ = google.auth.default()
-    return _creds
+from common.clients import google_service, http_session
 
 SHARED_SECRET = os.environ.get("SHARED_SECRET", "")
 NOTION_API_KEY = os.environ.get("NOTION_API_KEY", "")
@@ -45,7 +37,7 @@ NOTION_VERSION = "2022-06-28"
 
 def export_doc_as_pdf(doc_id):
     """Google Docs を PDF としてエクスポート"""
-    drive_service = build("drive", "v3", credentials=_get_creds())
+    drive_service = google_service("drive", "v3")
     request = drive_service.files().export_media(
         fileId=doc_id, mimeType="application/pdf"
     )
@@ -56,7 +48,7 @@ def export_doc_as_pdf(doc_id):
 
 def upload_pdf_to_drive(pdf_content, filename, folder_id=None):
     """PDF を Drive にアップロード"""
-    drive_service = build("drive", "v3", credentials=_get_creds())
+    drive_service = google_service("drive", "v3")
     from googleapiclient.http import MediaInMemoryUpload
 
     media = MediaInMemoryUpload(pdf_content, mimetype="application/pdf")
@@ -219,7 +211,7 @@ def create_notion_page(consultation_info, doc_url, pdf_url, report_summary):
         "children": children[:100],  # Notion API制限: 最大100ブロック
     }
 
-    resp = requests.post(
+    resp = http_session().post(
         f"{NOTION_API_URL}/pages",
         headers=headers,
         json=body,
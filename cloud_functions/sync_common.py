@@ -0,0 +1,118 @@
+"""
+共通モジュール（cloud_functions/common/）を各 Cloud Function ディレクトリへ複製する
+
+Cloud Functions は関数ディレクトリ単位でデプロイされるため、共通コードは
+各関数ディレクトリの common/ に複製して同梱する。common/ を編集したら実行すること。
+複製するのは TARGETS で関数ごとに宣言したモジュールと、それらが import する common モジュールだけ。
+関数のコードが宣言外の common モジュールを import していれば --check は失敗する。
+
+Usage:
+    python cloud_functions/sync_common.py          # 複製を更新
+    python cloud_functions/sync_common.py --check  # 差分があれば終了コード1
+"""
+
+import argparse
+import ast
+import filecmp
+import shutil
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+SOURCE = ROOT / "common"
+
+# common/ を利用する関数ディレクトリと、その関数が直接 import するモジュール
+TARGETS = {
+    "consultation_evaluation": [
+        "clients", "compaction", "estimate", "ratelimit", "replay", "telemetry", "tokens",
+    ],
+    "transcript_to_report": [
+        "clients", "compaction", "estimate", "ratelimit", "replay", "telemetry", "tokens",
+    ],
+    "report_to_notion": ["clients"],
+    "zoom_to_transcript": ["clients"],
+    "zoom_to_youtube": ["clients"],
+}
+
+
+def common_imports(path: Path) -> set:
+    """ファイルが import する common モジュール名（関数内の遅延 import を含む）"""
+    names = set()
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.ImportFrom) and node.module:
+            if node.module.startswith("common."):
+                names.add(node.module.split(".")[1])
+            elif node.module == "common":
+                names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.Import):
+            names.update(
+                alias.name.split(".")[1] for alias in node.names if alias.name.startswith("common.")
+            )
+    return names
+
+
+def required_modules(modules: list) -> set:
+    """宣言したモジュールと、それらが（推移的に）import する common モジュール"""
+    required = set()
+    pending = list(modules)
+    while pending:
+        name = pending.pop()
+        if name in required:
+            continue
+        required.add(name)
+        pending.extend(common_imports(SOURCE / f"{name}.py"))
+    return required
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync cloud_functions/common into each function")
+    parser.add_argument("--check", action="store_true", help="Only report out-of-date copies")
+    args = parser.parse_args()
+
+    stale = []
+    undeclared = []
+    for target, modules in TARGETS.items():
+        dest_dir = ROOT / target / "common"
+        required = required_modules(modules)
+        sources = [SOURCE / "__init__.py"] + [SOURCE / f"{name}.py" for name in sorted(required)]
+        expected = {p.name for p in sources}
+        existing = {p.name for p in dest_dir.glob("*.py")} if dest_dir.exists() else set()
+
+        for path in sorted((ROOT / target).rglob("*.py")):
+            if dest_dir in path.parents:
+                continue
+            for name in sorted(common_imports(path) - required):
+                undeclared.append(f"{path.relative_to(ROOT)}: common.{name}")
+
+        for src in sources:
+            dest = dest_dir / src.name
+            if dest.exists() and filecmp.cmp(src, dest, shallow=False):
+                continue
+            stale.append(str(dest.relative_to(ROOT)))
+            if not args.check:
+                dest_dir.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dest)
+
+        for name in sorted(existing - expected):
+            dest = dest_dir / name
+            stale.append(str(dest.relative_to(ROOT)))
+            if not args.check:
+                dest.unlink()
+
+    if undeclared:
+        print("Imported but not declared in TARGETS:\n  " + "\n  ".join(undeclared))
+    if args.check:
+        if stale:
+            print("Out of date:\n  " + "\n  ".join(stale))
+        if stale or undeclared:
+            sys.exit(1)
+        print("common/ copies are up to date")
+    else:
+        for path in stale:
+            print(f"Updated {path}")
+        if undeclared:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
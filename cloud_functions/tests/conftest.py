@@ -0,0 +1,75 @@
+"""
+consultation_evaluation のテスト共通設定
+
+Claude を呼ばないフェイクのトランスポート（FakeTransport）で評価パイプラインを動かす。
+"""
+
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "consultation_evaluation"))
+
+import engine  # noqa: E402
+from retrieval import item_queries  # noqa: E402
+
+TRANSCRIPT = "相談者: 売上が伸びず困っています。\nコンサルタント: まず顧客層を確認しましょう。\n" * 20
+
+
+class ApiError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeTransport:
+    """プロンプトの評価項目すべてに score を付けて返すトランスポート
+
+    score(label, model, item_num) でスコアを決める。max_tokens がモデルの出力上限
+    （engine.MAX_OUTPUT_TOKENS）を超える呼出は実 API と同じく 400 で失敗する。
+    """
+
+    name = "fake"
+    retry = True
+
+    def __init__(self, score=lambda label, model, num: 4):
+        self.score = score
+        self.calls = []
+
+    def create(self, stats=None, telemetry=None, label="", priority=None, timeout=None, **params):
+        self.calls.append({"label": label, "model": params["model"], "max_tokens": params["max_tokens"]})
+        for prefix, limit in engine.MAX_OUTPUT_TOKENS.items():
+            if params["model"].startswith(prefix) and params["max_tokens"] > limit:
+                raise ApiError(400, f"max_tokens: {params['max_tokens']} > {limit}")
+        content = params["messages"][0]["content"]
+        prompt = content if isinstance(content, str) else content[-1]["text"]
+
+        def items(nums):
+            return {
+                num: {"score": self.score(label, params["model"], num), "evidence": "", "reasoning": ""}
+                for num in nums
+            }
+
+        if label.split(":")[0] == engine.SINGLE_GROUP:
+            body = {"categories": {
+                cat_key: {"items": items(list(item_queries(engine.load_prompt(f)))), "ng_words": []}
+                for cat_key, f in engine.CALL_PROMPTS
+            }}
+        else:
+            body = {"items": items(list(item_queries(prompt))), "ng_words": []}
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(text=json.dumps(body, ensure_ascii=False))],
+            usage=types.SimpleNamespace(input_tokens=100, output_tokens=50),
+            stop_reason="end_turn",
+            model=params["model"],
+        )
+
+
+@pytest.fixture(autouse=True)
+def no_stores(monkeypatch):
+    """結果キャッシュ・途中結果の保存先を使わない"""
+    monkeypatch.setattr(engine, "get_result_cache", lambda: None)
+    monkeypatch.setattr(engine, "EVAL_RETRY_BASE", 0)
@@ -0,0 +1,16 @@
+"""common/clients.py のクライアント再利用"""
+
+import threading
+
+from common import clients
+
+
+def test_http_session_is_per_thread():
+    main = clients.http_session()
+    assert clients.http_session() is main
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(clients.http_session()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main
@@ -0,0 +1,77 @@
+"""engine.py の評価パイプライン（フェイクのトランスポート）"""
+
+import engine
+from conftest import TRANSCRIPT, ApiError, FakeTransport
+from result_cache import PartialResults
+from retrieval import item_queries
+from store import LocalStore
+
+
+def evaluate(transport, metadata=None, **options):
+    return engine.evaluate_transcript(
+        TRANSCRIPT, metadata or {}, transport=transport, evidence_check="off", **options
+    )
+
+
+def test_tiered_single_caps_max_tokens_for_fast_model():
+    transport = FakeTransport()
+    result = evaluate(transport, engine="single", tiered=True)
+
+    fast_calls = [c for c in transport.calls if c["model"] == engine.EVAL_FAST_MODEL]
+    assert fast_calls
+    assert all(c["max_tokens"] <= 8192 for c in fast_calls)
+    assert not result["partial"]
+    assert "error" not in sum(result["tiers"]["escalated"].values(), [])
+
+
+def test_message_params_caps_max_tokens_at_model_limit():
+    fast = engine.message_params("{transcript}", "t", max_tokens=16000, model="claude-3-5-haiku-20241022")
+    primary = engine.message_params("{transcript}", "t", max_tokens=16000)
+    assert fast["max_tokens"] == 8192
+    assert primary["max_tokens"] == 16000
+
+
+def test_sampling_report_leaves_out_escalated_categories():
+    # 高速モデルの中央値は奇数項目が 3（際どい）→ 奇数項目が2件以上のカテゴリがエスカレーションする。
+    # 偶数項目は追加サンプルでばらつく
+    def score(label, model, num):
+        if model == engine.MODEL:
+            return 4
+        return 4 if label.endswith(":sample") and int(num) % 2 == 0 else 3
+
+    result = evaluate(FakeTransport(score), samples=3, tiered=True)
+
+    escalated = set(result["tiers"]["escalated"])
+    sampling = result["sampling"]
+    assert escalated
+    assert set(sampling["replaced"]) == escalated
+    assert not escalated & set(sampling["categories"])
+    prompts = dict(engine.CALL_PROMPTS)
+    escalated_items = {num for k in escalated for num in item_queries(engine.load_prompt(prompts[k]))}
+    assert not escalated_items & set(sampling["items"])
+    assert sampling["unstable_items"]
+    assert not escalated_items & set(sampling["unstable_items"])
+    assert all(result["item_scores"][num] == 4 for num in escalated_items)
+
+
+def test_partials_are_cleared_once_the_evaluation_completes(tmp_path, monkeypatch):
+    partials = PartialResults(LocalStore(tmp_path))
+    monkeypatch.setattr(engine, "get_partial_results", lambda: partials)
+
+    class FailingC2(FakeTransport):
+        def create(self, label="", **params):
+            if label.startswith("c2") and self.fail:
+                raise ApiError(500, "overloaded")
+            return super().create(label=label, **params)
+
+    transport = FailingC2()
+    transport.fail = True
+    first = evaluate(transport, {"evaluation_id": "ev-1"})
+    assert first["partial"]
+    assert set(partials.load("ev-1")) == {"c1:0", "c3:0", "c4:0", "c5:0", "c6:0"}
+
+    transport.fail = False
+    second = evaluate(transport, {"evaluation_id": "ev-1"})
+    assert not second["partial"]
+    assert partials.load("ev-1") == {}
+    assert not list(tmp_path.rglob("*.json"))
@@ -0,0 +1,37 @@
+"""jobs.py のジョブ管理とコールバック"""
+
+import hashlib
+import hmac
+import json
+import sys
+import types
+
+from jobs import JobManager, callback_signature
+from store import LocalStore
+
+
+def capture_post(monkeypatch):
+    posts = []
+
+    def post(url, data=None, headers=None, timeout=None):
+        posts.append({"url": url, "data": data, "headers": headers or {}})
+        return types.SimpleNamespace(status_code=200)
+
+    monkeypatch.setitem(sys.modules, "requests", types.SimpleNamespace(post=post))
+    return posts
+
+
+def test_callback_is_signed_without_secret(tmp_path, monkeypatch):
+    posts = capture_post(monkeypatch)
+    manager = JobManager(LocalStore(tmp_path), callback_secret="s3cret")
+    manager._update("job1", status="done", result={"ai_total": 50})
+
+    manager._send_callback("job1", manager.get("job1"), "https://example.com/hook")
+
+    (post,) = posts
+    assert b"s3cret" not in post["data"]
+    assert json.loads(post["data"])["result"] == {"ai_total": 50}
+    expected = hmac.new(b"s3cret", post["data"], hashlib.sha256).hexdigest()
+    assert post["headers"]["X-Signature"] == "sha256=" + expected
+    assert post["headers"]["X-Signature"] == callback_signature("s3cret", post["data"])
+    assert manager.get("job1")["callback_status"] == 200
@@ -0,0 +1,50 @@
+"""store.py の保存期限（sweep）"""
+
+import os
+import time
+
+import store
+from store import GCSStore, LocalBucketClient, LocalStore, sweep_expired
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_local_sweep_removes_only_old_records_under_prefix(tmp_path):
+    s = LocalStore(tmp_path)
+    for key in ("jobs/old", "jobs/new", "results/old"):
+        s.put_json(key, {"k": key})
+    age(tmp_path / "jobs/old.json", 7200)
+    age(tmp_path / "results/old.json", 7200)
+
+    assert s.sweep("jobs", 3600) == 1
+    assert s.get_json("jobs/old") is None
+    assert s.get_json("jobs/new") == {"k": "jobs/new"}
+    assert s.get_json("results/old") == {"k": "results/old"}
+
+
+def test_gcs_sweep_uses_blob_update_time(tmp_path):
+    s = GCSStore("bucket", prefix="eval", client=LocalBucketClient(tmp_path))
+    s.put_json("partials/old", {})
+    s.put_json("partials/new", {})
+    age(tmp_path / "bucket/eval/partials/old.json", 7200)
+
+    assert s.sweep("partials", 3600) == 1
+    assert s.get_json("partials/old") is None
+    assert s.get_json("partials/new") == {}
+
+
+def test_sweep_expired_runs_once_per_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "_last_sweep", {})
+    s = LocalStore(tmp_path)
+    s.put_json("jobs/a", {})
+    age(tmp_path / "jobs/a.json", 7200)
+
+    assert sweep_expired(s, "jobs", 0) == 0
+    assert sweep_expired(s, "jobs", 3600) == 1
+    s.put_json("jobs/b", {})
+    age(tmp_path / "jobs/b.json", 7200)
+    assert sweep_expired(s, "jobs", 3600) == 0  # 間隔内は走査しない
+    assert s.get_json("jobs/b") == {}
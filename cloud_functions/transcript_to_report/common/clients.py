@@ -0,0 +1,195 @@
+"""
+API クライアントのレジストリ（ウォームインスタンスでの再利用）
+
+Cloud Functions のインスタンスは複数のリクエストで再利用されるため、クライアントを
+モジュールレベルで一度だけ作り、接続プール（HTTP keep-alive・TLS セッション）と
+認証情報（アクセストークン）を後続のリクエストで使い回す。
+
+    anthropic_client: anthropic.Anthropic（httpx の接続プールを持ちスレッドセーフ）。
+                      ANTHROPIC_REPLAY_MODE に応じて記録・再生クライアントを返す（common/replay.py）
+    google_service:   googleapiclient の Discovery サービス。ディスカバリー文書はライブラリ同梱の
+                      静的文書をプロセスで1回だけ読み込み、サービス（httplib2 はスレッドセーフでない）は
+                      スレッドごとに作って再利用する
+    google_credentials: Application Default Credentials（google.auth.default）
+    storage_client / speech_client: google-cloud-storage / speech のクライアント
+    http_session:     requests.Session（Zoom・Notion などへの HTTP 呼出の接続プール）。Session は
+                      スレッドセーフでない（Cookie・アダプタの状態を共有する）ため、スレッドごとに作って再利用する
+
+各ライブラリは初回利用時に import するため、使わない関数やリクエスト（認証エラー等）の
+コールドスタートには影響しない（import 時間の計測は cloud_functions/profile_startup.py）。
+初期化は名前ごとのロックで1回だけ行う（同時リクエストでも二重に作らない）。
+
+使い方:
+    client = anthropic_client(ANTHROPIC_API_KEY)
+    drive = google_service("drive", "v3")
+    stats()  # {"created": {...}, "hits": {...}}
+"""
+
+import sys
+import threading
+
+_clients = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_local = threading.local()
+_stats = {"created": {}, "hits": {}}
+
+
+def _count(kind: str, name: str):
+    with _registry_lock:
+        _stats[kind][name] = _stats[kind].get(name, 0) + 1
+
+
+def get_client(name: str, factory):
+    """name のクライアントを返す（無ければ factory() で作って登録する）"""
+    client = _clients.get(name)
+    if client is not None:
+        _count("hits", name)
+        return client
+    with _registry_lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        client = _clients.get(name)
+        if client is None:
+            client = factory()
+            _clients[name] = client
+            _count("created", name)
+        else:
+            _count("hits", name)
+    return client
+
+
+def get_thread_client(name: str, factory):
+    """スレッドごとのクライアントを返す（スレッドセーフでないクライアント用）"""
+    clients = getattr(_local, "clients", None)
+    if clients is None:
+        clients = _local.clients = {}
+    client = clients.get(name)
+    if client is None:
+        client = clients[name] = factory()
+        _count("created", name)
+    else:
+        _count("hits", name)
+    return client
+
+
+def reset():
+    """登録済みクライアントを破棄する（ベンチマーク・設定変更用。他スレッドの分は次回作り直す）"""
+    with _registry_lock:
+        _clients.clear()
+        _locks.clear()
+        _stats["created"].clear()
+        _stats["hits"].clear()
+    _local.__dict__.clear()
+
+
+def stats() -> dict:
+    with _registry_lock:
+        return {"created": dict(_stats["created"]), "hits": dict(_stats["hits"])}
+
+
+# ── Anthropic ──
+
+def is_anthropic_error(error) -> bool:
+    """anthropic.APIError か（anthropic が未 import ならそもそも発生しないので import しない）"""
+    anthropic = sys.modules.get("anthropic")
+    return anthropic is not None and isinstance(error, anthropic.APIError)
+
+
+def anthropic_client(api_key: str = None, **options):
+    """Anthropic クライアント（429/529 の再試行は common/ratelimit.py が行うため max_retries=0）"""
+    from common.replay import make_client, replay_mode
+
+    options.setdefault("max_retries", 0)
+    name = f"anthropic:{replay_mode()}:{hash((api_key, tuple(sorted(options.items()))))}"
+
+    def factory():
+        import anthropic
+
+        return make_client(lambda: anthropic.Anthropic(api_key=api_key, **options))
+
+    return get_client(name, factory)
+
+
+# ── Google ──
+
+def google_credentials(scopes: tuple = None):
+    """Application Default Credentials（トークンは有効期限まで再利用される）"""
+
+    def factory():
+        import google.auth
+
+        credentials, _ = google.auth.default(scopes=list(scopes) if scopes else None)
+        return credentials
+
+    return get_client(f"google-credentials:{','.join(scopes or ())}", factory)
+
+
+def discovery_document(api: str, version: str) -> str:
+    """ライブラリ同梱の静的ディスカバリー文書（ネットワークに取りに行かない）"""
+
+    def factory():
+        from googleapiclient import discovery_cache
+
+        document = discovery_cache.get_static_doc(api, version)
+        if document is None:
+            raise ValueError(f"No static discovery document for {api} {version}")
+        return document
+
+    return get_client(f"discovery:{api}:{version}", factory)
+
+
+def google_service(api: str, version: str, credentials=None, key: str = "default"):
+    """Discovery ベースのサービスオブジェクト（スレッドごとに1つ）
+
+    credentials を省略すると ADC を使う。別の認証情報で作るサービスは key で区別する。
+    """
+    document = discovery_document(api, version)
+
+    def factory():
+        from googleapiclient.discovery import build_from_document
+
+        return build_from_document(document, credentials=credentials or google_credentials())
+
+    return get_thread_client(f"google:{api}:{version}:{key}", factory)
+
+
+def storage_client():
+    def factory():
+        from google.cloud import storage
+
+        return storage.Client()
+
+    return get_client("storage", factory)
+
+
+def speech_client():
+    def factory():
+        from google.cloud import speech_v2
+
+        return speech_v2.SpeechClient()
+
+    return get_client("speech", factory)
+
+
+# ── HTTP ──
+
+def http_session():
+    """requests.Session（スレッドごとに1つ。Keep-Alive で接続を再利用する）"""
+
+    def factory():
+        import requests
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return get_thread_client("http", factory)
+
+
+def is_http_error(error) -> bool:
+    """requests.HTTPError か（requests が未 import なら import しない）"""
+    requests = sys.modules.get("requests")
+    return requests is not None and isinstance(error, requests.exceptions.HTTPError)
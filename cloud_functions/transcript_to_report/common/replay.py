@@ -0,0 +1,183 @@
+"""
+Claude 呼出の記録・再生（オフラインでのベンチマーク・回帰確認用）
+
+record: 実際の Anthropic クライアントを包み、リクエストと応答・所要時間を
+        1呼出1ファイル（{dir}/{リクエストのハッシュ}.json）で保存する。
+replay: 保存済みの応答をリクエストのハッシュで引いて返す。API キー・ネットワーク不要。
+        記録時の所要時間（または固定値）だけ待ち、指定した割合の呼出に 429 を返す。
+        429 を返す呼出はリクエストのハッシュと seed で決まるため、実行順に依らず再現する。
+
+Env:
+    ANTHROPIC_REPLAY_MODE: off / record / replay (default: "off")
+    ANTHROPIC_REPLAY_DIR: 記録ディレクトリ (default: /tmp/claude_replay)
+    ANTHROPIC_REPLAY_LATENCY: recorded（記録時の所要時間）または秒数 (default: "recorded")
+    ANTHROPIC_REPLAY_LATENCY_SCALE: 待ち時間の倍率 (default: 1)
+    ANTHROPIC_REPLAY_429_RATE: 429 を返す呼出の割合 0〜1 (default: 0)
+    ANTHROPIC_REPLAY_429_ATTEMPTS: 該当する呼出が成功するまでに返す 429 の回数 (default: 1)
+    ANTHROPIC_REPLAY_SEED: 429 を返す呼出の選び方 (default: 0)
+
+使い方:
+    client = make_client(lambda: anthropic.Anthropic(api_key=..., max_retries=0))
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# 応答内容に影響しない引数はキーに含めない
+_IGNORED_PARAMS = ("timeout", "extra_headers", "extra_query", "extra_body")
+
+
+class ReplayMissError(KeyError):
+    """記録に無いリクエスト"""
+
+
+def request_key(params: dict) -> str:
+    """messages.create の引数から記録のキーを作る"""
+    canonical = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+    return hashlib.sha256(
+        json.dumps(canonical, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def _dump(response) -> dict:
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    return json.loads(response.to_json())
+
+
+class _InjectedResponse:
+    """注入する 429 の応答（anthropic.RateLimitError が参照する属性のみ）"""
+
+    status_code = 429
+    request = None
+
+    def __init__(self, retry_after: float = 1):
+        self.headers = {"retry-after": str(retry_after)}
+
+
+class _Messages:
+    def __init__(self, create):
+        self.create = create
+
+
+class RecordingClient:
+    """実クライアントの messages.create を記録しながら呼び出す"""
+
+    def __init__(self, client, directory):
+        self.client = client
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.messages = _Messages(self._create)
+
+    def _create(self, **params):
+        start = time.monotonic()
+        response = self.client.messages.create(**params)
+        latency = time.monotonic() - start
+        key = request_key(params)
+        record = {
+            "key": key,
+            "request": {k: v for k, v in params.items() if k not in _IGNORED_PARAMS},
+            "response": _dump(response),
+            "latency": round(latency, 3),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp = self.directory / f".{key}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.directory / f"{key}.json")
+        return response
+
+
+class ReplayClient:
+    """記録済みの応答を返すクライアント（anthropic.Anthropic の messages.create 互換）"""
+
+    def __init__(
+        self,
+        directory,
+        latency="recorded",
+        latency_scale: float = 1.0,
+        rate_limit_rate: float = 0.0,
+        rate_limit_attempts: int = 1,
+        seed: int = 0,
+    ):
+        self.directory = Path(directory)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.rate_limit_rate = rate_limit_rate
+        self.rate_limit_attempts = rate_limit_attempts
+        self.seed = seed
+        self.messages = _Messages(self._create)
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "rate_limited": 0, "misses": 0}
+
+    def _load(self, key: str) -> dict:
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            with self._lock:
+                self.stats["misses"] += 1
+            raise ReplayMissError(f"no recording for request {key[:12]} in {self.directory}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _throttled(self, key: str) -> bool:
+        """この呼出に 429 を返すか（キーごとに rate_limit_attempts 回続けて返し、次は成功させる）"""
+        if not self.rate_limit_rate:
+            return False
+        bucket = int(hashlib.sha256(f"{self.seed}:{key}".encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        if bucket >= self.rate_limit_rate:
+            return False
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            # 成功させたら数え直す（同じクライアントで同じリクエストを繰り返しても毎回 429 を返す）
+            self._attempts[key] = attempt + 1 if attempt < self.rate_limit_attempts else 0
+        return attempt < self.rate_limit_attempts
+
+    def _create(self, **params):
+        import anthropic
+
+        key = request_key(params)
+        record = self._load(key)
+        with self._lock:
+            self.stats["calls"] += 1
+
+        if self._throttled(key):
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            raise anthropic.RateLimitError(
+                "replay: injected rate limit", response=_InjectedResponse(), body=None
+            )
+
+        delay = record.get("latency", 0) if self.latency == "recorded" else float(self.latency)
+        if delay * self.latency_scale > 0:
+            time.sleep(delay * self.latency_scale)
+        return anthropic.types.Message.model_validate(record["response"])
+
+
+def replay_mode() -> str:
+    return os.environ.get("ANTHROPIC_REPLAY_MODE", "off")
+
+
+def make_client(factory):
+    """ANTHROPIC_REPLAY_MODE に応じたクライアントを返す
+
+    off は factory() そのもの、record はそれを記録用に包んだもの、
+    replay は記録から応答する ReplayClient（factory は呼ばないので API キー不要）。
+    """
+    mode = replay_mode()
+    directory = os.environ.get("ANTHROPIC_REPLAY_DIR", "/tmp/claude_replay")
+    if mode == "record":
+        return RecordingClient(factory(), directory)
+    if mode == "replay":
+        return ReplayClient(
+            directory,
+            latency=os.environ.get("ANTHROPIC_REPLAY_LATENCY", "recorded"),
+            latency_scale=float(os.environ.get("ANTHROPIC_REPLAY_LATENCY_SCALE", "1")),
+            rate_limit_rate=float(os.environ.get("ANTHROPIC_REPLAY_429_RATE", "0")),
+            rate_limit_attempts=int(os.environ.get("ANTHROPIC_REPLAY_429_ATTEMPTS", "1")),
+            seed=int(os.environ.get("ANTHROPIC_REPLAY_SEED", "0")),
+        )
+    return factory()
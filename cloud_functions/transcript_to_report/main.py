@@ -9,6 +9,15 @@ Google Docs に保存する。
   - ANTHROPIC_API_KEY: Claude API キー
   - GOOGLE_DOCS_FOLDER_ID: レポート保存先 Drive フォルダ ID
   - CLAUDE_MODEL: 使用モデル (default: "claude-sonnet-4-20250514")
+  - REPORT_COMPACT: "true" でレポート生成前に文字起こしをコンパクション (default: "false")
+                    リクエストの "compact" で個別に指定も可
+  - ANTHROPIC_RPM / ANTHROPIC_ITPM / ANTHROPIC_MAX_RETRIES: Claude 呼出のレート制御
+                    （common/ratelimit.py 参照、429/529 はバックオフして再試行）
+  - ANTHROPIC_REPLAY_MODE: record / replay で Claude 呼出を記録・再生（common/replay.py 参照）
+  - ANTHROPIC_LATENCY_MODEL: dry_run の所要時間モデル・呼出記録の JSON（common/estimate.py 参照）
+
+dry_run: リクエストの "dry_run": true では Claude・Google Docs を呼ばずに、呼出回数・入出力トークン数・
+         推定コスト・所要時間の見積もりだけを返す（コンパクションは適用した上で見積もる）。
 
 デプロイ:
   gcloud functions deploy transcript_to_report \
@@ -25,15 +34,23 @@ Google Docs に保存する。
 import os
 import json
 import functions_framework
-import anthropic
-from googleapiclient.discovery import build
-import google.auth
+
+# anthropic / googleapiclient は初回の呼出時に common/clients.py が import する（コールドスタート短縮）
+from common.clients import anthropic_client, google_service, is_anthropic_error
+from common.compaction import compact_transcript
+from common.estimate import estimate_calls, latency_model_info, load_latency_model
+from common.ratelimit import create_message, get_limiter, request_tokens
+from common.replay import replay_mode
+from common.telemetry import Telemetry
 
 
 SHARED_SECRET = os.environ.get("SHARED_SECRET", "")
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 CLAUDE_MODEL = os.environ.get("CLAUDE_MODEL", "claude-sonnet-4-20250514")
 GOOGLE_DOCS_FOLDER_ID = os.environ.get("GOOGLE_DOCS_FOLDER_ID", "")
+REPORT_COMPACT = os.environ.get("REPORT_COMPACT", "false").lower() == "true"
+REPORT_MAX_TOKENS = 8192
+REPORT_OUTPUT_TOKENS = 4000  # 見積もりに使う出力トークン数（呼出の記録が無い場合）
 
 # レポート生成プロンプト
 REPORT_SYSTEM_PROMPT = """あなたは中小企業経営の専門家であり、関西学院大学 中小企業経営診断研究会の診断報告書を作成するアシスタントです。
@@ -74,11 +91,9 @@ REPORT_SYSTEM_PROMPT = """あなたは中小企業経営の専門家であり、
 """
 
 
-def generate_report_with_claude(transcript, consultation_info):
-    """Claude API でレポートドラフトを生成"""
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
-    user_message = f"""以下の経営相談の文字起こしから、診断報告書ドラフトを作成してください。
+def build_report_message(transcript, consultation_info):
+    """レポート生成のユーザーメッセージ（相談情報＋文字起こし）"""
+    return f"""以下の経営相談の文字起こしから、診断報告書ドラフトを作成してください。
 
 ## 相談情報
 - 申込ID: {consultation_info.get('application_id', '')}
@@ -94,11 +109,20 @@ def generate_report_with_claude(transcript, consultation_info):
 {transcript}
 """
 
-    response = client.messages.create(
+
+def generate_report_with_claude(transcript, consultation_info, telemetry=None):
+    """Claude API でレポートドラフトを生成（telemetry を渡すと呼出を計測）"""
+    # クライアントはウォームインスタンスで再利用（common/clients.py）。429/529 の再試行はスケジューラが行う
+    client = anthropic_client(ANTHROPIC_API_KEY)
+
+    response = create_message(
+        client,
+        telemetry=telemetry,
+        label="report",
         model=CLAUDE_MODEL,
-        max_tokens=8192,
+        max_tokens=REPORT_MAX_TOKENS,
         system=REPORT_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_message}],
+        messages=[{"role": "user", "content": build_report_message(transcript, consultation_info)}],
     )
 
     report_text = response.content[0].text
@@ -114,12 +138,37 @@ def generate_report_with_claude(transcript, consultation_info):
     return report_text, token_usage
 
 
+def estimate_report(transcript, consultation_info):
+    """Claude を呼ばずにレポート生成の呼出回数・トークン数・推定コスト・所要時間を見積もる
+
+    出力トークン数は記録済みの "report" 呼出の中央値（無ければ REPORT_OUTPUT_TOKENS）、
+    所要時間は記録から当てはめたモデル（common/estimate.py）による。
+    """
+    latency_model = load_latency_model()
+    limiter = get_limiter()
+    messages = [{"role": "user", "content": build_report_message(transcript, consultation_info)}]
+    call = {
+        "label": "report",
+        "model": CLAUDE_MODEL,
+        "input_tokens": request_tokens(REPORT_SYSTEM_PROMPT, messages),
+        "output_tokens": min(
+            REPORT_MAX_TOKENS, latency_model.expected_output("report", REPORT_OUTPUT_TOKENS)
+        ),
+    }
+    return {
+        "model": CLAUDE_MODEL,
+        **estimate_calls(
+            [call], latency_model, rpm=limiter.requests.capacity, itpm=limiter.tokens.capacity
+        ),
+        "latency_model": latency_model_info(latency_model),
+    }
+
+
 def create_google_doc(title, content, folder_id=None):
     """Google Docs にレポートを作成"""
-    # Cloud Functions の Application Default Credentials を使用
-    creds, _ = google.auth.default()
-    docs_service = build("docs", "v1", credentials=creds)
-    drive_service = build("drive", "v3", credentials=creds)
+    # Application Default Credentials・静的ディスカバリー文書で作ったサービスを再利用する
+    docs_service = google_service("docs", "v1")
+    drive_service = google_service("drive", "v3")
 
     # 新規ドキュメント作成
     doc = docs_service.documents().create(body={"title": title}).execute()
@@ -182,7 +231,9 @@ def transcript_to_report(request):
       "theme": "相談テーマ",
       "name": "相談者名",
       "leader": "リーダー名",
-      "confirmed_date": "相談日時"
+      "confirmed_date": "相談日時",
+      "compact": true（任意: 文字起こしのコンパクション）,
+      "dry_run": true（任意: 生成せずに見積もりだけを返す）
     }
 
     レスポンス:
@@ -192,7 +243,17 @@ def transcript_to_report(request):
       "doc_id": "Google Docs ID",
       "doc_url": "Google Docs URL",
       "report_text": "レポートテキスト（Markdown）",
-      "token_usage": { "input_tokens": 1234, "output_tokens": 5678 }
+      "token_usage": { "input_tokens": 1234, "output_tokens": 5678 },
+      "telemetry": { "total": { "calls", "call_time", "queue_wait", "retries", トークン数, "cost_usd" },
+                     "by_label": {...}, "calls": [...] }（common/telemetry.py）,
+      "compaction": { "chars_before": ..., "tokens_after": ..., ... } | null
+    }
+
+    dry_run のレスポンス:
+    {
+      "success": true, "dry_run": true, "application_id": "申込ID", "model": "...",
+      "calls": 1, "input_tokens": ..., "output_tokens": ..., "cost_usd": ..., "wall_time": 秒,
+      "latency_model": {...}, "compaction": {...} | null
     }
     """
     # CORS preflight
@@ -223,12 +284,6 @@ def transcript_to_report(request):
                 "error": "transcript is required",
             }), 400
 
-        if not ANTHROPIC_API_KEY:
-            return json.dumps({
-                "success": False,
-                "error": "ANTHROPIC_API_KEY not configured",
-            }), 500
-
         application_id = data.get("application_id", "unknown")
         consultation_info = {
             "application_id": application_id,
@@ -240,9 +295,41 @@ def transcript_to_report(request):
             "confirmed_date": data.get("confirmed_date", ""),
         }
 
+        # 0. 文字起こしのコンパクション（任意）
+        compaction = None
+        if data.get("compact", REPORT_COMPACT):
+            compacted = compact_transcript(transcript)
+            transcript = compacted["text"]
+            compaction = compacted["stats"]
+            print(
+                f"Transcript compacted: {compaction['chars_before']} -> "
+                f"{compaction['chars_after']} chars"
+            )
+
+        if data.get("dry_run"):
+            estimate = estimate_report(transcript, consultation_info)
+            print(
+                f"Report estimate: {application_id} -> {estimate['input_tokens']}in/"
+                f"{estimate['output_tokens']}out, ${estimate['cost_usd']}, {estimate['wall_time']}s"
+            )
+            return json.dumps({
+                "success": True,
+                "dry_run": True,
+                "application_id": application_id,
+                **estimate,
+                "compaction": compaction,
+            }, ensure_ascii=False), 200
+
+        if not ANTHROPIC_API_KEY and replay_mode() != "replay":
+            return json.dumps({
+                "success": False,
+                "error": "ANTHROPIC_API_KEY not configured",
+            }), 500
+
         # 1. Claude API でレポート生成
+        telemetry = Telemetry()
         report_text, token_usage = generate_report_with_claude(
-            transcript, consultation_info
+            transcript, consultation_info, telemetry
         )
 
         # 2. Google Docs に保存
@@ -264,16 +351,18 @@ def transcript_to_report(request):
             "doc_url": doc_url,
             "report_text": report_text,
             "token_usage": token_usage,
+            "telemetry": telemetry.summary(),
+            "compaction": compaction,
         }), 200
 
-    except anthropic.APIError as e:
-        print(f"Claude API error: {e}")
-        return json.dumps({
-            "success": False,
-            "error": f"Claude API error: {str(e)}",
-        }), 502
-
     except Exception as e:
+        if is_anthropic_error(e):
+            print(f"Claude API error: {e}")
+            return json.dumps({
+                "success": False,
+                "error": f"Claude API error: {str(e)}",
+            }), 502
+
         print(f"Error: {e}")
         return json.dumps({
             "success": False,
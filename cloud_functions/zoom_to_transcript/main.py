@@ -29,10 +29,10 @@ Google Cloud Speech-to-Text API v2 を使用し、話者分離（Speaker Diariza
 import os
 import json
 import tempfile
-import requests
 import functions_framework
-from google.cloud import speech_v2 as speech
-from google.cloud import storage
+
+# google.cloud.speech_v2（gRPC 一式）・storage・requests は使う処理の中で import する（コールドスタート短縮）
+from common.clients import http_session, is_http_error, speech_client, storage_client
 
 
 SHARED_SECRET = os.environ.get("SHARED_SECRET", "")
@@ -44,7 +44,7 @@ GCP_PROJECT = os.environ.get("GCP_PROJECT", "")
 def download_zoom_recording(download_url, zoom_token, dest_path):
     """Zoom 録画をダウンロード"""
     headers = {"Authorization": f"Bearer {zoom_token}"}
-    resp = requests.get(download_url, headers=headers, stream=True, timeout=600)
+    resp = http_session().get(download_url, headers=headers, stream=True, timeout=600)
     resp.raise_for_status()
 
     with open(dest_path, "wb") as f:
@@ -73,7 +73,7 @@ def extract_audio(video_path, audio_path):
 
 def upload_to_gcs(bucket_name, source_path, dest_blob_name):
     """GCS にファイルをアップロード"""
-    client = storage.Client()
+    client = storage_client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(dest_blob_name)
     blob.upload_from_filename(source_path)
@@ -85,7 +85,7 @@ def upload_to_gcs(bucket_name, source_path, dest_blob_name):
 def delete_from_gcs(bucket_name, blob_name):
     """GCS からファイルを削除"""
     try:
-        client = storage.Client()
+        client = storage_client()
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
         blob.delete()
@@ -99,7 +99,9 @@ def transcribe_audio(gcs_uri, project_id, duration_sec):
     Speech-to-Text API v2 で文字起こし（話者分離対応）
     長時間音声は Long Running Operation で処理
     """
-    client = speech.SpeechClient()
+    from google.cloud import speech_v2 as speech
+
+    client = speech_client()
 
     # 話者分離設定（2-6名想定）
     diarization_config = speech.SpeakerDiarizationConfig(
@@ -248,7 +250,7 @@ def zoom_to_transcript(request):
         if not project_id:
             # メタデータサーバーからプロジェクトIDを取得
             try:
-                resp = requests.get(
+                resp = http_session().get(
                     "http://metadata.google.internal/computeMetadata/v1/project/project-id",
                     headers={"Metadata-Flavor": "Google"},
                     timeout=5,
@@ -322,14 +324,14 @@ def zoom_to_transcript(request):
             # GCS クリーンアップ
             delete_from_gcs(GCS_BUCKET, gcs_blob_name)
 
-    except requests.exceptions.HTTPError as e:
-        print(f"Zoom download error: {e}")
-        return json.dumps({
-            "success": False,
-            "error": f"Zoom download failed: {e.response.status_code}",
-        }), 502
-
     except Exception as e:
+        if is_http_error(e):
+            print(f"Zoom download error: {e}")
+            return json.dumps({
+                "success": False,
+                "error": f"Zoom download failed: {e.response.status_code}",
+            }), 502
+
         print(f"Error: {e}")
         return json.dumps({
             "success": False,
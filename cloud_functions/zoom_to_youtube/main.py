@@ -13,11 +13,10 @@ GAS から HTTP リクエストを受け取り、Zoom 録画を YouTube に非
 import os
 import json
 import tempfile
-import requests
 import functions_framework
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.credentials import Credentials
+
+# googleapiclient / google.oauth2 / requests は使う処理の中で import する（コールドスタート短縮）
+from common.clients import get_client, google_service, http_session, is_http_error
 
 
 SHARED_SECRET = os.environ.get("SHARED_SECRET", "")
@@ -28,21 +27,23 @@ TOKEN_URI = "https://oauth2.googleapis.com/token"
 
 
 def get_youtube_service():
-    """YouTube Data API v3 サービスを構築"""
-    credentials = Credentials(
+    """YouTube Data API v3 サービス（認証情報・サービスはウォームインスタンスで再利用）"""
+    from google.oauth2.credentials import Credentials
+
+    credentials = get_client("youtube-credentials", lambda: Credentials(
         token=None,
         refresh_token=YOUTUBE_REFRESH_TOKEN,
         client_id=YOUTUBE_CLIENT_ID,
         client_secret=YOUTUBE_CLIENT_SECRET,
         token_uri=TOKEN_URI,
-    )
-    return build("youtube", "v3", credentials=credentials)
+    ))
+    return google_service("youtube", "v3", credentials=credentials, key="oauth")
 
 
 def download_zoom_recording(download_url, zoom_token, dest_path):
     """Zoom 録画をダウンロード"""
     headers = {"Authorization": f"Bearer {zoom_token}"}
-    resp = requests.get(download_url, headers=headers, stream=True, timeout=300)
+    resp = http_session().get(download_url, headers=headers, stream=True, timeout=300)
     resp.raise_for_status()
 
     with open(dest_path, "wb") as f:
@@ -68,6 +69,8 @@ def upload_to_youtube(service, file_path, title, description):
         },
     }
 
+    from googleapiclient.http import MediaFileUpload
+
     media = MediaFileUpload(
         file_path,
         mimetype="video/mp4",
@@ -181,14 +184,14 @@ def zoom_to_youtube(request):
                 os.remove(tmp_path)
                 print(f"Cleaned up: {tmp_path}")
 
-    except requests.exceptions.HTTPError as e:
-        print(f"Zoom download error: {e}")
-        return json.dumps({
-            "success": False,
-            "error": f"Zoom download failed: {e.response.status_code}",
-        }), 502
-
     except Exception as e:
+        if is_http_error(e):
+            print(f"Zoom download error: {e}")
+            return json.dumps({
+                "success": False,
+                "error": f"Zoom download failed: {e.response.status_code}",
+            }), 502
+
         print(f"Error: {e}")
         return json.dumps({
             "success": False,
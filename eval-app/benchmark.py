@@ -0,0 +1,169 @@
+"""
+評価エンジン比較ベンチマーク（split: カテゴリ別6回呼出 vs single: 1回呼出で全22項目）
+
+eval-app/results の文字起こし（ダッシュボードが結果JSONと同名で保存する .txt、
+または "transcript" キーを持つ JSON）をコーパスとして両モードで評価し、
+所要時間・入出力トークン・項目スコアの差を文字起こし長の帯域別に集計する。
+
+Usage:
+    python benchmark.py [--corpus results] [--limit 10] [--bands 30000,60000,120000] [--output bench.json]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from config.settings import ITEM_NAMES
+from modules.evaluator import evaluate_local
+
+ENGINES = ("split", "single")
+
+
+def load_corpus(corpus_dir: Path) -> list:
+    """コーパスの文字起こしを [(名前, テキスト)] で返す（.txt 優先、同名の JSON は重複させない）"""
+    corpus = {}
+    for path in sorted(corpus_dir.glob("*.txt")):
+        text = path.read_text(encoding="utf-8")
+        if text.strip():
+            corpus[path.stem] = text
+    for path in sorted(corpus_dir.glob("*.json")):
+        if path.stem in corpus:
+            continue
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        text = data.get("transcript") if isinstance(data, dict) else None
+        if isinstance(text, str) and text.strip():
+            corpus[path.stem] = text
+    return sorted(corpus.items())
+
+
+def band_label(length: int, bands: list) -> str:
+    lower = 0
+    for upper in bands:
+        if length < upper:
+            return f"{lower:,}-{upper:,}"
+        lower = upper
+    return f"{lower:,}+"
+
+
+def run_engine(transcript: str, engine: str) -> dict:
+    start = time.monotonic()
+    result = evaluate_local(transcript, engine=engine)
+    return {
+        "wall_time": round(time.monotonic() - start, 2),
+        "input_tokens": result["usage"]["input_tokens"],
+        "output_tokens": result["usage"]["output_tokens"],
+        "raw_total": result["raw_total"],
+        "item_scores": result["item_scores"],
+    }
+
+
+def compare(runs: dict) -> dict:
+    """single - split の項目スコア差"""
+    split, single = runs["split"]["item_scores"], runs["single"]["item_scores"]
+    deltas = {num: single.get(num, 0) - split.get(num, 0) for num in split}
+    abs_deltas = [abs(d) for d in deltas.values()]
+    return {
+        "item_deltas": deltas,
+        "mean_abs_delta": round(sum(abs_deltas) / len(abs_deltas), 2) if abs_deltas else 0,
+        "max_abs_delta": max(abs_deltas, default=0),
+        "raw_total_delta": runs["single"]["raw_total"] - runs["split"]["raw_total"],
+    }
+
+
+def _mean(values) -> float:
+    values = list(values)
+    return round(sum(values) / len(values), 2) if values else 0
+
+
+def summarize(rows: list) -> dict:
+    bands = {}
+    for row in rows:
+        bands.setdefault(row["band"], []).append(row)
+
+    summary = {}
+    for band, band_rows in bands.items():
+        summary[band] = {"transcripts": len(band_rows)}
+        for engine in ENGINES:
+            summary[band][engine] = {
+                field: _mean(r["runs"][engine][field] for r in band_rows)
+                for field in ("wall_time", "input_tokens", "output_tokens")
+            }
+        summary[band]["mean_abs_delta"] = _mean(r["comparison"]["mean_abs_delta"] for r in band_rows)
+        summary[band]["max_abs_delta"] = max(r["comparison"]["max_abs_delta"] for r in band_rows)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark split vs single evaluation engines")
+    parser.add_argument("--corpus", default=str(Path(__file__).parent / "results"),
+                        help="Directory with transcripts (*.txt or result JSON with 'transcript')")
+    parser.add_argument("--limit", type=int, default=0, help="Max transcripts to evaluate (0 = all)")
+    parser.add_argument("--bands", default="30000,60000,120000",
+                        help="Transcript length band boundaries in chars")
+    parser.add_argument("--output", "-o", help="Output JSON path")
+    args = parser.parse_args()
+
+    bands = sorted(int(b) for b in args.bands.split(",") if b.strip())
+    corpus = load_corpus(Path(args.corpus))
+    if args.limit:
+        corpus = corpus[:args.limit]
+    if not corpus:
+        print(f"No transcripts found in {args.corpus}")
+        return
+    print(f"Corpus: {len(corpus)} transcripts")
+
+    rows = []
+    for name, transcript in corpus:
+        print(f"\n{name} ({len(transcript):,} chars)")
+        runs = {}
+        for engine in ENGINES:
+            runs[engine] = run_engine(transcript, engine)
+            r = runs[engine]
+            print(f"  {engine:6s}: {r['wall_time']:7.1f}s  in={r['input_tokens']:,}  "
+                  f"out={r['output_tokens']:,}  raw={r['raw_total']}/110")
+        comparison = compare(runs)
+        print(f"  delta : mean|d|={comparison['mean_abs_delta']}  "
+              f"max|d|={comparison['max_abs_delta']}  raw={comparison['raw_total_delta']:+d}")
+        rows.append({
+            "name": name,
+            "chars": len(transcript),
+            "band": band_label(len(transcript), bands),
+            "runs": runs,
+            "comparison": comparison,
+        })
+
+    summary = summarize(rows)
+    print(f"\n{'='*50}")
+    print("By transcript length (chars):")
+    for band, s in summary.items():
+        print(f"  {band} ({s['transcripts']} transcripts)")
+        for engine in ENGINES:
+            e = s[engine]
+            print(f"    {engine:6s}: {e['wall_time']:7.1f}s  in={e['input_tokens']:,.0f}  "
+                  f"out={e['output_tokens']:,.0f}")
+        print(f"    score : mean|d|={s['mean_abs_delta']}  max|d|={s['max_abs_delta']}")
+
+    print("\nMean item delta (single - split):")
+    item_nums = sorted({num for r in rows for num in r["comparison"]["item_deltas"]}, key=int)
+    item_means = {}
+    for num in item_nums:
+        item_means[num] = _mean(
+            r["comparison"]["item_deltas"][num] for r in rows if num in r["comparison"]["item_deltas"]
+        )
+        print(f"  No.{num} {ITEM_NAMES.get(int(num), '')}: {item_means[num]:+.2f}")
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"summary": summary, "item_mean_deltas": item_means, "transcripts": rows},
+                       ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -92,6 +92,7 @@ def render_item_table(result):
             "項目名": ITEM_NAMES.get(num, ""),
             "スコア": score,
             "根拠": ev.get("reasoning", "")[:80] if isinstance(ev, dict) else "",
+            "引用照合": (ev.get("verification") or {}).get("status", "") if isinstance(ev, dict) else "",
         })
     return pd.DataFrame(item_data)
 
@@ -101,6 +102,30 @@ def render_result_detail(result):
     ai_total = result.get("ai_total", 0)
     raw_total = result.get("raw_total", 0)
 
+    evidence_check = result.get("evidence_check") or {}
+    if evidence_check.get("unlocated"):
+        items = ", ".join(f"No.{num}" for num in evidence_check["unlocated"])
+        st.warning(f"根拠の引用が文字起こし中に見つからない項目があります（{items}）。内容を確認してください。")
+
+    sampling = result.get("sampling")
+    if sampling:
+        unstable = ", ".join(
+            f"No.{num}（{'/'.join(map(str, sampling['items'][num]['scores']))}）"
+            for num in sampling["unstable_items"]
+        ) or "なし"
+        replaced = "、".join(
+            CATEGORIES.get(k, {}).get("name", k) for k in sampling.get("replaced", [])
+        )
+        note = f"（主モデルで再評価した {replaced} は1回の評価）" if replaced else ""
+        st.caption(f"{sampling['rounds_run'] + 1}サンプルの中央値{note}。スコアが揺れた項目: {unstable}")
+
+    if result.get("partial"):
+        failed = ", ".join(
+            CATEGORIES.get(k, {}).get("name", k) for k in result.get("failed_categories", [])
+        )
+        st.warning(f"一部カテゴリの評価に失敗したため、部分的な結果です（{failed}: 0点扱い）。"
+                   "同じ評価IDで再実行すると失敗したカテゴリのみ再評価します。")
+
     # スコアサマリー
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -135,6 +160,48 @@ def render_result_detail(result):
         with st.expander("メタデータ"):
             st.json(meta)
 
+    # Claude 呼出の計測（所要時間・トークン数・推定コスト）
+    telemetry = result.get("telemetry")
+    if telemetry:
+        total = telemetry["total"]
+        with st.expander(f"呼出の計測（{total['calls']}回・${total['cost_usd']:.4f}）"):
+            rows = [{"呼出": label, **stats} for label, stats in telemetry["by_label"].items()]
+            rows.append({"呼出": "合計", **total})
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            tiers = result.get("tiers")
+            if tiers:
+                escalated = ", ".join(
+                    f"{CATEGORIES.get(k, {}).get('name', k)}（{'/'.join(v)}）"
+                    for k, v in tiers["escalated"].items()
+                ) or "なし"
+                st.caption(
+                    f"段階評価: {tiers['fast_model']} → {tiers['primary_model']}、エスカレーション: {escalated}。"
+                    f"常に主モデルの場合と比べて ${tiers['cost_saved_usd']:.4f}・"
+                    f"{tiers['latency_saved']:.1f}秒の節約（見積もり）"
+                )
+
+
+def render_category_progress(slot, cat_key, summary):
+    """カテゴリ単位の途中結果を描画（評価完了したカテゴリから順に表示）"""
+    cat = CATEGORIES[cat_key]
+    with slot.container(border=True):
+        st.markdown(f"**{cat['name']}**　{summary.get('subtotal', 0)}/{cat['max_raw']}点")
+        evidence = summary.get("evidence", {})
+        rows = []
+        for num, score in sorted(summary.get("item_scores", {}).items(), key=lambda x: int(x[0])):
+            ev = evidence.get(num, {})
+            rows.append({
+                "No.": int(num),
+                "項目名": ITEM_NAMES.get(int(num), ""),
+                "スコア": score,
+                "根拠": ev.get("evidence", "")[:80] if isinstance(ev, dict) else "",
+            })
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        for ng in summary.get("ng_words", []):
+            cat_ng = ng.get("category", "?")
+            st.warning(f"**[{cat_ng}] {NG_CATEGORIES.get(cat_ng, cat_ng)}**: {ng.get('text', '')}")
+
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # ページ: 評価実行
@@ -248,7 +315,34 @@ def page_evaluate():
         word_count = len(transcript)
         st.caption(f"テキスト長: {word_count:,}文字 / 上限: {120,000:,}文字")
         if word_count > 120000:
-            st.warning("テキストが上限を超えています。自動的に切り詰められます。")
+            if os.environ.get("EVAL_LONG_MODE", "truncate") == "chunk":
+                st.info("テキストが上限を超えています。分割して評価し、結果を統合します。")
+            else:
+                st.warning("テキストが上限を超えています。自動的に切り詰められます。")
+
+        local_mode = mode == "ローカル（直接API呼出）"
+        if st.button("コスト・所要時間を見積もる", disabled=not local_mode and not cf_url):
+            try:
+                from modules.evaluator import estimate_local, estimate_via_cf
+
+                if local_mode:
+                    estimate = estimate_local(transcript)
+                else:
+                    estimate = estimate_via_cf(transcript, cf_url, cf_secret)
+                input_tokens = (
+                    estimate["input_tokens"]
+                    + estimate["cache_creation_input_tokens"]
+                    + estimate["cache_read_input_tokens"]
+                )
+                st.info(
+                    f"見積もり: Claude 呼出 {estimate['calls']}回 / 入力 {input_tokens:,} トークン / "
+                    f"出力 {estimate['output_tokens']:,} トークン / 約 ${estimate['cost_usd']:.3f} / "
+                    f"約 {estimate['wall_time']:.0f}秒"
+                )
+                if not estimate["latency_model"]["fitted"]:
+                    st.caption("所要時間は既定の係数による目安です（telemetry の記録がありません）")
+            except Exception as e:
+                st.warning(f"見積もりに失敗しました: {e}")
 
     # ── 実行 ──
     st.divider()
@@ -278,7 +372,7 @@ def page_evaluate():
         }
 
         try:
-            from modules.evaluator import evaluate_local, evaluate_via_cf
+            from modules.evaluator import iter_evaluate_local, evaluate_via_cf
 
             # ── Step 1: 音声→文字起こし（音声入力時のみ）──
             if input_method == "音声ファイル":
@@ -319,26 +413,51 @@ def page_evaluate():
             if input_method == "音声ファイル":
                 st.subheader(step_label)
 
+            # カテゴリごとの表示枠（完了したものから結果に置き換える）
+            cat_slots = {}
+            for cat_key, cat in CATEGORIES.items():
+                cat_slots[cat_key] = st.empty()
+                cat_slots[cat_key].caption(f"{cat['name']}: 評価待ち...")
+
+            def on_category(cat_key, summary):
+                if cat_key in cat_slots:
+                    render_category_progress(cat_slots[cat_key], cat_key, summary)
+
             if mode == "ローカル（直接API呼出）":
-                progress_bar = st.progress(0, text="評価を開始しています...")
+                progress_bar = st.progress(0, text="Claude APIで評価中...（約2-3分）")
+                total = len(CATEGORIES)
+                done = 0
+                for event in iter_evaluate_local(transcript, priority="interactive"):
+                    if event["type"] == "category":
+                        done += 1
+                        on_category(event["category"], event)
+                        progress_bar.progress(
+                            done / total,
+                            text=f"{CATEGORIES[event['category']]['name']} の評価完了（{done}/{total}）",
+                        )
+                    else:
+                        result = {k: v for k, v in event.items() if k != "type"}
+
+                progress_bar.progress(1.0, text="評価完了")
+
+            else:
+                progress_bar = st.progress(0, text="Cloud Functionに評価ジョブを投入しています...")
 
                 def on_progress(current, total, message):
                     progress_bar.progress(current / total if total > 0 else 0, text=message)
 
-                with st.spinner("Claude APIで評価中...（約2-3分）"):
-                    result = evaluate_local(transcript, progress_callback=on_progress)
+                result = evaluate_via_cf(
+                    transcript=transcript,
+                    cf_url=cf_url,
+                    cf_secret=cf_secret,
+                    metadata=metadata,
+                    progress_callback=on_progress,
+                    on_category=on_category,
+                    priority="interactive",
+                )
 
                 progress_bar.progress(1.0, text="評価完了")
 
-            else:
-                with st.spinner("Cloud Functionで評価中...（約2-3分）"):
-                    result = evaluate_via_cf(
-                        transcript=transcript,
-                        cf_url=cf_url,
-                        cf_secret=cf_secret,
-                        metadata=metadata,
-                    )
-
             # メタデータを結果に追加
             result["metadata"] = metadata
 
@@ -351,6 +470,8 @@ def page_evaluate():
                 json.dumps(result, ensure_ascii=False, indent=2),
                 encoding="utf-8",
             )
+            # 文字起こしも同名で保存（benchmark.py の比較コーパスになる）
+            result_path.with_suffix(".txt").write_text(transcript, encoding="utf-8")
 
             st.success(f"評価完了！結果を保存しました: {filename}")
 
@@ -3,30 +3,55 @@
 
 Usage:
     python evaluate.py transcript.txt [--output result.json]
+
+    # 一括再評価（プロンプト調整後に過去の相談をまとめて採点し直す）
+    python evaluate.py results/ [--concurrency 2] [--out-dir results] [--limit 100]
+    python evaluate.py manifest.jsonl
+    python evaluate.py results/ --backend batch   # Message Batches API（遅いが低コスト）
+
+一括モード:
+    入力がディレクトリの場合は *.txt（同名の結果JSONがあればそのメタデータを引き継ぐ）、
+    無ければ "transcript" キーを持つ *.json を対象にする。
+    マニフェスト（.jsonl）は1行1件で {"transcript": "パス", "metadata": {...}} を指定する。
+
+    結果はダッシュボードと同じ形式の JSON（{timestamp}_{name}_{id6}.json、id6 は入力IDの先頭6文字）で
+    --out-dir に保存する。進捗は --out-dir の bulk_{版}.jsonl に追記し、同じプロンプト・モデル・
+    評価設定（prompt_version）で再実行すると完了済みの文字起こしを飛ばして続きから評価する。
 """
 
 import argparse
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
 
 from config.settings import CATEGORIES, ITEM_NAMES
-from modules.evaluator import evaluate_local
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Consultant Evaluation (CLI)")
-    parser.add_argument("transcript", help="Path to transcript file")
-    parser.add_argument("--output", "-o", help="Output JSON path")
-    args = parser.parse_args()
+from modules.evaluator import (
+    ENGINE,
+    EVAL_CHUNK_CHARS,
+    EVAL_CHUNK_OVERLAP_CHARS,
+    EVAL_COMPACT,
+    EVAL_COMPACT_RULES,
+    EVAL_CONTEXT_MODE,
+    EVAL_FAST_MODEL,
+    EVAL_LONG_MODE,
+    EVAL_RETRIEVAL_TOKENS,
+    EVAL_SAMPLES,
+    EVAL_TIERED,
+    MODEL,
+    NG_MODE,
+    PROMPTS_DIR,
+    evaluate_batch,
+    evaluate_local,
+)
 
-    transcript = Path(args.transcript).read_text(encoding="utf-8")
-    print(f"Transcript loaded: {len(transcript):,} chars")
+DEFAULT_OUT_DIR = Path(__file__).parent / "results"
 
-    def on_progress(current, total, message):
-        print(f"  [{current}/{total}] {message}")
-
-    result = evaluate_local(transcript, progress_callback=on_progress)
 
+def print_result(result: dict):
     print(f"\n{'='*50}")
     print(f"AI Total Score: {result['ai_total']}/90")
     print(f"Raw Total: {result['raw_total']}/110")
@@ -42,6 +67,257 @@ def main():
     if result["ng_words"]:
         print(f"\nNG Words: {len(result['ng_words'])} detected")
 
+
+# ── Bulk mode ──
+
+# 評価設定の既定値（既定のままの設定は版のキーに含めない＝既存のチェックポイントを引き継ぐ）
+SETTING_DEFAULTS = {"long_mode": "truncate", "compact": False, "context_mode": "full", "tiered": False, "samples": 1}
+
+
+def evaluation_settings(backend: str = "local") -> dict:
+    """採点結果を変える EVAL_* 設定のうち既定値と異なるもの"""
+    settings = {"long_mode": EVAL_LONG_MODE, "compact": EVAL_COMPACT, "context_mode": EVAL_CONTEXT_MODE}
+    if backend != "batch":  # バッチでは段階評価・追加サンプルを行わない
+        settings.update(tiered=EVAL_TIERED, samples=EVAL_SAMPLES)
+    if settings["long_mode"] == "chunk":
+        settings.update(chunk_chars=EVAL_CHUNK_CHARS, chunk_overlap_chars=EVAL_CHUNK_OVERLAP_CHARS)
+    if settings["compact"]:
+        settings["compact_rules"] = EVAL_COMPACT_RULES
+    if settings["context_mode"] == "retrieval":
+        settings["retrieval_tokens"] = EVAL_RETRIEVAL_TOKENS
+    if settings.get("tiered"):
+        settings["fast_model"] = EVAL_FAST_MODEL
+    return {k: v for k, v in settings.items() if SETTING_DEFAULTS.get(k) != v}
+
+
+def prompt_version(engine: str, ng_mode: str = "llm", backend: str = "local") -> str:
+    """プロンプト一式・モデル・エンジン・NG語句モード・評価設定のハッシュ（チェックポイントの単位）"""
+    key = f"{MODEL}\n{engine}\n" if ng_mode == "llm" else f"{MODEL}\n{engine}\n{ng_mode}\n"
+    settings = evaluation_settings(backend)
+    if settings:
+        key += json.dumps(settings, sort_keys=True) + "\n"
+    h = hashlib.sha256(key.encode("utf-8"))
+    for path in sorted(PROMPTS_DIR.glob("*.txt")):
+        h.update(path.name.encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()[:12]
+
+
+def _read_json(path: Path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def load_bulk_inputs(path: Path) -> list:
+    """一括評価の入力を [{"id", "name", "source", "transcript", "metadata"}] で返す"""
+    entries = []
+    if path.is_dir():
+        for txt in sorted(path.glob("*.txt")):
+            sibling = _read_json(txt.with_suffix(".json")) or {}
+            entries.append({
+                "source": txt,
+                "transcript": txt.read_text(encoding="utf-8"),
+                "metadata": sibling.get("metadata", {}),
+            })
+        if not entries:
+            for js in sorted(path.glob("*.json")):
+                data = _read_json(js)
+                if isinstance(data, dict) and isinstance(data.get("transcript"), str):
+                    entries.append({
+                        "source": js,
+                        "transcript": data["transcript"],
+                        "metadata": data.get("metadata", {}),
+                    })
+    else:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            source = Path(item["transcript"])
+            if not source.is_absolute():
+                source = path.parent / source
+            entries.append({
+                "source": source,
+                "transcript": source.read_text(encoding="utf-8"),
+                "metadata": item.get("metadata", {}),
+            })
+
+    seen = set()
+    inputs = []
+    for entry in entries:
+        if not entry["transcript"].strip():
+            continue
+        # 内容で識別する（ファイルを移動しても再開できる・同一内容は1回だけ評価）
+        entry["id"] = hashlib.sha256(entry["transcript"].encode("utf-8")).hexdigest()[:16]
+        if entry["id"] in seen:
+            continue
+        seen.add(entry["id"])
+        entry["name"] = entry["source"].stem
+        inputs.append(entry)
+    return inputs
+
+
+def load_checkpoint(path: Path) -> dict:
+    """チェックポイント（JSONL）から id ごとの最新の記録を返す"""
+    done = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 書き込み途中で落ちた最終行
+            done[record["id"]] = record
+    return done
+
+
+def run_bulk(args):
+    engine = args.engine or ENGINE
+    ng_mode = args.ng_mode or NG_MODE
+    version = prompt_version(engine, ng_mode, args.backend)
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else out_dir / f"bulk_{version}.jsonl"
+
+    inputs = load_bulk_inputs(Path(args.transcript))
+    checkpoint = load_checkpoint(checkpoint_path)
+    pending = [e for e in inputs if checkpoint.get(e["id"], {}).get("status") != "done"]
+    todo = pending[:args.limit] if args.limit else pending
+
+    print(f"Bulk run {version} (model={MODEL}, engine={engine}, ng_mode={ng_mode}, backend={args.backend})")
+    if evaluation_settings(args.backend):
+        print(f"  settings: {evaluation_settings(args.backend)}")
+    print(f"  inputs: {len(inputs)}, already done: {len(inputs) - len(pending)}, to evaluate: {len(todo)}")
+    print(f"  checkpoint: {checkpoint_path}")
+    if not todo:
+        return
+
+    lock = threading.Lock()
+    started = time.monotonic()
+    stats = {"done": 0, "failed": 0, "tokens": 0, "cost": 0.0}
+
+    def save(entry, result):
+        result["metadata"] = {
+            **entry["metadata"],
+            "evaluated_at": datetime.now().isoformat(),
+            "input_type": "text",
+            "bulk_run": version,
+            "source": str(entry["source"]),
+        }
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_name = (entry["metadata"].get("consultant_name") or entry["name"]).replace(" ", "_")
+        filename = f"{timestamp}_{safe_name}_{entry['id'][:6]}.json"
+        (out_dir / filename).write_text(
+            json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return filename
+
+    def record(entry, **fields):
+        line = json.dumps({
+            "id": entry["id"],
+            "source": str(entry["source"]),
+            "finished_at": datetime.now().isoformat(),
+            **fields,
+        }, ensure_ascii=False)
+        with lock:
+            with checkpoint_path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def failed(entry, error):
+        stats["failed"] += 1
+        record(entry, status="error", error=error)
+        print(f"  ERROR {entry['name']}: {error}")
+
+    def completed(entry, result, filename):
+        usage = result.get("usage", {})
+        tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        cost = (result.get("telemetry") or {}).get("total", {}).get("cost_usd", 0.0)
+        stats["done"] += 1
+        stats["tokens"] += tokens
+        stats["cost"] += cost
+        record(entry, status="done", output=filename, ai_total=result["ai_total"], tokens=tokens,
+               cost_usd=cost)
+
+        minutes = max(time.monotonic() - started, 1e-6) / 60
+        finished = stats["done"] + stats["failed"]
+        print(
+            f"  [{finished}/{len(todo)}] {entry['name']}: {result['ai_total']}/90 -> {filename} | "
+            f"{stats['done'] / minutes:.1f} transcripts/min, {stats['tokens'] / minutes:,.0f} tokens/min"
+        )
+
+    if args.backend == "batch":
+        # 全件を1回のバッチ投入にまとめる（完了まで数分〜最大24時間）
+        def on_progress(current, total, message):
+            print(f"  {message}")
+
+        results = evaluate_batch(
+            {entry["id"]: entry["transcript"] for entry in todo},
+            engine=engine,
+            progress_callback=on_progress,
+            ng_mode=ng_mode,
+        )
+        for entry in todo:
+            result = results[entry["id"]]
+            if "error" in result:
+                failed(entry, result["error"])
+            else:
+                completed(entry, result, save(entry, result))
+    else:
+        def evaluate_one(entry):
+            result = evaluate_local(entry["transcript"], engine=engine, ng_mode=ng_mode, priority="bulk")
+            if result["partial"]:
+                # 失敗したカテゴリを含む結果は保存せず、再実行で評価し直す
+                raise RuntimeError(f"failed categories: {', '.join(result['failed_categories'])}")
+            return result, save(entry, result)
+
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            futures = {pool.submit(evaluate_one, entry): entry for entry in todo}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    result, filename = future.result()
+                except Exception as e:
+                    failed(entry, str(e))
+                    continue
+                completed(entry, result, filename)
+
+    elapsed = time.monotonic() - started
+    print(f"\nBulk run finished: {stats['done']} evaluated, {stats['failed']} failed, "
+          f"{elapsed / 60:.1f} min, {stats['tokens']:,} tokens, ${stats['cost']:.2f} (estimated)")
+    if stats["failed"]:
+        print("  Re-run the same command to retry the failed transcripts.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultant Evaluation (CLI)")
+    parser.add_argument("transcript", help="Transcript file, or a directory / .jsonl manifest for bulk mode")
+    parser.add_argument("--output", "-o", help="Output JSON path (single transcript)")
+    parser.add_argument("--engine", choices=["split", "single"], help="Evaluation engine (default: EVAL_ENGINE)")
+    parser.add_argument("--ng-mode", choices=["llm", "candidates", "local"],
+                        help="NG word detection: model / dictionary candidates / dictionary only (default: EVAL_NG_MODE)")
+    parser.add_argument("--backend", choices=["local", "batch"], default="local",
+                        help="Bulk backend: direct calls, or one Message Batches submission (about half the cost)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Transcripts evaluated at once (bulk, local)")
+    parser.add_argument("--out-dir", default=str(DEFAULT_OUT_DIR), help="Result directory (bulk)")
+    parser.add_argument("--checkpoint", help="Checkpoint path (bulk, default: <out-dir>/bulk_<version>.jsonl)")
+    parser.add_argument("--limit", type=int, default=0, help="Max transcripts to evaluate in this run (bulk)")
+    args = parser.parse_args()
+
+    source = Path(args.transcript)
+    if source.is_dir() or source.suffix == ".jsonl":
+        run_bulk(args)
+        return
+
+    transcript = source.read_text(encoding="utf-8")
+    print(f"Transcript loaded: {len(transcript):,} chars")
+
+    def on_progress(current, total, message):
+        print(f"  [{current}/{total}] {message}")
+
+    result = evaluate_local(transcript, progress_callback=on_progress, engine=args.engine, ng_mode=args.ng_mode)
+    print_result(result)
+
     if args.output:
         Path(args.output).write_text(
             json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8"
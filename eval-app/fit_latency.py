@@ -0,0 +1,63 @@
+"""
+事前見積もり用の所要時間モデルを、保存済みの評価結果の telemetry から当てはめる
+
+評価結果 JSON（ダッシュボード・evaluate.py・CF の応答を保存したもの）の "telemetry" の
+呼出記録を集め、モデルごとの所要時間の係数とラベルごとの出力トークン数を当てはめる
+（common/estimate.py の LatencyModel）。出力した JSON を CF のディレクトリに置き、
+ANTHROPIC_LATENCY_MODEL にそのパスを設定すると action=estimate / dry_run が使う。
+
+Usage:
+    python fit_latency.py [results ...] [--output latency_model.json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+CF_DIR = Path(__file__).parent.parent / "cloud_functions" / "consultation_evaluation"
+sys.path.append(str(CF_DIR))
+from common.estimate import LatencyModel, calls_from_records  # noqa: E402
+
+
+def load_calls(paths: list) -> list:
+    """ファイル・ディレクトリ（*.json を再帰的に）から呼出記録を集める"""
+    calls = []
+    for path in paths:
+        files = sorted(path.rglob("*.json")) if path.is_dir() else [path]
+        for file in files:
+            try:
+                data = json.loads(file.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+            calls.extend(calls_from_records(data))
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the pre-flight latency model from saved telemetry")
+    parser.add_argument("paths", nargs="*", type=Path, default=[Path("results")],
+                        help="Result JSON files or directories (default: results)")
+    parser.add_argument("--output", default="latency_model.json", help="Where to write the fitted model")
+    args = parser.parse_args()
+
+    calls = load_calls(args.paths)
+    if not calls:
+        print("No telemetry calls found")
+        return
+    model = LatencyModel.fit(calls)
+    print(f"Calls: {len(calls):,}")
+    for family, obs in sorted(model.observations.items()):
+        base, per_input, per_cache_read, per_output = model.coefficients[family]
+        print(f"  {family}: {obs['calls']} calls, rmse={obs['rmse']}s  "
+              f"base={base:.2f}s  in={per_input * 1000:.4f}s/1k  "
+              f"cache_read={per_cache_read * 1000:.4f}s/1k  out={per_output * 1000:.2f}s/1k")
+    for label, tokens in sorted(model.output_tokens.items()):
+        print(f"  output[{label}]: {tokens:,} tokens (median)")
+
+    Path(args.output).write_text(json.dumps(model.to_dict(), indent=2), encoding="utf-8")
+    print(f"\nModel saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
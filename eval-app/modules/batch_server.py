@@ -0,0 +1,201 @@
+"""
+Message Batches API のローカルスタンドイン（オフライン確認用）
+
+投入・状態取得・結果取得（JSONL）のエンドポイントだけを実装した HTTP サーバー。
+応答は各リクエストのプロンプト末尾にある回答形式（JSON）の例をそのまま返すため、
+API キーもネットワークも不要で evaluate_batch の投入→ポーリング→集計を一通り実行できる。
+
+Usage:
+    python -m modules.batch_server [--port 8765] [--latency 5] [--fail-every 0]
+    EVAL_BATCH_BASE_URL=http://127.0.0.1:8765 python evaluate.py results/ --backend batch
+
+    # コード内から
+    server, url = start_server(latency=0)
+    evaluate_batch({...}, client=anthropic.Anthropic(api_key="x", base_url=url), poll_interval=0.1)
+    server.shutdown()
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BATCH_PATH = re.compile(r"^/v1/messages/batches/([\w-]+)(/results)?$")
+_EXAMPLE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+def example_responder(params: dict) -> str:
+    """プロンプト中の最後の回答形式の例を応答にする（例が無ければ空の評価）"""
+    text = ""
+    for message in params.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") for block in content)
+        text += content
+    examples = _EXAMPLE.findall(text)
+    return "```json\n" + (examples[-1] if examples else '{"items": {}, "ng_words": []}') + "\n```"
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class BatchStore:
+    """投入されたバッチと結果（メモリ上）"""
+
+    def __init__(self, latency: float = 0, fail_every: int = 0, responder=example_responder):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.responder = responder
+        self.batches = {}
+        self._lock = threading.Lock()
+
+    def create(self, requests_: list) -> dict:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        with self._lock:
+            self.batches[batch_id] = {"created": time.time(), "requests": requests_, "results": None}
+        return batch_id
+
+    def _ended(self, batch: dict) -> bool:
+        return time.time() - batch["created"] >= self.latency
+
+    def _results(self, batch: dict) -> list:
+        if batch["results"] is None:
+            results = []
+            for n, request in enumerate(batch["requests"], 1):
+                if self.fail_every and n % self.fail_every == 0:
+                    result = {
+                        "type": "errored",
+                        "error": {"type": "error", "error": {"type": "api_error", "message": "stand-in failure"}},
+                    }
+                else:
+                    params = request["params"]
+                    text = self.responder(params)
+                    prompt_chars = len(json.dumps(params, ensure_ascii=False))
+                    result = {
+                        "type": "succeeded",
+                        "message": {
+                            "id": f"msg_{uuid.uuid4().hex[:24]}",
+                            "type": "message",
+                            "role": "assistant",
+                            "model": params.get("model", ""),
+                            "content": [{"type": "text", "text": text}],
+                            "stop_reason": "end_turn",
+                            "stop_sequence": None,
+                            # トークン数は文字数からの目安（日本語は概ね1文字1トークン）
+                            "usage": {
+                                "input_tokens": prompt_chars,
+                                "output_tokens": len(text),
+                                "cache_creation_input_tokens": 0,
+                                "cache_read_input_tokens": 0,
+                            },
+                        },
+                    }
+                results.append({"custom_id": request["custom_id"], "result": result})
+            batch["results"] = results
+        return batch["results"]
+
+    def describe(self, batch_id: str, base_url: str) -> dict:
+        with self._lock:
+            batch = self.batches[batch_id]
+            ended = self._ended(batch)
+            results = self._results(batch) if ended else []
+        succeeded = sum(1 for r in results if r["result"]["type"] == "succeeded")
+        total = len(batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else total,
+                "succeeded": succeeded,
+                "errored": len(results) - succeeded,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": _iso(batch["created"]),
+            "expires_at": _iso(batch["created"] + timedelta(days=1).total_seconds()),
+            "ended_at": _iso(batch["created"] + self.latency) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def results_jsonl(self, batch_id: str) -> str:
+        with self._lock:
+            results = self._results(self.batches[batch_id])
+        return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+
+
+def _handler(store: BatchStore):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _base_url(self) -> str:
+            host, port = self.server.server_address[:2]
+            return f"http://{host}:{port}"
+
+        def _send(self, status: int, body: str, content_type: str = "application/json"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self):
+            error = {"type": "error", "error": {"type": "not_found_error", "message": self.path}}
+            self._send(404, json.dumps(error))
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/v1/messages/batches":
+                return self._not_found()
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            batch_id = store.create(body.get("requests", []))
+            self._send(200, json.dumps(store.describe(batch_id, self._base_url())))
+
+        def do_GET(self):
+            m = _BATCH_PATH.match(self.path.split("?")[0])
+            if not m or m.group(1) not in store.batches:
+                return self._not_found()
+            if m.group(2):
+                self._send(200, store.results_jsonl(m.group(1)), "application/binary")
+            else:
+                self._send(200, json.dumps(store.describe(m.group(1), self._base_url())))
+
+    return Handler
+
+
+def start_server(port: int = 0, latency: float = 0, fail_every: int = 0, responder=example_responder):
+    """バックグラウンドスレッドでサーバーを起動し (server, base_url) を返す（port=0 で空きポート）"""
+    store = BatchStore(latency=latency, fail_every=fail_every, responder=responder)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(store))
+    server.store = store
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Message Batches API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=5, help="Seconds until a batch ends")
+    parser.add_argument("--fail-every", type=int, default=0, help="Make every Nth request error (0 = never)")
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.latency, args.fail_every)
+    print(f"Batch stand-in listening on {url} (set EVAL_BATCH_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
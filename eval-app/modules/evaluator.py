@@ -3,10 +3,23 @@
 
 ローカルモード: Claude APIを直接呼び出し
 CFモード: Cloud Function経由で呼び出し
+
+ローカルモード・バッチモード・見積もりは CF の評価エンジン（consultation_evaluation/engine.py）の
+薄いラッパーで、呼出計画・再試行・JSON 修復・集計・根拠照合・スコア換算は CF と同じコードを使う
+（設定も CF と同じ環境変数・既定値）。
+iter_evaluate_local はカテゴリ完了ごとに結果を逐次返す（ダッシュボードの段階表示用）。
+Claude 呼出はCFと同じレート制御スケジューラ（common/ratelimit.py、ANTHROPIC_RPM / ANTHROPIC_ITPM）を経由する。
+バッチモード（evaluate_batch）: 複数の文字起こしの全呼出を Message Batches API に一括投入し、
+完了をポーリングして結果を集計する（料金はおよそ半額、結果は最大24時間後）。
+オフライン確認用のスタンドイン: python -m modules.batch_server（EVAL_BATCH_BASE_URL で接続）
+各結果の "telemetry" に呼出ごとの所要時間・待ち時間・トークン数・推定コストを集計する（common/telemetry.py）。
+"category_scores" はどのモードでもカテゴリ小計（素点）、"categories" は 90点満点換算。
+事前見積もり: estimate_local は同じ呼出計画から呼出回数・トークン数・推定コスト・所要時間を返す
+（所要時間は記録済みの telemetry から当てはめたモデル、common/estimate.py）。CF は estimate_via_cf。
 """
 
-import json
-import os
+import sys
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -14,107 +27,185 @@ import anthropic
 import requests
 from dotenv import load_dotenv
 
-from config.settings import CATEGORIES, RAW_MAX, AI_MAX
+from config.settings import CATEGORIES
 
 load_dotenv()
 
-PROMPTS_DIR = Path(__file__).parent.parent.parent / "cloud_functions" / "consultation_evaluation" / "prompts"
-MODEL = "claude-sonnet-4-20250514"
-MAX_TRANSCRIPT_CHARS = 120000
-
-
-def load_prompt(filename: str) -> str:
-    path = PROMPTS_DIR / filename
-    if path.exists():
-        return path.read_text(encoding="utf-8")
-    return ""
-
-
-SYSTEM_PROMPT = load_prompt("system.txt")
-
-CALL_PROMPTS = [
-    ("c1", "call1_problem.txt"),
-    ("c2", "call2_solution.txt"),
-    ("c3", "call3_communication.txt"),
-    ("c4", "call4_time.txt"),
-    ("c5", "call5_logic.txt"),
-    ("c6", "call6_ethics.txt"),
-]
-
-
-def scale_to_90(raw_total: int) -> int:
-    if raw_total <= 0:
-        return 0
-    return round(raw_total * AI_MAX / RAW_MAX)
-
-
-def _call_claude(client: anthropic.Anthropic, prompt: str, transcript: str) -> dict:
-    user_content = prompt.replace("{transcript}", transcript)
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=4096,
-        temperature=0,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_content}],
+CF_DIR = Path(__file__).parent.parent.parent / "cloud_functions" / "consultation_evaluation"
+LOCAL_CONCURRENCY = 6
+CF_SYNC_TIMEOUT = 660  # 同期の action=evaluate（CF の --timeout 600 より長く待つ）
+
+# 評価エンジンはCFのモジュールを共用する（環境変数は import 時に読むため load_dotenv の後）
+sys.path.append(str(CF_DIR))
+from engine import (  # noqa: E402, F401
+    CALL_PROMPTS,
+    EVAL_CHUNK_CHARS,
+    EVAL_CHUNK_OVERLAP_CHARS,
+    EVAL_COMPACT,
+    EVAL_COMPACT_RULES,
+    EVAL_CONTEXT_MODE,
+    EVAL_ENGINE as ENGINE,
+    EVAL_FAST_MODEL,
+    EVAL_LONG_MODE,
+    EVAL_NG_MODE as NG_MODE,
+    EVAL_RETRIEVAL_TOKENS,
+    EVAL_SAMPLES,
+    EVAL_TIERED,
+    MODEL,
+    PROMPTS_DIR,
+    BatchTransport,
+    estimate_evaluation,
+    evaluate_batch as _evaluate_batch,
+    iter_evaluation,
+)
+
+
+def _local_result(result: dict) -> dict:
+    """エンジンの結果をローカルモードの形式にする（latency は全体の秒数、usage は合計）"""
+    return {**result, "latency": result["latency"]["total"], "usage": result["usage"]["total"]}
+
+
+def iter_evaluate_local(
+    transcript: str,
+    concurrency: int = LOCAL_CONCURRENCY,
+    long_mode: Optional[str] = None,
+    compact: Optional[bool] = None,
+    engine: Optional[str] = None,
+    ng_mode: Optional[str] = None,
+    priority: Optional[str] = None,
+):
+    """ローカルモード（逐次出力）: カテゴリ完了ごとにイベントを返す
+
+    上限超過時は long_mode（既定: EVAL_LONG_MODE）が "chunk" なら分割評価、
+    それ以外は切り詰める。compact（既定: EVAL_COMPACT）が真なら評価前に
+    コンパクションし、根拠の original_offset に元テキスト上の位置を付ける。
+    engine（既定: EVAL_ENGINE）が "single" なら1回の呼出で全カテゴリを評価する。
+    ng_mode（既定: EVAL_NG_MODE）が candidates / local なら NG語句を辞書で事前検出する（CF の ng_scan.py）。
+    priority はスケジューラの優先度クラス（interactive / pipeline / bulk、既定 pipeline）。
+    再試行しても失敗したカテゴリは 0点で、結果の partial / failed_categories に入る（CF と同じ）。
+
+    Yields:
+        {"type": "category", "category": "c1", "subtotal", "item_scores", "evidence", "ng_words", "latency"}
+        （完了順）、最後に {"type": "result", **evaluate_local と同じ結果}
+    """
+    events = iter_evaluation(
+        transcript, {}, concurrency=concurrency, long_mode=long_mode, compact=compact,
+        engine=engine, ng_mode=ng_mode, priority=priority,
     )
-    text = response.content[0].text.strip()
-    if "```json" in text:
-        text = text.split("```json")[1].split("```")[0].strip()
-    elif "```" in text:
-        text = text.split("```")[1].split("```")[0].strip()
-    return json.loads(text)
+    for event in events:
+        if event["type"] == "error":
+            raise RuntimeError(event["error"])
+        if event["type"] == "result":
+            event = {"type": "result", **_local_result(event)}
+        yield event
+
+
+def evaluate_batch(
+    transcripts: dict,
+    engine: Optional[str] = None,
+    long_mode: Optional[str] = None,
+    compact: Optional[bool] = None,
+    client: Optional[anthropic.Anthropic] = None,
+    ng_mode: Optional[str] = None,
+    poll_interval: Optional[float] = None,
+    timeout: Optional[float] = None,
+    progress_callback=None,
+) -> dict:
+    """バッチモード: 複数の文字起こしを Message Batches API でまとめて評価
+
+    全文字起こしの (group, チャンク) 呼出を1つ（多い場合は BATCH_MAX_REQUESTS 件ずつ）の
+    バッチとして投入し、完了までポーリングしてから evaluate_local と同じ集計・クランプを行う
+    （engine.py の evaluate_batch）。
+
+    Args:
+        transcripts: {識別子: 文字起こし}
+
+    Returns:
+        {識別子: evaluate_local と同じ形式の結果}。失敗した呼出を含む文字起こしは {"error": ...}
+    """
+    transport = BatchTransport(client, poll_interval, timeout)
+    results = _evaluate_batch(
+        transcripts, transport, progress_callback,
+        engine=engine, long_mode=long_mode, compact=compact, ng_mode=ng_mode,
+    )
+    out = {}
+    for tid, result in results.items():
+        if result["partial"]:
+            out[tid] = {"error": "; ".join(f"{k}: {v}" for k, v in result["errors"].items())}
+            continue
+        out[tid] = {
+            **_local_result(result),
+            "backend": "batch",
+            "batch_ids": result["batch"]["ids"],
+            # バッチ内の個々の呼出の所要時間は分からないため、投入から完了までの時間
+            "latency": result["batch"]["wall_time"],
+        }
+    return out
 
 
-def evaluate_local(transcript: str, progress_callback=None) -> dict:
+def evaluate_local(
+    transcript: str,
+    progress_callback=None,
+    engine: Optional[str] = None,
+    ng_mode: Optional[str] = None,
+    priority: Optional[str] = None,
+) -> dict:
     """ローカルモード: Claude APIを直接呼び出して評価"""
-    if len(transcript) > MAX_TRANSCRIPT_CHARS:
-        transcript = transcript[:MAX_TRANSCRIPT_CHARS] + "\n\n[...テキストが長いため省略されました...]"
-
-    client = anthropic.Anthropic()
-
-    all_scores = {}
-    all_evidence = {}
-    all_ng = []
-    raw_total = 0
-    cat_scores = {}
-
-    for i, (cat_key, prompt_file) in enumerate(CALL_PROMPTS):
-        prompt = load_prompt(prompt_file)
-        if not prompt:
-            continue
-
-        cat_name = CATEGORIES[cat_key]["name"]
-        if progress_callback:
-            progress_callback(i, len(CALL_PROMPTS), f"{cat_name} を評価中...")
+    total = len(CALL_PROMPTS)
+    if progress_callback:
+        progress_callback(0, total, "評価を実行中...")
+
+    done = 0
+    for event in iter_evaluate_local(transcript, engine=engine, ng_mode=ng_mode, priority=priority):
+        if event["type"] == "category":
+            done += 1
+            if progress_callback:
+                cat_name = CATEGORIES[event["category"]]["name"]
+                progress_callback(done, total, f"{cat_name} の評価完了")
+        else:
+            result = event
 
-        result = _call_claude(client, prompt, transcript)
+    if progress_callback:
+        progress_callback(total, total, "評価完了")
 
-        subtotal = 0
-        for num, data in result.get("items", {}).items():
-            score = max(1, min(5, int(data.get("score", 3))))
-            all_scores[num] = score
-            all_evidence[num] = {
-                "evidence": data.get("evidence", ""),
-                "reasoning": data.get("reasoning", ""),
-            }
-            subtotal += score
+    result.pop("type")
+    return result
 
-        raw_total += subtotal
-        cat_scores[cat_key] = subtotal
-        all_ng.extend(result.get("ng_words", []))
 
-    if progress_callback:
-        progress_callback(len(CALL_PROMPTS), len(CALL_PROMPTS), "評価完了")
+def estimate_local(
+    transcript: str,
+    long_mode: Optional[str] = None,
+    compact: Optional[bool] = None,
+    engine: Optional[str] = None,
+    ng_mode: Optional[str] = None,
+) -> dict:
+    """ローカルモードの評価を実行せずに、呼出回数・入出力トークン数・推定コスト・所要時間を見積もる
+
+    呼出計画は iter_evaluate_local と同じ（engine.py の estimate_evaluation）。全呼出を
+    LOCAL_CONCURRENCY 並列で実行するものとして所要時間を見積もる。
+    """
+    return estimate_evaluation(
+        transcript, concurrency=LOCAL_CONCURRENCY, long_mode=long_mode, compact=compact,
+        engine=engine, ng_mode=ng_mode,
+    )
 
-    ai_total = scale_to_90(raw_total)
 
+def _cf_result(result: dict) -> dict:
     return {
-        "ai_total": ai_total,
-        "raw_total": raw_total,
-        "category_scores": cat_scores,
-        "item_scores": all_scores,
-        "evidence": all_evidence,
-        "ng_words": all_ng,
+        "ai_total": result.get("ai_total", 0),
+        "raw_total": result.get("raw_total", 0),
+        # 旧CFは換算済みの "categories" だけを返す
+        "category_scores": result.get("category_scores", result.get("categories", {})),
+        "categories": result.get("categories", {}),
+        "item_scores": result.get("item_scores", {}),
+        "evidence": result.get("evidence", {}),
+        "ng_words": result.get("ng_words", []),
+        "partial": result.get("partial", False),
+        "failed_categories": result.get("failed_categories", []),
+        "telemetry": result.get("telemetry"),
+        "evidence_check": result.get("evidence_check"),
+        "tiers": result.get("tiers"),
+        "sampling": result.get("sampling"),
     }
 
 
@@ -123,13 +214,27 @@ def evaluate_via_cf(
     cf_url: str,
     cf_secret: str,
     metadata: Optional[dict] = None,
+    progress_callback=None,
+    on_category=None,
+    poll_interval: float = 5.0,
+    timeout: float = 1200.0,
+    priority: Optional[str] = None,
 ) -> dict:
-    """CFモード: Cloud Function経由で評価"""
+    """CFモード: Cloud Function経由で評価
+
+    ジョブモード（action=submit）で投入し、action=status をポーリングして結果を取得する。
+    HTTP接続を評価完了まで保持しないため、長時間の評価でもタイムアウトしない。
+    on_category(cat_key, summary) は途中結果（partial）に現れたカテゴリごとに1回呼ばれる。
+    priority は CF 側スケジューラの優先度クラス（未指定なら CF の既定 pipeline）。
+    CF がジョブモードを使えない（409、ジョブの保存先が共有されていない）ときは同期の
+    action=evaluate で評価する（途中結果は出ない）。
+    """
     if not metadata:
         metadata = {}
 
     payload = {
         "secret": cf_secret,
+        "action": "submit",
         "transcript": transcript,
         "evaluation_id": metadata.get("evaluation_id", ""),
         "application_id": metadata.get("application_id", ""),
@@ -138,19 +243,69 @@ def evaluate_via_cf(
         "industry": metadata.get("industry", ""),
         "theme": metadata.get("theme", ""),
     }
+    if priority:
+        payload["priority"] = priority
 
-    resp = requests.post(cf_url, json=payload, timeout=660)
+    resp = requests.post(cf_url, json=payload, timeout=60)
+    if resp.status_code == 409 and resp.json().get("jobs_available") is False:
+        if progress_callback:
+            progress_callback(0, len(CALL_PROMPTS), "Cloud Functionで評価中...（同期）")
+        resp = requests.post(cf_url, json={**payload, "action": "evaluate"}, timeout=CF_SYNC_TIMEOUT)
     resp.raise_for_status()
-    result = resp.json()
+    submitted = resp.json()
+
+    if not submitted.get("success"):
+        raise RuntimeError(submitted.get("error", "CF returned success=false"))
+
+    # ジョブ非対応の旧CFは同期で結果を返す
+    if "job_id" not in submitted:
+        return _cf_result(submitted)
+
+    job_id = submitted["job_id"]
+    deadline = time.monotonic() + timeout
+    total = len(CALL_PROMPTS)
+    seen = set()
+    while True:
+        time.sleep(poll_interval)
+        resp = requests.post(
+            cf_url,
+            json={"secret": cf_secret, "action": "status", "job_id": job_id},
+            timeout=60,
+        )
+        if resp.status_code == 404:
+            raise RuntimeError(f"CF job {job_id} not found (is EVAL_JOB_BACKEND shared across instances?)")
+        resp.raise_for_status()
+        job = resp.json()
+
+        partial = job.get("partial", {})
+        if on_category:
+            for cat_key, summary in partial.items():
+                if cat_key not in seen:
+                    seen.add(cat_key)
+                    on_category(cat_key, summary)
 
+        if progress_callback:
+            done = len(partial)
+            progress_callback(done, total, f"Cloud Functionで評価中...（{done}/{total}カテゴリ完了）")
+
+        status = job.get("status")
+        if status == "done":
+            result = job.get("result") or {}
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "CF returned success=false"))
+            return _cf_result(result)
+        if status == "error":
+            raise RuntimeError(job.get("error", "CF job failed"))
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"CF job {job_id} did not finish within {timeout:.0f}s")
+
+
+def estimate_via_cf(transcript: str, cf_url: str, cf_secret: str, options: Optional[dict] = None) -> dict:
+    """CFモードの見積もり（action=estimate）。options は評価と同じリクエストのオプション"""
+    payload = {"secret": cf_secret, "action": "estimate", "transcript": transcript, **(options or {})}
+    resp = requests.post(cf_url, json=payload, timeout=60)
+    resp.raise_for_status()
+    result = resp.json()
     if not result.get("success"):
         raise RuntimeError(result.get("error", "CF returned success=false"))
-
-    return {
-        "ai_total": result.get("ai_total", 0),
-        "raw_total": result.get("raw_total", 0),
-        "category_scores": result.get("categories", {}),
-        "item_scores": result.get("item_scores", {}),
-        "evidence": result.get("evidence", {}),
-        "ng_words": result.get("ng_words", []),
-    }
+    return result
@@ -2,6 +2,7 @@
 Google Sheets自動保存モジュール
 
 評価結果を研究用スプレッドシート（4シート構成）に自動保存する。
+結果に telemetry（Claude 呼出の計測）があれば「呼出計測」シートにも記録する。
 gspread + google-authを使用したサービスアカウント認証。
 
 環境変数:
@@ -23,6 +24,7 @@ SHEET_EVAL_DATA = "評価データ"
 SHEET_EVIDENCE = "エビデンス"
 SHEET_NG_WORDS = "NG語句"
 SHEET_TRANSCRIPT = "文字起こし"
+SHEET_TELEMETRY = "呼出計測"
 
 # 評価データシートのヘッダー（40列）
 EVAL_DATA_HEADERS = [
@@ -50,6 +52,7 @@ EVAL_DATA_HEADERS = [
 
 EVIDENCE_HEADERS = [
     "eval_id", "item_number", "item_name", "category", "score", "evidence", "reasoning",
+    "evidence_status", "evidence_similarity",
 ]
 
 NG_WORDS_HEADERS = [
@@ -60,6 +63,14 @@ TRANSCRIPT_HEADERS = [
     "eval_id", "evaluated_at", "consultant_name", "transcript",
 ]
 
+# 呼出計測シート（呼出グループごとに1行 + 合計行 "total"）
+TELEMETRY_HEADERS = [
+    "eval_id", "evaluated_at", "consultant_name", "label",
+    "calls", "errors", "call_time_sec", "queue_wait_sec", "retries",
+    "input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens",
+    "cost_usd",
+]
+
 # 文字起こしシートの文字数上限
 TRANSCRIPT_CHAR_LIMIT = 50000
 
@@ -138,7 +149,7 @@ class SheetsWriter:
         sheet1.append_row(EVAL_DATA_HEADERS)
 
         # 残り3シート作成
-        ws_evidence = self.spreadsheet.add_worksheet(SHEET_EVIDENCE, rows=1000, cols=7)
+        ws_evidence = self.spreadsheet.add_worksheet(SHEET_EVIDENCE, rows=1000, cols=len(EVIDENCE_HEADERS))
         ws_evidence.append_row(EVIDENCE_HEADERS)
 
         ws_ng = self.spreadsheet.add_worksheet(SHEET_NG_WORDS, rows=1000, cols=6)
@@ -191,6 +202,9 @@ class SheetsWriter:
         # Sheet 4: 文字起こし
         self._save_transcript(eval_id, evaluated_at, consultant_name, transcript)
 
+        # Sheet 5: 呼出計測（初回保存時にシートを作成）
+        self._save_telemetry(result, eval_id, evaluated_at, consultant_name)
+
         logger.info(f"Google Sheets保存完了: eval_id={eval_id}")
 
     def _save_eval_data(self, result: dict, meta: dict, eval_id: str, json_filename: str):
@@ -249,6 +263,7 @@ class SheetsWriter:
             ev = evidence.get(num_str, evidence.get(str(i), {}))
             if not isinstance(ev, dict):
                 ev = {}
+            verification = ev.get("verification") or {}
 
             cat_key = _ITEM_TO_CATEGORY.get(i, "")
             cat_name = _CATEGORY_NAMES.get(cat_key, "")
@@ -261,6 +276,9 @@ class SheetsWriter:
                 score,
                 ev.get("evidence", ""),
                 ev.get("reasoning", ""),
+                # 文字起こし中に見つからない引用（unlocated）は要確認
+                verification.get("status", ""),
+                verification.get("similarity", ""),
             ])
 
         ws.append_rows(rows, value_input_option="USER_ENTERED")
@@ -304,6 +322,38 @@ class SheetsWriter:
             value_input_option="USER_ENTERED",
         )
 
+    def _save_telemetry(self, result: dict, eval_id: str, evaluated_at: str,
+                        consultant_name: str):
+        """Sheet 5: 呼出計測（呼出グループ数 + 1行）"""
+        telemetry = result.get("telemetry")
+        if not telemetry:
+            return
+
+        ws = self._ensure_sheet(SHEET_TELEMETRY, TELEMETRY_HEADERS)
+
+        groups = list(telemetry.get("by_label", {}).items())
+        groups.append(("total", telemetry.get("total", {})))
+        rows = []
+        for label, stats in groups:
+            rows.append([
+                eval_id,
+                evaluated_at,
+                consultant_name,
+                label,
+                stats.get("calls", 0),
+                stats.get("errors", 0),
+                stats.get("call_time", 0),
+                stats.get("queue_wait", 0),
+                stats.get("retries", 0),
+                stats.get("input_tokens", 0),
+                stats.get("output_tokens", 0),
+                stats.get("cache_creation_input_tokens", 0),
+                stats.get("cache_read_input_tokens", 0),
+                stats.get("cost_usd", 0),
+            ])
+
+        ws.append_rows(rows, value_input_option="USER_ENTERED")
+
     def check_connection(self) -> dict:
         """接続状態チェック
 
@@ -48,6 +48,13 @@ var EVAL_COLUMNS = {
   UPDATED_AT: 25          // Z: 更新日時
 };
 
+/**
+ * 一括評価（runConsultationEvaluations）のジョブ設定
+ */
+var EVALUATION_BATCH_MAX = 50;                       // CF の EVAL_MAX_TRANSCRIPTS と揃える
+var EVALUATION_JOB_PREFIX = 'EVAL_JOB_';             // ScriptProperties のキー（EVAL_JOB_{job_id}）
+var EVALUATION_JOB_TIMEOUT_MS = 2 * 60 * 60 * 1000;  // 投入から2時間で終わらないジョブはエラーにする
+
 // ━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 // シートセットアップ
 // ━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -173,37 +180,29 @@ function generateEvaluationId() {
 // ━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 /**
- * メイン評価処理: 文字起こし取得 → Cloud Function呼出 → 結果保存
+ * 評価対象の行を評価シートに「AI評価中」で登録し、CF に送る1件分のデータを作る
  * @param {string} transcriptFileId - DriveファイルID
  * @param {number} rowIndex - 予約管理シート行番号
- * @returns {Object} 結果
+ * @param {Sheet} evalSheet - 評価シート
+ * @returns {Object} { evalId, rowNum, item } または { error }
  */
-function runConsultationEvaluation(transcriptFileId, rowIndex) {
-  var props = PropertiesService.getScriptProperties();
-  var cfUrl = props.getProperty('EVALUATION_CF_URL') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_URL) || '';
-  var cfSecret = props.getProperty('EVALUATION_CF_SECRET') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_SECRET) || '';
-
-  if (!cfUrl) {
-    return { success: false, message: 'コンサルタント評価Cloud Function URLが未設定です' };
-  }
-
+function prepareEvaluation_(transcriptFileId, rowIndex, evalSheet) {
   // 文字起こしテキスト取得
   var transcript = getTranscriptText(transcriptFileId);
   if (!transcript) {
-    return { success: false, message: '文字起こしテキストの読み込みに失敗しました' };
+    return { error: '文字起こしテキストの読み込みに失敗しました' };
   }
 
   // 予約データ取得
   var rowData = getRowData(rowIndex);
   if (!rowData.id) {
-    return { success: false, message: '行 ' + rowIndex + ' にデータがありません' };
+    return { error: '行 ' + rowIndex + ' にデータがありません' };
   }
 
   // 評価IDを事前生成
   var evalId = generateEvaluationId();
 
   // ステータス更新: AI評価中
-  var evalSheet = getOrCreateEvaluationSheet_();
   var newRowNum = evalSheet.getLastRow() + 1;
   evalSheet.getRange(newRowNum, EVAL_COLUMNS.EVAL_ID + 1).setValue(evalId);
   evalSheet.getRange(newRowNum, EVAL_COLUMNS.APP_ID + 1).setValue(rowData.id || '');
@@ -213,16 +212,53 @@ function runConsultationEvaluation(transcriptFileId, rowIndex) {
   evalSheet.getRange(newRowNum, EVAL_COLUMNS.CREATED_AT + 1).setValue(new Date());
   evalSheet.getRange(newRowNum, EVAL_COLUMNS.TRANSCRIPT_FILE_ID + 1).setValue(transcriptFileId);
 
-  var payload = {
-    secret: cfSecret,
-    transcript: transcript,
-    evaluation_id: evalId,
-    application_id: rowData.id || '',
-    consultant_name: rowData.leader || '',
-    company_name: rowData.company || '',
-    industry: rowData.industry || '',
-    theme: rowData.theme || ''
+  return {
+    evalId: evalId,
+    rowNum: newRowNum,
+    item: {
+      transcript: transcript,
+      evaluation_id: evalId,
+      application_id: rowData.id || '',
+      consultant_name: rowData.leader || '',
+      company_name: rowData.company || '',
+      industry: rowData.industry || '',
+      theme: rowData.theme || ''
+    }
   };
+}
+
+/**
+ * 評価シートの行をエラーにする
+ */
+function markEvaluationError_(evalSheet, rowNum) {
+  evalSheet.getRange(rowNum, EVAL_COLUMNS.STATUS + 1).setValue(EVALUATION_STATUS.ERROR);
+  evalSheet.getRange(rowNum, EVAL_COLUMNS.UPDATED_AT + 1).setValue(new Date());
+}
+
+/**
+ * メイン評価処理: 文字起こし取得 → Cloud Function呼出 → 結果保存
+ * @param {string} transcriptFileId - DriveファイルID
+ * @param {number} rowIndex - 予約管理シート行番号
+ * @returns {Object} 結果
+ */
+function runConsultationEvaluation(transcriptFileId, rowIndex) {
+  var props = PropertiesService.getScriptProperties();
+  var cfUrl = props.getProperty('EVALUATION_CF_URL') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_URL) || '';
+  var cfSecret = props.getProperty('EVALUATION_CF_SECRET') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_SECRET) || '';
+
+  if (!cfUrl) {
+    return { success: false, message: 'コンサルタント評価Cloud Function URLが未設定です' };
+  }
+
+  var evalSheet = getOrCreateEvaluationSheet_();
+  var prepared = prepareEvaluation_(transcriptFileId, rowIndex, evalSheet);
+  if (prepared.error) {
+    return { success: false, message: prepared.error };
+  }
+  var evalId = prepared.evalId;
+  var newRowNum = prepared.rowNum;
+  var payload = prepared.item;
+  payload.secret = cfSecret;
 
   console.log('コンサルタント評価リクエスト送信: ' + evalId + ' -> ' + cfUrl);
 
@@ -240,15 +276,13 @@ function runConsultationEvaluation(transcriptFileId, rowIndex) {
 
     if (code !== 200) {
       console.error('コンサルタント評価エラー (' + code + '): ' + body);
-      evalSheet.getRange(newRowNum, EVAL_COLUMNS.STATUS + 1).setValue(EVALUATION_STATUS.ERROR);
-      evalSheet.getRange(newRowNum, EVAL_COLUMNS.UPDATED_AT + 1).setValue(new Date());
+      markEvaluationError_(evalSheet, newRowNum);
       return { success: false, message: '評価に失敗しました: ' + code };
     }
 
     var result = JSON.parse(body);
     if (!result.success) {
-      evalSheet.getRange(newRowNum, EVAL_COLUMNS.STATUS + 1).setValue(EVALUATION_STATUS.ERROR);
-      evalSheet.getRange(newRowNum, EVAL_COLUMNS.UPDATED_AT + 1).setValue(new Date());
+      markEvaluationError_(evalSheet, newRowNum);
       return { success: false, message: '評価結果の取得に失敗しました' };
     }
 
@@ -264,12 +298,199 @@ function runConsultationEvaluation(transcriptFileId, rowIndex) {
 
   } catch (e) {
     console.error('コンサルタント評価実行エラー:', e);
-    evalSheet.getRange(newRowNum, EVAL_COLUMNS.STATUS + 1).setValue(EVALUATION_STATUS.ERROR);
-    evalSheet.getRange(newRowNum, EVAL_COLUMNS.UPDATED_AT + 1).setValue(new Date());
+    markEvaluationError_(evalSheet, newRowNum);
     return { success: false, error: e.toString() };
   }
 }
 
+/**
+ * 複数行をまとめて評価（Cloud Function のジョブモード、"transcripts" + action=submit）
+ * CF は全行のカテゴリ呼出を1つの同時実行数の下で並行実行する。数十件の評価は
+ * UrlFetchApp の待ち時間に収まらないため、ジョブを投入して即座に戻り、結果は
+ * checkEvaluationJobs（1分おきのトリガー）が取りに行って行ごとに保存する。
+ * @param {number[]} rowIndexes - 予約管理シートの行番号の配列（CF の EVAL_MAX_TRANSCRIPTS 件まで）
+ * @returns {Object} { success, jobId, submitted, results: [{ rowIndex, success, message }] }
+ */
+function runConsultationEvaluations(rowIndexes) {
+  var props = PropertiesService.getScriptProperties();
+  var cfUrl = props.getProperty('EVALUATION_CF_URL') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_URL) || '';
+  var cfSecret = props.getProperty('EVALUATION_CF_SECRET') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_SECRET) || '';
+
+  if (!cfUrl) {
+    return { success: false, message: 'コンサルタント評価Cloud Function URLが未設定です' };
+  }
+  if (!rowIndexes || rowIndexes.length === 0) {
+    return { success: false, message: '評価する行がありません' };
+  }
+  if (rowIndexes.length > EVALUATION_BATCH_MAX) {
+    return { success: false, message: '一度に評価できるのは ' + EVALUATION_BATCH_MAX + ' 件までです' };
+  }
+
+  var sheet = SpreadsheetApp.openById(CONFIG.SPREADSHEET_ID).getSheetByName(CONFIG.SHEET_NAME);
+  var evalSheet = getOrCreateEvaluationSheet_();
+  var results = [];
+  var prepared = [];
+  rowIndexes.forEach(function(rowIndex) {
+    var transcriptFileId = sheet.getRange(rowIndex, COLUMNS.TRANSCRIPT_FILE_ID + 1).getValue();
+    if (!transcriptFileId) {
+      results.push({ rowIndex: rowIndex, success: false, message: '文字起こしファイルが未設定です（AE列）' });
+      return;
+    }
+    var p = prepareEvaluation_(transcriptFileId, rowIndex, evalSheet);
+    if (p.error) {
+      results.push({ rowIndex: rowIndex, success: false, message: p.error });
+      return;
+    }
+    p.rowIndex = rowIndex;
+    p.transcriptFileId = transcriptFileId;
+    prepared.push(p);
+  });
+
+  if (prepared.length === 0) {
+    return { success: false, message: '評価できる行がありません', results: results };
+  }
+
+  console.log('コンサルタント評価ジョブ投入（' + prepared.length + '件）-> ' + cfUrl);
+
+  var failAll = function(message) {
+    prepared.forEach(function(p) {
+      markEvaluationError_(evalSheet, p.rowNum);
+      results.push({ rowIndex: p.rowIndex, success: false, evaluationId: p.evalId, message: message });
+    });
+    return { success: false, message: message, results: results };
+  };
+
+  try {
+    var response = UrlFetchApp.fetch(cfUrl, {
+      method: 'post',
+      contentType: 'application/json',
+      payload: JSON.stringify({
+        secret: cfSecret,
+        action: 'submit',
+        transcripts: prepared.map(function(p) { return p.item; })
+      }),
+      muteHttpExceptions: true
+    });
+
+    var code = response.getResponseCode();
+    var body = response.getContentText();
+
+    if (code === 409) {
+      // CF のジョブストアが共有されていない（EVAL_JOB_BACKEND=local のデプロイ）
+      console.error('コンサルタント評価ジョブ投入不可 (409): ' + body);
+      return failAll('CFのジョブモードが無効です（EVAL_JOB_BACKEND=gcs を設定）。1件ずつ run-evaluation で評価してください');
+    }
+    var submitted = (code === 200 || code === 202) ? JSON.parse(body) : null;
+    if (!submitted || !submitted.job_id) {
+      console.error('コンサルタント評価ジョブ投入エラー (' + code + '): ' + body);
+      return failAll('評価ジョブの投入に失敗しました: ' + code);
+    }
+
+    // 結果の保存先（送信順）を残し、ポーリングトリガーを設定
+    props.setProperty(EVALUATION_JOB_PREFIX + submitted.job_id, JSON.stringify({
+      submittedAt: new Date().getTime(),
+      rows: prepared.map(function(p) {
+        return { rowIndex: p.rowIndex, rowNum: p.rowNum, evalId: p.evalId, transcriptFileId: p.transcriptFileId };
+      })
+    }));
+    setupEvaluationJobTrigger_();
+
+    prepared.forEach(function(p) {
+      results.push({ rowIndex: p.rowIndex, success: true, evaluationId: p.evalId, message: 'AI評価中（ジョブ ' + submitted.job_id + '）' });
+    });
+    return { success: true, jobId: submitted.job_id, submitted: prepared.length, results: results };
+
+  } catch (e) {
+    console.error('コンサルタント評価ジョブ投入エラー:', e);
+    return failAll(e.toString());
+  }
+}
+
+/**
+ * 投入済みの評価ジョブの状態を確認し、完了したジョブの結果を評価シートに保存する（トリガー実行）
+ * 未完了のジョブが無くなればトリガーを削除する。EVALUATION_JOB_TIMEOUT_MS を過ぎたジョブはエラーにする。
+ */
+function checkEvaluationJobs() {
+  var lock = LockService.getScriptLock();
+  if (!lock.tryLock(1000)) return;
+
+  try {
+    var props = PropertiesService.getScriptProperties();
+    var cfUrl = props.getProperty('EVALUATION_CF_URL') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_URL) || '';
+    var cfSecret = props.getProperty('EVALUATION_CF_SECRET') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_SECRET) || '';
+    var all = props.getProperties();
+    var evalSheet = getOrCreateEvaluationSheet_();
+    var remaining = 0;
+
+    Object.keys(all).forEach(function(key) {
+      if (key.indexOf(EVALUATION_JOB_PREFIX) !== 0) return;
+      var jobId = key.substring(EVALUATION_JOB_PREFIX.length);
+      var job = JSON.parse(all[key]);
+
+      var status = null;
+      try {
+        var response = UrlFetchApp.fetch(cfUrl, {
+          method: 'post',
+          contentType: 'application/json',
+          payload: JSON.stringify({ secret: cfSecret, action: 'status', job_id: jobId }),
+          muteHttpExceptions: true
+        });
+        var code = response.getResponseCode();
+        status = code === 200 ? JSON.parse(response.getContentText()) : { status: 'error', error: 'status ' + code };
+      } catch (e) {
+        console.error('評価ジョブ状態取得エラー: ' + jobId, e);
+      }
+
+      var expired = new Date().getTime() - job.submittedAt > EVALUATION_JOB_TIMEOUT_MS;
+      if (status && status.status === 'done') {
+        var batch = status.result || {};
+        job.rows.forEach(function(row, i) {
+          var result = (batch.results || [])[i] || {};
+          if (result.success) {
+            saveEvaluationResult(result, row.rowNum, evalSheet, row.transcriptFileId);
+          } else {
+            console.error('評価失敗: ' + row.evalId + ' ' + (result.error || ''));
+            markEvaluationError_(evalSheet, row.rowNum);
+          }
+        });
+        console.log('評価ジョブ完了: ' + jobId + ' ' + (batch.succeeded || 0) + '/' + job.rows.length + '件成功');
+        props.deleteProperty(key);
+      } else if ((status && status.status === 'error') || expired) {
+        console.error('評価ジョブ失敗: ' + jobId + ' ' + (status && status.error ? status.error : 'タイムアウト'));
+        job.rows.forEach(function(row) { markEvaluationError_(evalSheet, row.rowNum); });
+        props.deleteProperty(key);
+      } else {
+        remaining++;
+      }
+    });
+
+    if (remaining === 0) {
+      ScriptApp.getProjectTriggers().forEach(function(trigger) {
+        if (trigger.getHandlerFunction() === 'checkEvaluationJobs') {
+          ScriptApp.deleteTrigger(trigger);
+        }
+      });
+    }
+  } finally {
+    lock.releaseLock();
+  }
+}
+
+/**
+ * 評価ジョブのポーリングトリガーを設定（1分おき、未設定の場合のみ）
+ */
+function setupEvaluationJobTrigger_() {
+  var exists = ScriptApp.getProjectTriggers().some(function(trigger) {
+    return trigger.getHandlerFunction() === 'checkEvaluationJobs';
+  });
+  if (exists) return;
+
+  ScriptApp.newTrigger('checkEvaluationJobs')
+    .timeBased()
+    .everyMinutes(1)
+    .create();
+}
+
 /**
  * CF応答をシートに保存
  */
@@ -642,6 +863,47 @@ function manualRunEvaluation(rowIndex) {
   }
 }
 
+/**
+ * 評価を実行せずに、Claude 呼出回数・トークン数・推定コスト・所要時間を見積もる（action=estimate）
+ * @param {number} rowIndex - 予約シートの行番号
+ * @returns {Object} { success, calls, input_tokens, output_tokens, cost_usd, wall_time, ... }
+ */
+function estimateConsultationEvaluation(rowIndex) {
+  var props = PropertiesService.getScriptProperties();
+  var cfUrl = props.getProperty('EVALUATION_CF_URL') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_URL) || '';
+  var cfSecret = props.getProperty('EVALUATION_CF_SECRET') || (CONFIG.EVALUATION && CONFIG.EVALUATION.CLOUD_FUNCTION_SECRET) || '';
+
+  if (!cfUrl) {
+    return { success: false, message: 'コンサルタント評価Cloud Function URLが未設定です' };
+  }
+
+  try {
+    var sheet = SpreadsheetApp.openById(CONFIG.SPREADSHEET_ID).getSheetByName(CONFIG.SHEET_NAME);
+    var transcriptFileId = sheet.getRange(rowIndex, COLUMNS.TRANSCRIPT_FILE_ID + 1).getValue();
+    var transcript = transcriptFileId ? getTranscriptText(transcriptFileId) : '';
+    if (!transcript) {
+      return { success: false, message: '文字起こしテキストの読み込みに失敗しました' };
+    }
+
+    var response = UrlFetchApp.fetch(cfUrl, {
+      method: 'post',
+      contentType: 'application/json',
+      payload: JSON.stringify({ secret: cfSecret, action: 'estimate', transcript: transcript }),
+      muteHttpExceptions: true
+    });
+    var result = JSON.parse(response.getContentText());
+    if (result.success) {
+      console.log('評価の見積もり: 行' + rowIndex + ' 呼出' + result.calls + '回, $' + result.cost_usd +
+        ', 約' + Math.round(result.wall_time) + '秒');
+    }
+    return result;
+
+  } catch (e) {
+    console.error('評価見積もりエラー:', e);
+    return { success: false, error: e.toString() };
+  }
+}
+
 /**
  * 評価設定確認
  */
@@ -1354,6 +1354,20 @@ function doGet(e) {
         .setMimeType(ContentService.MimeType.JSON);
     }
 
+    // 報告書生成の見積もり（管理用、dry_run）
+    if (action === 'estimate-report') {
+      var erRow = parseInt(e.parameter.row);
+      if (!erRow || erRow < 2) {
+        return ContentService
+          .createTextOutput(JSON.stringify({ success: false, message: 'row パラメータが必要です' }))
+          .setMimeType(ContentService.MimeType.JSON);
+      }
+      var erResult = estimateReportGeneration(erRow);
+      return ContentService
+        .createTextOutput(JSON.stringify(erResult))
+        .setMimeType(ContentService.MimeType.JSON);
+    }
+
     // パイプライン状態一覧（管理用）
     if (action === 'transcript-pipeline') {
       var pipeResult = getTranscriptPipelineStatus();
@@ -1428,6 +1442,36 @@ function doGet(e) {
         .setMimeType(ContentService.MimeType.JSON);
     }
 
+    // 複数行の一括評価（ジョブ投入、結果は checkEvaluationJobs が保存）
+    if (action === 'run-evaluations') {
+      var evalRows = String(e.parameter.rows || '').split(',')
+        .map(function(r) { return parseInt(r); })
+        .filter(function(r) { return r >= 2; });
+      if (evalRows.length === 0) {
+        return ContentService
+          .createTextOutput(JSON.stringify({ success: false, message: 'rows パラメータが必要です（例: rows=2,3,4）' }))
+          .setMimeType(ContentService.MimeType.JSON);
+      }
+      var evalBatchResult = runConsultationEvaluations(evalRows);
+      return ContentService
+        .createTextOutput(JSON.stringify(evalBatchResult))
+        .setMimeType(ContentService.MimeType.JSON);
+    }
+
+    // 評価の見積もり（Claude を呼ばない）
+    if (action === 'estimate-evaluation') {
+      var estRow = parseInt(e.parameter.row);
+      if (!estRow || estRow < 2) {
+        return ContentService
+          .createTextOutput(JSON.stringify({ success: false, message: 'row パラメータが必要です' }))
+          .setMimeType(ContentService.MimeType.JSON);
+      }
+      var estResult = estimateConsultationEvaluation(estRow);
+      return ContentService
+        .createTextOutput(JSON.stringify(estResult))
+        .setMimeType(ContentService.MimeType.JSON);
+    }
+
     // 評価結果一覧API
     if (action === 'evaluation-results') {
       var evalResults = getEvaluationResults({
@@ -2137,11 +2181,14 @@ function doGet(e) {
           'GET ?action=setup-report': 'レポート管理シートセットアップ',
           'GET ?action=start-transcript&row=N': '文字起こし手動実行',
           'GET ?action=start-auto-report&row=N': '報告書自動生成手動実行',
+          'GET ?action=estimate-report&row=N': '報告書生成の見積もり',
           'GET ?action=transcript-pipeline': 'パイプライン状態一覧',
           'GET ?action=transcript-setup': '文字起こし設定確認',
           'GET ?action=setup-transcript': '文字起こしCF設定',
           'GET ?action=setup-notion-cf': 'Notion CF設定',
           'GET ?action=run-evaluation&row=N': '評価実行（予約データから）',
+          'GET ?action=run-evaluations&rows=N,M': '複数行の一括評価（ジョブ）',
+          'GET ?action=estimate-evaluation&row=N': '評価の見積もり',
           'GET ?action=evaluation-results': '評価結果一覧',
           'GET ?action=evaluation-detail&id=xxx': '評価結果詳細',
           'GET ?action=evaluation-history&consultant=xxx': 'コンサルタント別履歴',
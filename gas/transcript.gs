@@ -523,6 +523,49 @@ function manualStartReportGeneration(rowIndex) {
   }
 }
 
+/**
+ * 報告書を生成せずに、Claude 呼出のトークン数・推定コスト・所要時間を見積もる（dry_run）
+ * @param {number} rowIndex - 行番号
+ * @returns {Object} { success, dry_run, input_tokens, output_tokens, cost_usd, wall_time, ... }
+ */
+function estimateReportGeneration(rowIndex) {
+  var props = PropertiesService.getScriptProperties();
+  var cfUrl = props.getProperty('REPORT_CF_URL') || (CONFIG.AUTO_REPORT && CONFIG.AUTO_REPORT.CLOUD_FUNCTION_URL) || '';
+  var cfSecret = props.getProperty('REPORT_CF_SECRET') || (CONFIG.AUTO_REPORT && CONFIG.AUTO_REPORT.CLOUD_FUNCTION_SECRET) || '';
+
+  if (!cfUrl) {
+    return { success: false, message: '報告書生成Cloud Function URLが未設定です' };
+  }
+
+  try {
+    var rowData = getRowData(rowIndex);
+    var sheet = SpreadsheetApp.openById(CONFIG.SPREADSHEET_ID).getSheetByName(CONFIG.SHEET_NAME);
+    var transcriptFileId = sheet.getRange(rowIndex, COLUMNS.TRANSCRIPT_FILE_ID + 1).getValue();
+    var transcript = transcriptFileId ? getTranscriptText(transcriptFileId) : '';
+    if (!transcript) {
+      return { success: false, message: '文字起こしテキストの読み込みに失敗しました' };
+    }
+
+    var response = UrlFetchApp.fetch(cfUrl, {
+      method: 'post',
+      contentType: 'application/json',
+      payload: JSON.stringify({
+        secret: cfSecret,
+        transcript: transcript,
+        application_id: rowData.id || '',
+        company: rowData.company || '',
+        dry_run: true
+      }),
+      muteHttpExceptions: true
+    });
+    return JSON.parse(response.getContentText());
+
+  } catch (e) {
+    console.error('報告書見積もりエラー:', e);
+    return { success: false, error: e.toString() };
+  }
+}
+
 /**
  * 文字起こし・報告書パイプラインの状態一覧を取得
  * @returns {Object} パイプライン状態